@@ -17,6 +17,7 @@ from .models import (
 from .modelss import (
     TicketToolConfig,
     PapCompliance,
+    PapMonthlyRollup,
     LeaveRequest,
     ComplianceTicket,
     BigBrotherRedditSettings,
@@ -254,3 +255,10 @@ class PapComplianceConfig(PapModuleVisibilityMixin, admin.ModelAdmin):
     """Shows the most recent PAP compliance calculation per user."""
     search_fields = ['user_profile']
     list_display = ['user_profile', 'pap_compliant']
+
+@admin.register(PapMonthlyRollup)
+class PapMonthlyRollupConfig(PapModuleVisibilityMixin, admin.ModelAdmin):
+    """Per-user monthly PAP counts behind the PAP form and history."""
+    search_fields = ['user__username']
+    list_display = ['user', 'month', 'corp_paps', 'alliance_paps', 'coalition_paps', 'compliant', 'finalized']
+    list_filter = ['month', 'finalized', 'compliant']
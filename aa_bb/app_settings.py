@@ -309,6 +309,19 @@ def get_character_id(name: str) -> int | None:
     return char_id
 
 _EXPIRY = timedelta(days=30)
+_TOUCH_INTERVAL = timedelta(hours=6)  # Min gap between LRU timestamp refreshes of one cache row.
+
+
+def bucket_as_of(as_of):
+    """Round a timestamp down to the configured EntityInfoCache bucket (no-op when unset)."""
+    bucket = entity_cache_bucket()
+    if as_of is None or bucket is None:  # Exact timestamps, legacy behaviour.
+        return as_of
+    as_of = as_of.replace(minute=0, second=0, microsecond=0)
+    if bucket == "day":  # Collapse to midnight of the same day.
+        as_of = as_of.replace(hour=0)
+    return as_of
+
 
 def get_entity_info(entity_id: int, as_of: timezone.datetime) -> Dict:
     """
@@ -321,7 +334,8 @@ def get_entity_info(entity_id: int, as_of: timezone.datetime) -> Dict:
         'alli_id': Optional[int],
         'alli_name': str,
       }
-    Caches the result in the DB for 2 hours.
+    Caches the result in EntityInfoCache; `as_of` is rounded with bucket_as_of
+    so near-duplicate timestamps share one row.
     """
     if entity_id is None:  # Replace missing IDs with placeholder to avoid crashing downstream.
         entity_id = 342545170
@@ -329,14 +343,15 @@ def get_entity_info(entity_id: int, as_of: timezone.datetime) -> Dict:
     else:
         errent = False
     now = timezone.now()
+    as_of = bucket_as_of(as_of)
 
     # 1) Attempt to fetch fresh-enough cache entry
     try:
         cache = EntityInfoCache.objects.get(entity_id=entity_id, as_of=as_of)
-        cache.updated = timezone.now()
-        cache.save()
         if now - cache.updated < _EXPIRY:  # Serve cached data when still within TTL.
             #logger.debug(f"cache hit: entity={entity_id} @ {as_of}")
+            if now - cache.updated > _TOUCH_INTERVAL:  # Refresh the LRU stamp without a write per hit.
+                EntityInfoCache.objects.filter(pk=cache.pk).update(updated=now)
             return cache.data
         else:
             #logger.debug(f"cache stale: entity={entity_id} @ {as_of}, expired {cache.updated}")
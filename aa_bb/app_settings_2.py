@@ -115,6 +115,32 @@ def afat_active():
     return apps.is_installed("afat")
 
 
+def async_sse_enabled():
+    """Return True when the dashboards should use the async (ASGI) SSE streams."""
+    return bool(getattr(settings, "BB_ASYNC_SSE", False))
+
+
+def entity_cache_bucket():
+    """
+    Granularity EntityInfoCache keys are rounded to: "hour", "day" or None.
+
+    Bucketing collapses near-duplicate (entity_id, as_of) rows; corp/alliance
+    membership is resolved at the start of the bucket.
+    """
+    bucket = getattr(settings, "BB_ENTITY_CACHE_BUCKET", None)
+    return bucket if bucket in ("hour", "day") else None
+
+
+def entity_cache_max_age_days():
+    """Days an EntityInfoCache row may go unread before it is evicted."""
+    return int(getattr(settings, "BB_ENTITY_CACHE_MAX_AGE_DAYS", 60))
+
+
+def entity_cache_max_rows():
+    """Upper bound on EntityInfoCache rows; least recently used rows go first. 0 disables."""
+    return int(getattr(settings, "BB_ENTITY_CACHE_MAX_ROWS", 2_000_000))
+
+
 
 
 _webhook_history = deque()  # stores timestamp floats of last webhook sends
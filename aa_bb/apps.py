@@ -265,6 +265,32 @@ class AaBbConfig(AppConfig):
             else:
                 logger.info("✅ Created ‘BB run regular DB cleanup’ periodic task with enabled=False")
 
+            task_paps, created_paps = PeriodicTask.objects.get_or_create(
+                name="BB update PAP rollups",
+                defaults={
+                    "interval": schedule,
+                    "task": "aa_bb.tasks_paps.BB_update_pap_rollups",
+                    "enabled": True,  # only on creation
+                },
+            )
+
+            if not created_paps:  # Existing PAP rollup beat entry; keep it hourly.
+                updated_paps = False
+                if task_paps.crontab is not None:  # Rollups run on the hourly interval, not a crontab.
+                    task_paps.crontab = None
+                    updated_paps = True
+                if task_paps.interval != schedule or task_paps.task != "aa_bb.tasks_paps.BB_update_pap_rollups":  # Align interval/task fields.
+                    task_paps.interval = schedule
+                    task_paps.task = "aa_bb.tasks_paps.BB_update_pap_rollups"
+                    updated_paps = True
+                if updated_paps:  # Persist/log only when drift was corrected.
+                    task_paps.save()
+                    logger.info("✅ Updated ‘BB update PAP rollups’ periodic task")
+                else:
+                    logger.info("ℹ️ ‘BB update PAP rollups’ periodic task already exists and is up to date")
+            else:
+                logger.info("✅ Created ‘BB update PAP rollups’ periodic task with enabled=True")
+
 
             # Daily messages
             from .models import BigBrotherConfig
@@ -9,8 +9,7 @@ from allianceauth.services.hooks import MenuItemHook, UrlHook
 
 # AA Example App
 from aa_bb import urls, urls_loa, urls_cb, urls_paps
-from .modelss import LeaveRequest
-from .models import BigBrotherConfig
+from .menu_state import menu_flags, pending_loa_count
 
 
 class CorpBrotherMenuItem(MenuItemHook):
@@ -29,12 +28,7 @@ class CorpBrotherMenuItem(MenuItemHook):
     def render(self, request):
         """Render the menu item"""
 
-        try:
-            cfg = BigBrotherConfig.get_solo()
-        except BigBrotherConfig.DoesNotExist:
-            cfg = None
-
-        if not cfg or not cfg.dlc_corp_brother_active:  # Hide when DLC disabled.
+        if not menu_flags(request).get("dlc_corp_brother_active"):  # Hide when DLC disabled.
             return ""
 
         if request.user.has_perm("aa_bb.basic_access_cb"):  # User has access permission.
@@ -140,20 +134,15 @@ class LoAMenuItem(MenuItemHook):
         # Optional permission check:
         # if not request.user.has_perm("aa_bb.can_access_loa"):
         #     return ""
-        try:
-            cfg = BigBrotherConfig.get_solo()
-        except BigBrotherConfig.DoesNotExist:
-            cfg = None
-
-        if not cfg or not cfg.dlc_loa_active:  # Skip when LoA DLC disabled.
+        if not menu_flags(request).get("dlc_loa_active"):  # Skip when LoA DLC disabled.
             return ""
 
         if request.user.has_perm("aa_bb.can_access_loa"):  # Basic LoA access.
             if request.user.has_perm("aa_bb.can_view_all_loa"):  # Staff can see pending counters.
-                pending_count = LeaveRequest.objects.filter(status="pending").count()
-                if pending_count:  # Highlight nav badge when there are pending requests.
-                    self.count = pending_count
-                return MenuItemHook.render(self, request)
+                # Cached count; None hides the badge once the queue is empty.
+                self.count = pending_loa_count() or None
+            else:
+                self.count = None
             return MenuItemHook.render(self, request)
         return ""
 
@@ -180,12 +169,7 @@ class PapsMenuItem(MenuItemHook):
     )
     def render(self, request):
         """Only show when PAP DLC is enabled and user has permission."""
-        try:
-            cfg = BigBrotherConfig.get_solo()
-        except BigBrotherConfig.DoesNotExist:
-            cfg = None
-
-        if not cfg or not cfg.dlc_pap_active:  # Hide when PAP DLC disabled.
+        if not menu_flags(request).get("dlc_pap_active"):  # Hide when PAP DLC disabled.
             return ""
 
         if request.user.has_perm("aa_bb.can_access_paps"):  # Only show for PAP viewers.
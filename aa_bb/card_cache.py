@@ -0,0 +1,139 @@
+"""
+Render cache for BigBrother dashboard cards.
+
+Rendered (content, status) pairs are cached per (card key, user, data_version).
+The data_version hashes together:
+  • the newest corptools `last_update_*` stamps the card reads, across the user's audits;
+  • a per-user generation bumped by signals (audit saves, ownership changes);
+  • a config generation bumped whenever BigBrotherConfig is saved, plus the app version;
+  • for cards fed from outside corptools (zKill, ESI history), a time bucket.
+
+The same digest is the card's ETag (per format, HTML or JSON), so a browser re-opening a dashboard gets a
+304 without the card being rendered or even read from the cache.
+"""
+
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+
+from corptools.models import CharacterAudit
+
+from . import __version__
+
+logger = logging.getLogger(__name__)
+
+CARD_CACHE_TTL = 6 * 60 * 60  # Seconds; superseded versions simply age out.
+STAMPLESS_TTL = 60 * 60  # Seconds a card without corptools stamps is considered fresh.
+
+# corptools CharacterAudit stamps each card is rendered from; [] = no corptools data.
+CARD_DEPENDENCIES = {
+    "compliance": ["last_update_roles", "last_update_titles"],
+    "imp_bl": [],
+    "lawn_bl": [],
+    "freq_corp": [],
+    "awox": [],
+    "clone_states": ["last_update_skills", "last_update_skill_que"],
+    "sus_clones": ["last_update_clones"],
+    "sus_asset": ["last_update_assets"],
+    "sus_conta": ["last_update_contacts"],
+    "sus_mail": ["last_update_mails"],
+    "sus_tra": ["last_update_wallet"],
+    "isk_flow": ["last_update_wallet"],
+    "cyno": ["last_update_skills", "last_update_assets", "last_update_clones"],
+    "skills": ["last_update_skills", "last_update_skill_que"],
+}
+
+CONFIG_GEN_KEY = "aa_bb:card_gen:config"
+
+
+def _user_gen_key(user_id: int) -> str:
+    return f"aa_bb:card_gen:user:{user_id}"
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:  # First bump, or the key was evicted.
+        cache.set(key, 1, None)
+
+
+def invalidate_user_cards(user_id: int) -> None:
+    """Make every cached card of user_id stale."""
+    if user_id:  # Unowned characters have no cards.
+        _bump(_user_gen_key(user_id))
+
+
+def invalidate_all_cards() -> None:
+    """Make every cached card stale (config changes affect hostility everywhere)."""
+    _bump(CONFIG_GEN_KEY)
+
+
+def data_version(user_id: int, key: str, fmt: str = "html") -> str | None:
+    """
+    Digest of everything card `key` depends on for user_id; None when the card is not cacheable.
+    `fmt` keeps the HTML render and the JSON payload (card_data) apart in cache and ETags.
+    """
+    fields = CARD_DEPENDENCIES.get(key)
+    if fields is None:  # Unknown or per-viewer card (corp_bl).
+        return None
+
+    gens = cache.get_many([CONFIG_GEN_KEY, _user_gen_key(user_id)])
+    parts = [
+        __version__,
+        key,
+        fmt,
+        str(user_id),
+        str(gens.get(CONFIG_GEN_KEY, 0)),
+        str(gens.get(_user_gen_key(user_id), 0)),
+    ]
+    if fields:  # One aggregate over the user's audits.
+        stamps = CharacterAudit.objects.filter(
+            character__character_ownership__user_id=user_id
+        ).aggregate(**{f: Max(f) for f in fields})
+        parts.extend(str(stamps[f]) for f in fields)
+    else:
+        parts.append(str(int(time.time() // STAMPLESS_TTL)))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def etag_for(version: str) -> str:
+    return f'"{version}"'
+
+
+def get_cached_card(key: str, user_id: int, version: str):
+    """Return the cached (content, status) pair or None."""
+    return cache.get(f"aa_bb:card:{key}:{user_id}:{version}")
+
+
+def set_cached_card(key: str, user_id: int, version: str, content, status) -> None:
+    cache.set(f"aa_bb:card:{key}:{user_id}:{version}", (content, status), CARD_CACHE_TTL)
+
+
+def render_card_cached(render, key: str, user_id: int, version: str | None):
+    """Return render()'s (content, status), served from and stored in the cache when versioned."""
+    if version is None:  # Not cacheable; always render.
+        return render()
+    hit = get_cached_card(key, user_id, version)
+    if hit is not None:  # Cache hit: no corptools reads at all.
+        return hit
+    content, status = render()
+    set_cached_card(key, user_id, version, content, status)
+    return content, status
+
+
+def not_modified(request, version: str | None) -> bool:
+    """True when the client already holds this version of the card."""
+    if version is None:  # Uncacheable cards never short-circuit.
+        return False
+    return etag_for(version) in request.headers.get("If-None-Match", "")
+
+
+def tag_response(response, version: str | None):
+    """Attach ETag/Cache-Control so browsers revalidate instead of refetching."""
+    if version is not None:  # Only versioned cards get validators.
+        response["ETag"] = etag_for(version)
+        response["Cache-Control"] = "private, no-cache"
+    return response
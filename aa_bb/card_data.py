@@ -0,0 +1,300 @@
+"""
+Compact JSON payloads for the BigBrother dashboard cards.
+
+Where `get_card_data` returns rendered HTML, `build_card_data` returns the
+same findings as data for the `card_data` endpoint:
+
+  {
+    columns: [ "character", "director", … ],
+    rows:    [ [ 2117000001, true, … ], … ],   # IDs, enums, numbers, ISO dates
+    names:   { "2117000001": "Some Pilot", … }, # every ID's name, once
+    meta:    { … }                              # optional, card specific
+  }
+
+Rows never repeat names, so a card listing the same alliance fifty times ships
+the name once. Status is computed from the data with the same rules the HTML
+card uses to paint cells red.
+"""
+
+import logging
+
+from .app_settings import get_user_characters
+from .checks.awox import fetch_awox_kills
+from .checks.clone_state import determine_character_state
+from .checks.corp_blacklist import get_corp_blacklist_html
+from .checks.corp_changes import get_corp_stints, get_current_stint_days_in_corp
+from .checks.cyno import CYNO_SKILL_ROWS, get_user_cyno_info
+from .checks.hostile_assets import get_asset_owners
+from .checks.hostile_clones import get_clone_owners
+from .checks.isk_flow import flows_ok, gather_user_flows, shown_flows
+from .checks.roles_and_tokens import get_user_roles_and_tokens
+from .checks.skills import get_char_age, get_multiple_user_skill_info, get_skill_map, skill_ids
+from .checks.sus_contacts import get_cell_style_for_row, get_user_contacts
+from .models import BigBrotherConfig
+
+logger = logging.getLogger(__name__)
+
+ROLE_FLAGS = ("director", "accountant", "station_manager", "personnel_manager")
+CONTACT_COLUMNS = ("character", "corporation", "alliance")
+
+
+class _Names:
+    """Side dictionary collecting id -> name pairs while rows are built."""
+
+    def __init__(self):
+        self.names = {}
+
+    def ref(self, ident, name):
+        """Record ident's name and return what the row should carry (the id, or the name if there is none)."""
+        if not ident:  # Nothing to key on; ship the bare name.
+            return name or None
+        if name:  # Empty names are not worth a dictionary entry.
+            self.names.setdefault(str(ident), name)
+        return ident
+
+
+def _day(value):
+    return value.date().isoformat() if value else None
+
+
+def _character_ids(user_id: int) -> dict:
+    """{character_name: character_id} for the user's characters."""
+    return {name: cid for cid, name in get_user_characters(user_id).items()}
+
+
+def _compliance(request, user_id, names):
+    char_ids = _character_ids(user_id)
+    rows = []
+    ok = True
+    for char_name, info in get_user_roles_and_tokens(user_id).items():
+        roles = [bool(info.get(r, False)) for r in ROLE_FLAGS]
+        char_token = bool(info.get("character_token", False))
+        corp_token = bool(info.get("corporation_token", False))
+        missing = [s for s in info.get("missing_corporation_scopes", "").split(", ") if s]
+        if not char_token or (not corp_token and any(roles)):  # Same rows the HTML card paints red.
+            ok = False
+        rows.append([names.ref(char_ids.get(char_name), char_name), *roles, char_token, corp_token, missing])
+    columns = ["character", *ROLE_FLAGS, "character_token", "corporation_token", "missing_corporation_scopes"]
+    return {"columns": columns, "rows": rows}, ok
+
+
+def _characters(request, user_id, names):
+    """Blacklist cards: the characters to look up; the client builds the links."""
+    rows = [[names.ref(cid, name)] for cid, name in get_user_characters(user_id).items()]
+    return {"columns": ["character"], "rows": rows}, False
+
+
+def _corp_bl(request, user_id, names):
+    """Per-viewer form with add links; kept as HTML."""
+    content = get_corp_blacklist_html(request, request.user.id, user_id)
+    return {"html": content}, not (content and "🚩" in content)
+
+
+def _freq_corp(request, user_id, names):
+    rows = []
+    ok = True
+    for char in get_corp_stints(user_id):
+        cid = names.ref(char["char_id"], char["char_name"])
+        for stint in char["stints"]:
+            alliances = [
+                [names.ref(seg["alliance_id"], seg["alliance_name"]), _day(seg["start"]), _day(seg["end"]), seg["hostile"]]
+                for seg in stint["alliances"]
+            ]
+            if stint["hostile"] or stint["days"] < 10 or any(seg["hostile"] for seg in stint["alliances"]):  # Red in the HTML card.
+                ok = False
+            rows.append([
+                cid,
+                names.ref(stint["corp_id"], stint["corp_name"]),
+                _day(stint["start"]),
+                _day(stint["end"]),
+                stint["days"],
+                stint["hostile"],
+                alliances,
+            ])
+    columns = ["character", "corporation", "start", "end", "days", "hostile", "alliances"]
+    return {"columns": columns, "rows": rows, "meta": {"alliances": ["alliance", "start", "end", "hostile"]}}, ok
+
+
+def _awox(request, user_id, names):
+    char_ids = _character_ids(user_id)
+    kills = fetch_awox_kills(user_id) or []
+    rows = []
+    for kill in kills:
+        link = kill.get("link", "")
+        try:
+            kill_id = int(link.rstrip("/").rsplit("/", 1)[-1])
+        except ValueError:
+            kill_id = None
+        chars = [names.ref(char_ids.get(n), n) for n in sorted(kill.get("chars", []))]
+        rows.append([kill_id, kill.get("value", 0), chars])
+    return {"columns": ["kill", "value", "characters"], "rows": rows}, not kills
+
+
+def _clone_states(request, user_id, names):
+    chars = get_user_characters(user_id)
+    rows = []
+    ok = True
+    for char_id, info in determine_character_state(user_id).items():
+        state = info.get("state", "unknown")
+        if state == "omega":  # Omega is what the HTML card highlights.
+            ok = False
+        rows.append([names.ref(char_id, chars.get(char_id)), state])
+    return {"columns": ["character", "state"], "rows": rows}, ok
+
+
+def _sus_clones(request, user_id, names):
+    owners = get_clone_owners(user_id)
+    rows = [
+        [
+            names.ref(o["system_id"], o["system_name"]),
+            names.ref(o["owner_id"], o["owner_name"]),
+            o["hostile"],
+            o["unresolvable"],
+        ]
+        for o in owners
+    ]
+    ok = not any(o["hostile"] or o["unresolvable"] for o in owners)
+    return {"columns": ["system", "owner", "hostile", "unresolvable"], "rows": rows}, ok
+
+
+def _sus_asset(request, user_id, names):
+    owners = get_asset_owners(user_id)
+    rows = [
+        [names.ref(o["system_id"], o["system_name"]), names.ref(o["owner_id"], o["owner_name"]), o["hostile"]]
+        for o in owners
+    ]
+    return {"columns": ["system", "owner", "hostile"], "rows": rows}, not any(o["hostile"] for o in owners)
+
+
+def _sus_conta(request, user_id, names):
+    char_ids = _character_ids(user_id)
+    rows = []
+    ok = True
+    for cid, info in get_user_contacts(user_id).items():
+        hostile = [col for col in CONTACT_COLUMNS if get_cell_style_for_row(cid, col, info)]
+        if hostile:  # Any highlighted column turns the card red.
+            ok = False
+        rows.append([
+            names.ref(cid, info["contact_name"] or info["alliance"]),
+            info["contact_type"],
+            info["standing"],
+            names.ref(info["coid"], info["corporation"]),
+            names.ref(info["aid"], info["alliance"]),
+            [names.ref(char_ids.get(n), n) for n in info["characters"]],
+            hostile,
+        ])
+    columns = ["contact", "type", "standing", "corporation", "alliance", "seen_by", "hostile"]
+    return {"columns": columns, "rows": rows}, ok
+
+
+def _isk_flow(request, user_id, names):
+    flows = gather_user_flows(user_id)
+    shown = shown_flows(flows)
+    rows = [
+        [
+            names.ref(f["counterparty_id"], f["name"]),
+            names.ref(f["corp_id"], f["corp_name"]),
+            names.ref(f["alli_id"], f["alli_name"]),
+            float(f["isk_in"]),
+            float(f["isk_out"]),
+            f["count_in"],
+            f["count_out"],
+            _day(f["first_seen"]),
+            _day(f["last_seen"]),
+            f["hostile"],
+        ]
+        for f in shown
+    ]
+    columns = [
+        "counterparty", "corporation", "alliance", "isk_in", "isk_out",
+        "count_in", "count_out", "first_seen", "last_seen", "hostile",
+    ]
+    ok = flows_ok(flows)
+    return {"columns": columns, "rows": rows, "meta": {"total": len(flows)}}, ok
+
+
+def _cyno(request, user_id, names):
+    char_ids = _character_ids(user_id)
+    main_corp_id = BigBrotherConfig.get_solo().main_corporation_id
+    keys = [key for key, _ in CYNO_SKILL_ROWS]
+    rows = []
+    ok = True
+    for char_name, info in get_user_cyno_info(user_id).items():
+        cid = char_ids.get(char_name)
+        skills = [info[f"s_{key}"] for key in keys]
+        owns = [info.get(f"i_{key}") for key in keys]
+        age = info["age"]
+        if (
+            2 in skills
+            or True in owns
+            or info["can_light"] == True
+            or (isinstance(age, int) and age < 90)
+        ):  # Red in the HTML card.
+            ok = False
+        rows.append([
+            names.ref(cid, char_name),
+            age,
+            get_current_stint_days_in_corp(cid, main_corp_id) if cid else None,
+            info["can_light"],
+            skills,
+            owns,
+        ])
+    columns = ["character", "age", "days_in_corp", "can_light", "skills", "owns"]
+    return {"columns": columns, "rows": rows, "meta": {"skills": dict(CYNO_SKILL_ROWS)}}, ok
+
+
+def _skills(request, user_id, names):
+    char_ids = _character_ids(user_id)
+    skill_names = get_skill_map()
+    for sid in skill_ids:
+        names.ref(sid, skill_names.get(sid))
+    rows = []
+    ok = True
+    for char_name, info in get_multiple_user_skill_info(user_id, skill_ids).items():
+        cid = char_ids.get(char_name)
+        total_sp = info.get("total_sp", 0)
+        age = get_char_age(cid)
+        ratio = None
+        if isinstance(age, (int, float)) and age > 0:  # Same guard as the HTML card.
+            sp_days = (total_sp - 384000) / 64800 if total_sp else 0
+            ratio = round(sp_days / age, 2)
+            if ratio >= 1:  # Red ratio in the HTML card.
+                ok = False
+        levels = []
+        for sid in skill_ids:
+            lv = info.get(sid, {"trained": 0, "active": 0})
+            for level in (lv["trained"], lv["active"]):
+                if level > 0 and sid != 3426 or level > 3:  # Red level in the HTML card.
+                    ok = False
+            levels.append([lv["trained"], lv["active"]])
+        rows.append([names.ref(cid, char_name), total_sp, age, ratio, levels])
+    columns = ["character", "total_sp", "age", "sp_age_ratio", "levels"]
+    return {"columns": columns, "rows": rows, "meta": {"skills": list(skill_ids)}}, ok
+
+
+CARD_BUILDERS = {
+    "compliance": _compliance,
+    "imp_bl": _characters,
+    "lawn_bl": _characters,
+    "corp_bl": _corp_bl,
+    "freq_corp": _freq_corp,
+    "awox": _awox,
+    "clone_states": _clone_states,
+    "sus_clones": _sus_clones,
+    "sus_asset": _sus_asset,
+    "sus_conta": _sus_conta,
+    "isk_flow": _isk_flow,
+    "cyno": _cyno,
+    "skills": _skills,
+}
+
+
+def build_card_data(request, user_id: int, key: str):
+    """Return (payload, status) for card `key`; payload carries its own `names` dictionary."""
+    builder = CARD_BUILDERS.get(key)
+    if builder is None:  # Streamed cards have their own paginated JSON endpoints.
+        return {"columns": [], "rows": [], "names": {}}, True
+    names = _Names()
+    payload, status = builder(request, user_id, names)
+    payload["names"] = names.names
+    return payload, status
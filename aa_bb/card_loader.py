@@ -0,0 +1,76 @@
+"""
+Concurrent card rendering for the bulk `load_cards` endpoints.
+
+Card builders are independent, so they run on a small thread pool and the
+request waits for them only until a shared deadline. Cards that finish in
+time are returned rendered; the rest come back flagged `deferred` so the
+dashboard fetches them one by one through `load_card`. Builders already
+running at the deadline are left to finish and fill the card cache, so their
+follow-up fetch is usually a cache hit; builders still queued are cancelled,
+and their follow-up `load_card` is a cold render.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Callable, Dict, List, Tuple
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CARD_POOL_SIZE = 4  # Cards rendered in parallel per request.
+CARD_TIMEOUT = 20  # Seconds a request waits before deferring unfinished cards.
+STREAMED_CARDS = ("sus_contr", "sus_mail", "sus_tra")  # Filled by SSE/paginated endpoints instead.
+
+
+def _in_thread(render_one: Callable[[str], Tuple[str, bool]], key: str):
+    """Run one card builder and release the pool thread's DB connections afterwards."""
+    try:
+        return render_one(key)
+    finally:
+        connections.close_all()
+
+
+def render_cards(
+    cards: List[Dict],
+    render_one: Callable[[str], Tuple[str, bool]],
+    pool_size: int = CARD_POOL_SIZE,
+    timeout: float = CARD_TIMEOUT,
+) -> List[Dict]:
+    """
+    Render `cards` (CARD_DEFINITIONS entries) concurrently with render_one(key).
+
+    Returns one payload per card, in card order:
+      { index, key, title, content, status }   rendered in time
+      { index, key, title, deferred: True }    timed out, fetch via load_card
+      { index, key, title, streamed: True }    streamed card, never rendered here
+    """
+    results: List[Dict] = []
+    pending = []
+    pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="aa_bb_card")
+    try:
+        for idx, card in enumerate(cards):
+            base = {"index": idx, "key": card["key"], "title": card["title"]}
+            results.append(base)
+            if card["key"] in STREAMED_CARDS:  # Rendered client-side from the streams.
+                base["streamed"] = True
+                continue
+            pending.append((base, pool.submit(_in_thread, render_one, card["key"])))
+
+        deadline = time.monotonic() + timeout
+        for base, future in pending:
+            try:
+                content, status = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                logger.info(f"Card {base['key']} exceeded {timeout}s; deferring to load_card.")
+                base["deferred"] = True
+                continue
+            except Exception as e:
+                logger.exception(f"Card {base['key']} failed")
+                content, status = f"<p>Error: {e}</p>", False
+            base["content"] = content
+            base["status"] = status
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)  # Queued builders are dropped; running ones finish.
+    return results
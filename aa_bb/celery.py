@@ -48,6 +48,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'aa_bb.tasks_cb.BB_send_opt_message5',
         'schedule': crontab(minute=0, hour=12),  # Every day at 12:00
     },
+    'BB-update-pap-rollups-every-hour': {
+        'task': 'aa_bb.tasks_paps.BB_update_pap_rollups',
+        'schedule': crontab(minute=30, hour='*'),  # Every hour at :30
+    },
     'BB-daily-DB-cleanup': {
         'task': 'aa_bb.tasks_cb.BB_daily_DB_cleanup',
         'schedule': crontab(minute=0, hour=1),  # Every day at 12:00
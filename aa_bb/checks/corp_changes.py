@@ -9,6 +9,7 @@ long a member has been in corp.
 import logging
 from datetime import timedelta
 from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from django.utils.timezone import now, timezone
 from allianceauth.authentication.models import CharacterOwnership
 from ..models import BigBrotherConfig
@@ -21,6 +22,7 @@ from ..app_settings import (
     get_character_employment,
 )
 from ..modelss import FrequentCorpChangesCache, CurrentStintCache
+from ..fragments import Cell, Table, render_tables
 
 logger = logging.getLogger(__name__)
 TTL_SHORT = timedelta(hours=4)
@@ -34,32 +36,23 @@ FORUMS_ICON     = "https://eve-offline.net/favicon.ico"
 EVESEARCH_ICON  = "https://eve-search.com/favicon.ico"
 
 
-def get_frequent_corp_changes(user_id):
+def get_corp_stints(user_id) -> list[dict]:
     """
-    Build (and cache) an HTML report showing each corp membership stint.
+    Every non-NPC corp membership stint of each of the user's characters:
 
-    Hostile corps/alliances are highlighted in-line and per-character tables
-    also include convenience links to the typical intel sites.
+      [ { char_id, char_name, stints: [ { corp_id, corp_name, start, end, days, hostile,
+            alliances: [ { alliance_id, alliance_name, start, end, hostile } ] } ] } ]
+
+    `alliances` only holds the alliance segments overlapping the stint; a corp
+    that sat outside any alliance gets an entry with alliance_id None.
     """
-    # Try 4h cache first
-    try:
-        cache = FrequentCorpChangesCache.objects.get(pk=user_id)
-        if timezone.now() - cache.updated < TTL_SHORT:  # Serve cached card for ~4h to limit upstream calls.
-            try:
-                cache.last_accessed = timezone.now()
-                cache.save(update_fields=["last_accessed"])
-            except Exception:
-                cache.save()
-            return format_html(cache.html)
-    except FrequentCorpChangesCache.DoesNotExist:
-        pass
     # Load hostile lists
     cfg = BigBrotherConfig.get_solo()
     hostile_corps = {int(cid) for cid in cfg.hostile_corporations.split(',') if cid}  # Precompute hostile corp IDs.
     hostile_alliances = {int(aid) for aid in cfg.hostile_alliances.split(',') if aid}  # Likewise for alliances.
 
-    characters = CharacterOwnership.objects.filter(user__id=user_id)
-    html = ""
+    characters = CharacterOwnership.objects.filter(user__id=user_id).select_related("character")
+    result = []
 
     for char in characters:
         char_name = str(char.character)
@@ -69,30 +62,7 @@ def get_frequent_corp_changes(user_id):
         except Exception:
             continue
 
-        char_links = (
-            f'<a href="https://zkillboard.com/character/{char_id}/" target="_blank">'
-            f'<img src="{ZKILL_ICON}" width="16" height="16" '
-            f'style="margin-left:4px;vertical-align:middle;"/></a> '
-            f'<a href="https://evewho.com/character/{char_id}" target="_blank">'
-            f'<img src="{EVEWHO_ICON}" width="16" height="16" '
-            f'style="margin-left:2px;vertical-align:middle;"/></a> '
-            f'<a href="https://www.eve411.com/character/{char_id}" target="_blank">'
-            f'<img src="{EVE411_ICON}" width="16" height="16" '
-            f'style="margin-left:2px;vertical-align:middle;"/></a> '
-            # Eve-Online forums user pages use the character name slug:
-            f'<a href="https://forums.eveonline.com/u/{char_name.replace(" ", "_")}/summary" '
-            f'target="_blank">'
-            f'<img src="{FORUMS_ICON}" width="16" height="16" '
-            f'style="margin-left:2px;vertical-align:middle;"/></a> '
-            # and eve-search needs URL‐encoded name:
-            f'<a href="https://eve-search.com/search/author/{char_name.replace(" ", "%20")}" '
-            f'target="_blank">'
-            f'<img src="{EVESEARCH_ICON}" width="16" height="16" '
-            f'style="margin-left:2px;vertical-align:middle;"/></a> '
-        )
-
-        rows = []
-
+        stints = []
         for idx, membership in enumerate(history):
             corp_id = membership['corporation_id']
             if is_npc_corporation(corp_id):  # Skip meaningless entries (NPC corps clutter the table).
@@ -101,85 +71,143 @@ def get_frequent_corp_changes(user_id):
             # Membership window
             start = ensure_datetime(membership['start_date'])
             end = ensure_datetime(history[idx+1]['start_date']) if idx+1 < len(history) else now()  # End date = next start or now.
-            total_days = (end - start).days
-
-            corp_name = get_corporation_info(corp_id)['name']
-            membership_range = f"{start.date()} - {end.date()}"
-
-            # Corp cell with external site favicons (fetched live)
-            corp_color = 'red' if (hostile_corps and corp_id in hostile_corps) else 'inherit'  # Highlight hostile corps.
-            corp_cell = (
-                f'<span style="color:{corp_color};">{corp_name}</span>'
-                f'<a href="https://zkillboard.com/corporation/{corp_id}/" target="_blank">'
-                f'<img src="{ZKILL_ICON}" width="16" height="16" style="margin-left:4px;vertical-align:middle;"/></a> '
-                f'<a href="https://evewho.com/corporation/{corp_id}" target="_blank">'
-                f'<img src="{EVEWHO_ICON}" width="16" height="16" style="margin-left:2px;vertical-align:middle;"/></a> '
-                f'<a href="https://evemaps.dotlan.net/corp/{corp_id}" target="_blank">'
-                f'<img src="{DOTLAN_ICON}" width="16" height="16" style="margin-left:2px;vertical-align:middle;"/></a> '
-            )
 
             # Alliance segments
-            alliances_html = []
-            periods_html = []
+            alliances = []
             alliance_history = get_alliance_history_for_corp(corp_id)
             for j, ent in enumerate(alliance_history):
                 a_start = ent['start_date']
                 a_end = alliance_history[j+1]['start_date'] if j+1 < len(alliance_history) else None
                 seg_start = max(start, a_start)
                 seg_end = min(end, a_end) if a_end else end
-                if seg_start < seg_end:  # Only render overlapping time periods (ignore non-overlaps).
+                if seg_start < seg_end:  # Only keep overlapping time periods (ignore non-overlaps).
                     aid = ent['alliance_id']
-                    aname = get_alliance_name(aid)
-                    period = f"{seg_start.date()} - {seg_end.date()}"
-
-                    if aid:  # Only render alliance rows when the corp was in an alliance.
-                        alliance_color = 'red' if (hostile_alliances and aid in hostile_alliances) else 'inherit'  # Flag hostile alliances.
-                        name_cell = f'<span style="color:{alliance_color};">{aname}</span>'
-                        icons = (
-                            f'<a href="https://zkillboard.com/alliance/{aid}/" target="_blank">'
-                            f'<img src="{ZKILL_ICON}" width="16" height="16" style="margin-left:4px;vertical-align:middle;"/></a> '
-                            f'<a href="https://evewho.com/alliance/{aid}" target="_blank">'
-                            f'<img src="{EVEWHO_ICON}" width="16" height="16" style="margin-left:2px;vertical-align:middle;"/></a> '
-                            f'<a href="https://evemaps.dotlan.net/alliance/{aid}" target="_blank">'
-                            f'<img src="{DOTLAN_ICON}" width="16" height="16" style="margin-left:2px;vertical-align:middle;"/></a> '
-                        )
-                    else:
-                        name_cell = '-'
-                        icons = ''
-                    alliances_html.append(name_cell + icons)
-                    periods_html.append(period)
+                    alliances.append({
+                        'alliance_id': aid or None,
+                        'alliance_name': get_alliance_name(aid) if aid else None,
+                        'start': seg_start,
+                        'end': seg_end,
+                        'hostile': bool(aid and aid in hostile_alliances),  # Flag hostile alliances.
+                    })
+
+            stints.append({
+                'corp_id': corp_id,
+                'corp_name': get_corporation_info(corp_id)['name'],
+                'start': start,
+                'end': end,
+                'days': (end - start).days,
+                'hostile': corp_id in hostile_corps,  # Highlight hostile corps.
+                'alliances': alliances,
+            })
+
+        result.append({'char_id': char_id, 'char_name': char_name, 'stints': stints})
+    return result
+
+
+def _char_links(char_id, char_name):
+    return mark_safe(
+        f'<a href="https://zkillboard.com/character/{char_id}/" target="_blank">'
+        f'<img src="{ZKILL_ICON}" width="16" height="16" '
+        f'style="margin-left:4px;vertical-align:middle;"/></a> '
+        f'<a href="https://evewho.com/character/{char_id}" target="_blank">'
+        f'<img src="{EVEWHO_ICON}" width="16" height="16" '
+        f'style="margin-left:2px;vertical-align:middle;"/></a> '
+        f'<a href="https://www.eve411.com/character/{char_id}" target="_blank">'
+        f'<img src="{EVE411_ICON}" width="16" height="16" '
+        f'style="margin-left:2px;vertical-align:middle;"/></a> '
+        # Eve-Online forums user pages use the character name slug:
+        f'<a href="https://forums.eveonline.com/u/{char_name.replace(" ", "_")}/summary" '
+        f'target="_blank">'
+        f'<img src="{FORUMS_ICON}" width="16" height="16" '
+        f'style="margin-left:2px;vertical-align:middle;"/></a> '
+        # and eve-search needs URL‐encoded name:
+        f'<a href="https://eve-search.com/search/author/{char_name.replace(" ", "%20")}" '
+        f'target="_blank">'
+        f'<img src="{EVESEARCH_ICON}" width="16" height="16" '
+        f'style="margin-left:2px;vertical-align:middle;"/></a> '
+    )
+
+
+def _org_icons(kind, org_id, dotlan_kind):
+    return mark_safe(
+        f'<a href="https://zkillboard.com/{kind}/{org_id}/" target="_blank">'
+        f'<img src="{ZKILL_ICON}" width="16" height="16" style="margin-left:4px;vertical-align:middle;"/></a> '
+        f'<a href="https://evewho.com/{kind}/{org_id}" target="_blank">'
+        f'<img src="{EVEWHO_ICON}" width="16" height="16" style="margin-left:2px;vertical-align:middle;"/></a> '
+        f'<a href="https://evemaps.dotlan.net/{dotlan_kind}/{org_id}" target="_blank">'
+        f'<img src="{DOTLAN_ICON}" width="16" height="16" style="margin-left:2px;vertical-align:middle;"/></a> '
+    )
+
+
+def get_frequent_corp_changes(user_id):
+    """
+    Build (and cache) an HTML report showing each corp membership stint.
+
+    Hostile corps/alliances are highlighted in-line and per-character tables
+    also include convenience links to the typical intel sites.
+    """
+    # Try 4h cache first
+    try:
+        cache = FrequentCorpChangesCache.objects.get(pk=user_id)
+        if timezone.now() - cache.updated < TTL_SHORT:  # Serve cached card for ~4h to limit upstream calls.
+            try:
+                cache.last_accessed = timezone.now()
+                cache.save(update_fields=["last_accessed"])
+            except Exception:
+                cache.save()
+            return mark_safe(cache.html)
+    except FrequentCorpChangesCache.DoesNotExist:
+        pass
+
+    tables = []
+    for char in get_corp_stints(user_id):
+        rows = []
+        for stint in char['stints']:
+            membership_range = f"{stint['start'].date()} - {stint['end'].date()}"
+
+            # Corp cell with external site favicons (fetched live)
+            corp_color = 'red' if stint['hostile'] else 'inherit'
+            corp_cell = (
+                format_html('<span style="color:{};">{}</span>', corp_color, stint['corp_name'])
+                + _org_icons("corporation", stint['corp_id'], "corp")
+            )
+
+            alliances_html = []
+            periods_html = []
+            for seg in stint['alliances']:
+                if seg['alliance_id']:  # Only render alliance names when the corp was in an alliance.
+                    alliance_color = 'red' if seg['hostile'] else 'inherit'
+                    alliances_html.append(
+                        format_html('<span style="color:{};">{}</span>', alliance_color, seg['alliance_name'])
+                        + _org_icons("alliance", seg['alliance_id'], "alliance")
+                    )
+                else:
+                    alliances_html.append('-')
+                periods_html.append(f"{seg['start'].date()} - {seg['end'].date()}")
 
             if not alliances_html:  # When no alliance data, fallback to corp membership range.
                 alliances_html = ['-']
                 periods_html = [membership_range]
 
             # Duration cell coloring only
+            total_days = stint['days']
             dur_color = 'red' if total_days < 10 else ('orange' if total_days < 30 else 'inherit')  # Quick visual for recent corps.
 
-            rows.append({
-                'corp_cell': corp_cell,
-                'membership_range': membership_range,
-                'alliances_html': '<br>'.join(alliances_html),
-                'periods_html': '<br>'.join(periods_html),
-                'total_days': total_days,
-                'dur_color': dur_color,
-            })
+            rows.append([
+                corp_cell,
+                membership_range,
+                mark_safe('<br>'.join(alliances_html)),
+                mark_safe('<br>'.join(periods_html)),
+                Cell(f"{total_days} days", style=f"color:{dur_color};"),
+            ])
 
-        html += format_html("<h3>{} {}</h3>", char_name, format_html(char_links))
-        html += '<table class="table table-striped">'
-        html += '<thead><tr><th>Corporation</th><th>Membership</th><th>Alliance(s)</th><th>Alliance Dates</th><th>Time in Corp</th></tr></thead><tbody>'
-        for r in rows:
-            row_html = (
-                '<tr>'
-                f'<td>{r["corp_cell"]}</td>'
-                f'<td>{r["membership_range"]}</td>'
-                f'<td>{r["alliances_html"]}</td>'
-                f'<td>{r["periods_html"]}</td>'
-                f'<td style="color:{r["dur_color"]};">{r["total_days"]} days</td>'
-                '</tr>'
-            )
-            html += format_html(row_html)
-        html += '</tbody></table>'
+        tables.append(Table(
+            format_html("{} {}", char['char_name'], _char_links(char['char_id'], char['char_name'])),
+            ["Corporation", "Membership", "Alliance(s)", "Alliance Dates", "Time in Corp"],
+            rows,
+        ))
+
+    html = render_tables(tables)
 
     # Save cache
     try:
@@ -188,7 +216,7 @@ def get_frequent_corp_changes(user_id):
         )
     except Exception:
         pass
-    return format_html(html)
+    return html
 
 def time_in_corp(user_id):
     """
@@ -10,8 +10,7 @@ from allianceauth.authentication.models import CharacterOwnership
 from corptools.models import CharacterAudit, CharacterAsset
 from .skills import get_user_skill_info, get_char_age
 from ..app_settings import get_user_characters, format_int, get_character_id
-from django.utils.html import format_html
-from django.utils.safestring import mark_safe
+from ..fragments import Cell, Table, render_tables
 from .corp_changes import get_current_stint_days_in_corp
 import logging
 from aa_bb.models import BigBrotherConfig as bbc
@@ -269,97 +268,68 @@ def owns_items_in_group(cid, gid):
     return exists
 
 
-def render_user_cyno_info_html(user_id: int) -> str:
+CYNO_SKILL_ROWS = (
+    ("cyno",     "Cynosural Field"),
+    ("cov_cyno", "Cynosural Field 5"),
+    ("recon",    "Recon"),
+    ("hic",      "HIC"),
+    ("blops",    "Black Ops"),
+    ("covops",   "Covert Ops"),
+    ("brun",     "Blockade Runners"),
+    ("sbomb",    "Stealth Bombers"),
+    ("scru",     "Stategic Cruisers"),
+    ("expfrig",  "Exploration Frigates"),
+    ("carrier",  "Carriers"),
+    ("dread",    "Dreads"),
+    ("fax",      "FAXes"),
+    ("super",    "Supers"),
+    ("titan",    "Titans"),
+    ("jf",       "Jump Freighters"),
+    ("rorq",     "Rorquals"),
+)
+
+
+def get_user_cyno_tables(user_id: int) -> list[Table]:
     """
-    Returns an HTML snippet showing, for each of the user's characters:
-      - for each skill: whether they can use it (no / yes but alpha / yes) and whether they own ships in that group
-      - whether they can light cynos (can_light)
-      - character age
+    One Table per character with, for each skill: whether they can use it
+    (no / yes but alpha / yes) and whether they own ships in that group,
+    followed by can-light, age and time-in-corp rows.
     """
     data = get_user_cyno_info(user_id)
-    html = ""
+    cfg = bbc.get_solo()
+    corp_label = f"Time in {cfg.main_corporation}"
+    tables = []
 
     for char_name, info in data.items():
-        # header
-        html += format_html("<h3>{}</h3>", char_name)
-
-        # table start
-        html += """
-        <table class="table table-striped">
-          <thead>
-            <tr>
-              <th>Name</th><th>Can use</th><th>Owns ships</th>
-            </tr>
-          </thead>
-          <tbody>
-        """
-
-        # loop through each skill
-        for key, label in (
-            ("cyno",     "Cynosural Field"),
-            ("cov_cyno", "Cynosural Field 5"),
-            ("recon",    "Recon"),
-            ("hic",      "HIC"),
-            ("blops",    "Black Ops"),
-            ("covops",   "Covert Ops"),
-            ("brun",     "Blockade Runners"),
-            ("sbomb",    "Stealth Bombers"),
-            ("scru",     "Stategic Cruisers"),
-            ("expfrig",  "Exploration Frigates"),
-            ("carrier",  "Carriers"),
-            ("dread",    "Dreads"),
-            ("fax",      "FAXes"),
-            ("super",    "Supers"),
-            ("titan",    "Titans"),
-            ("jf",       "Jump Freighters"),
-            ("rorq",     "Rorquals"),
-        ):
+        rows = []
+        for key, label in CYNO_SKILL_ROWS:
             s = info[f"s_{key}"]
             # map trained/active flag to human text
             if s == 0:  # No training whatsoever.
-                s_txt = "False"
+                s_cell = Cell("False")
             elif s == 1:  # Trained but alpha (passive) status.
-                s_txt = mark_safe('<span style="color:orange;">True (but alpha)</span>')
+                s_cell = Cell("True (but alpha)", style="color:orange;")
             else:  # s == 2
-                s_txt = mark_safe('<span style="color:red;">True</span>')
+                s_cell = Cell("True", style="color:red;")
             # only cyno has no “owns” flag
-            if info.get(f"i_{key}", "") == True:  # Highlight ship ownership in red when true.
-                owns = mark_safe(f'<span style="color:red;">{info.get(f"i_{key}", "")}</span>')
-            else:
-                owns = f'{info.get(f"i_{key}", "")}'
-            html += format_html(
-                "<tr><td>{}</td><td>{}</td><td>{}</td></tr>",
-                label, s_txt, owns
-            )
+            owns = info.get(f"i_{key}", "")
+            owns_cell = Cell(owns, style="color:red;") if owns == True else Cell(owns)  # Highlight ship ownership in red when true.
+            rows.append([label, s_cell, owns_cell])
 
         # add the “can light?” and age rows
-        if info["can_light"] == True:  # Emphasize characters that can currently light cynos.
-            can_light = mark_safe(f'<span style="color:red;">{info["can_light"]}</span>')
-        else:
-            can_light = f'{info["can_light"]}'
-        if info["age"] < 90:  # Flag younger characters; cyno alts often need vetting.
-            age = mark_safe(f'<span style="color:red;">{info["age"]}</span>')
-        else:
-            age = f'{info["age"]}'
-        html += format_html(
-            "<tr><td>Can light?</td><td colspan='2'>{}</td></tr>",
-            can_light
-        )
-        html += format_html(
-            "<tr><td>Age</td><td colspan='2'>{}</td></tr>",
-            age
-        )
+        red_light = info["can_light"] == True  # Emphasize characters that can currently light cynos.
+        young = info["age"] < 90  # Flag younger characters; cyno alts often need vetting.
+        rows.append(["Can light?", Cell(info["can_light"], style="color:red;" if red_light else "", colspan=2)])
+        rows.append(["Age", Cell(info["age"], style="color:red;" if young else "", colspan=2)])
+
         cid = get_character_id(char_name)
-        corp_label = f"Time in {bbc.get_solo().main_corporation}"
-        days_in_corp = get_current_stint_days_in_corp(cid,bbc.get_solo().main_corporation_id)
-        days_html = f"{days_in_corp} days"
+        days_in_corp = get_current_stint_days_in_corp(cid, cfg.main_corporation_id)
+        rows.append([corp_label, Cell(f"{days_in_corp} days", colspan=2)])
 
-        html += format_html(
-            "<tr><td>{}</td><td colspan='2'>{}</td></tr>",
-            corp_label, days_html
-        )
+        tables.append(Table(char_name, ["Name", "Can use", "Owns ships"], rows))
+    return tables
 
-        # table end
-        html += "</tbody></table>"
 
-    return format_html(html)
+def render_user_cyno_info_html(user_id: int) -> str:
+    """HTML for get_user_cyno_tables: one heading and table per character."""
+    return render_tables(get_user_cyno_tables(user_id))
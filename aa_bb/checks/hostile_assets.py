@@ -12,7 +12,7 @@ from allianceauth.authentication.models import CharacterOwnership
 from corptools.models import CharacterAudit, CharacterAsset, EveLocation
 from ..app_settings import get_system_owner
 from ..models import BigBrotherConfig
-from django.utils.html import format_html
+from ..fragments import Cell, render_table
 from typing import List, Optional, Dict
 import logging
 
@@ -110,29 +110,28 @@ def get_hostile_asset_locations(user_id: int) -> Dict[str, str]:
     return hostile_map
 
 
-def render_assets(user_id: int) -> Optional[str]:
+def get_asset_owners(user_id: int) -> List[Dict]:
     """
-    Returns an HTML table listing each system where the user's characters have assets,
-    the system's sovereign owner, and highlights in red any owner on the hostile list.
+    One entry per system where the user's characters have assets in space:
+    {system_id, system_name, owner_id, owner_name, hostile}.
     """
     systems = get_asset_locations(user_id)
-    if not systems:  # Nothing to render when no assets in space.
-        return None
+    if not systems:  # Nothing to resolve when no assets in space.
+        return []
 
     # Parse hostile IDs into a set of ints
     hostile_str = BigBrotherConfig.get_solo().hostile_alliances or ""
     hostile_ids = {int(s) for s in hostile_str.split(",") if s.strip().isdigit()}
     #logger.debug(f"Hostile IDs for assets: {hostile_ids}")
 
-    html = '<table class="table table-striped">'
-    html += '<thead><tr><th>System</th><th>Owner</th></tr></thead><tbody>'
-
+    owners = []
     for system_id, system_name in systems.items():
         # build the dict your get_system_owner() wants:
         owner_info = get_system_owner({
             "id":   system_id,
             "name": system_name or f"Unknown ({system_id})"
         })
+        oid = None
         if owner_info:
             try:
                 # owner_id might be '' or None
@@ -152,13 +151,28 @@ def render_assets(user_id: int) -> Optional[str]:
             oname = "—"
             hostile = False
 
-        # ← THIS must be indented inside the loop!
-        row_tpl = (
-            '<tr><td>{}</td><td style="color: red;">{}</td></tr>'
-            if hostile  # Highlight hostile ownership in red.
-            else '<tr><td>{}</td><td>{}</td></tr>'
-        )
-        html += format_html(row_tpl, system_name, oname)
+        owners.append({
+            "system_id": system_id,
+            "system_name": system_name,
+            "owner_id": oid,
+            "owner_name": oname,
+            "hostile": hostile,
+        })
+    return owners
+
+
+def render_assets(user_id: int) -> Optional[str]:
+    """
+    Returns an HTML table listing each system where the user's characters have assets,
+    the system's sovereign owner, and highlights in red any owner on the hostile list.
+    """
+    owners = get_asset_owners(user_id)
+    if not owners:  # Nothing to render when no assets in space.
+        return None
+
+    rows = []
+    for o in owners:
+        owner_cell = Cell(o["owner_name"], style="color: red;") if o["hostile"] else o["owner_name"]  # Highlight hostile ownership in red.
+        rows.append([o["system_name"], owner_cell])
 
-    html += "</tbody></table>"
-    return html
+    return render_table(["System", "Owner"], rows)
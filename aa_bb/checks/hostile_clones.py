@@ -16,6 +16,7 @@ from typing import List, Optional, Dict
 
 from ..app_settings import get_system_owner
 from ..models import BigBrotherConfig
+from ..fragments import Cell, render_table
 import logging
 
 logger = logging.getLogger(__name__)
@@ -114,23 +115,19 @@ def get_hostile_clone_locations(user_id: int) -> Dict[str, str]:
 
 
 
-def render_clones(user_id: int) -> Optional[str]:
+def get_clone_owners(user_id: int) -> List[Dict]:
     """
-    Returns an HTML table of clones, coloring hostile ones red,
-    and labeling & highlighting Unresolvable owners appropriately.
+    One entry per clone system:
+    {system_id, system_name, owner_id, owner_name, hostile, unresolvable}.
     """
     systems = get_clones(user_id)  # returns Dict[int, Optional[str]]
-    if not systems:  # No clones to report.
-        return None
+    if not systems:  # No clones to resolve.
+        return []
 
     hostile_str = BigBrotherConfig.get_solo().hostile_alliances or ""
     hostile_ids = {int(s) for s in hostile_str.split(",") if s.strip().isdigit()}
 
-    html = [
-        '<table class="table table-striped">',
-        '<thead><tr><th>System</th><th>Owner</th></tr></thead><tbody>'
-    ]
-
+    owners = []
     # systems: key = system_id, value = system_name (or None)
     for system_id, system_name in systems.items():
         # build the dict get_system_owner expects
@@ -145,24 +142,40 @@ def render_clones(user_id: int) -> Optional[str]:
             hostile = oid in hostile_ids or "Unresolvable" in oname
             unresolvable = False
         else:
+            oid = None
             oname = "Unresolvable"  # No sovereignty info returned.
             hostile = False
             unresolvable = True
 
-        if hostile:  # Highlight hostile entries in red.
-            row_tpl = '<tr><td>{}</td><td class="text-danger">{}</td></tr>'
-        elif unresolvable:  # Use warning styling for unknown owners.
-            row_tpl = '<tr><td>{}</td><td class="text-warning"><em>{}</em></td></tr>'
+        owners.append({
+            "system_id": system_id,
+            "system_name": system_name,
+            "owner_id": oid,
+            "owner_name": oname,
+            "hostile": hostile,
+            "unresolvable": unresolvable,
+        })
+    return owners
+
+
+def render_clones(user_id: int) -> Optional[str]:
+    """
+    Returns an HTML table of clones, coloring hostile ones red,
+    and labeling & highlighting Unresolvable owners appropriately.
+    """
+    owners = get_clone_owners(user_id)
+    if not owners:  # No clones to report.
+        return None
+
+    rows = []
+    for o in owners:
+        if o["hostile"]:  # Highlight hostile entries in red.
+            owner_cell = Cell(o["owner_name"], css_class="text-danger")
+        elif o["unresolvable"]:  # Use warning styling for unknown owners.
+            owner_cell = Cell(format_html("<em>{}</em>", o["owner_name"]), css_class="text-warning")
         else:  # Neutral owners get normal formatting.
-            row_tpl = '<tr><td>{}</td><td>{}</td></tr>'
-
-        html.append(
-            format_html(
-                row_tpl,
-                system_name or f"ID {system_id}",
-                oname
-            )
-        )
-
-    html.append('</tbody></table>')
-    return "".join(html)
+            owner_cell = o["owner_name"]
+
+        rows.append([o["system_name"] or f"ID {o['system_id']}", owner_cell])
+
+    return render_table(["System", "Owner"], rows)
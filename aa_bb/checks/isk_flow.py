@@ -0,0 +1,163 @@
+"""
+Per-counterparty ISK flow aggregation.
+
+Instead of listing journal rows one by one, these helpers let the database
+GROUP BY counterparty and return ISK in/out totals, counts and the first/last
+transaction date. Hostility is then resolved once per counterparty, which is
+what makes RMT or cash-outs to hostile alts visible at a glance.
+"""
+
+import html
+import logging
+
+from typing import Dict, List
+
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, When
+
+from ..app_settings import get_entity_info, get_user_characters
+from .corp_blacklist import check_char_corp_bl
+from corptools.models import CharacterWalletJournalEntry as WalletJournalEntry
+from ..models import BigBrotherConfig
+
+logger = logging.getLogger(__name__)
+
+FLOW_LIMIT = 50  # Counterparties shown in the card, ordered by volume.
+
+
+def _id_set(raw) -> set:
+    """Parse a comma-separated id list from BigBrotherConfig into a set of strings."""
+    return {s.strip() for s in (raw or "").split(",") if s.strip()}
+
+
+def aggregate_counterparty_flows(qs, own_ids) -> List[Dict]:
+    """
+    GROUP BY counterparty over a wallet journal queryset.
+
+    `qs` must expose `wallet_owner_id` (the wallet owner's id for each row); the
+    counterparty is whichever party is not the owner. Transfers between ids in
+    `own_ids` (alts / the corp itself) are left out.
+    """
+    own_ids = list(own_ids)
+    rows = (
+        qs.annotate(
+            counterparty_id=Case(
+                When(first_party_id=F("wallet_owner_id"), then=F("second_party_id")),
+                default=F("first_party_id"),
+            )
+        )
+        .exclude(counterparty_id__isnull=True)
+        .exclude(counterparty_id__in=own_ids)
+        .order_by()
+        .values("counterparty_id")
+        .annotate(
+            isk_in=Sum("amount", filter=Q(amount__gt=0)),
+            isk_out=Sum("amount", filter=Q(amount__lt=0)),
+            count_in=Count("pk", filter=Q(amount__gt=0)),
+            count_out=Count("pk", filter=Q(amount__lt=0)),
+            first_seen=Min("date"),
+            last_seen=Max("date"),
+        )
+    )
+    flows = []
+    for row in rows:
+        isk_in = row["isk_in"] or 0
+        isk_out = -(row["isk_out"] or 0)
+        flows.append({
+            **row,
+            "isk_in": isk_in,
+            "isk_out": isk_out,
+            "net": isk_in - isk_out,
+            "volume": isk_in + isk_out,
+        })
+    flows.sort(key=lambda f: f["volume"], reverse=True)
+    return flows
+
+
+def classify_counterparty_flows(flows: List[Dict]) -> List[Dict]:
+    """
+    Attach name/corp/alliance (as of the last transaction) and a hostile flag
+    to each aggregated counterparty. Runs one entity lookup per counterparty.
+    """
+    cfg = BigBrotherConfig.get_solo()
+    hostile_corps = _id_set(cfg.hostile_corporations)
+    hostile_allis = _id_set(cfg.hostile_alliances)
+    wl_corps = _id_set(cfg.whitelist_corporations)
+    wl_allis = _id_set(cfg.whitelist_alliances)
+
+    for flow in flows:
+        cp_id = flow["counterparty_id"]
+        info = get_entity_info(cp_id, flow["last_seen"])
+        corp_id = str(info.get("corp_id") or "")
+        alli_id = str(info.get("alli_id") or "")
+        flow.update({
+            "name": info["name"],
+            "corp_id": info["corp_id"],
+            "corp_name": info["corp_name"],
+            "alli_id": info["alli_id"],
+            "alli_name": info["alli_name"],
+        })
+        if corp_id in wl_corps or alli_id in wl_allis:  # Whitelisted counterparties are never flagged.
+            flow["hostile"] = False
+        else:
+            flow["hostile"] = bool(
+                check_char_corp_bl(cp_id)
+                or corp_id in hostile_corps
+                or alli_id in hostile_allis
+            )
+    return flows
+
+
+def gather_user_flows(user_id: int) -> List[Dict]:
+    """Aggregated, classified counterparty flows across all of a user's character wallets."""
+    user_ids = set(get_user_characters(user_id).keys())
+    qs = WalletJournalEntry.objects.filter(
+        character__character__character_id__in=user_ids
+    ).annotate(wallet_owner_id=F("character__character__character_id"))
+    return classify_counterparty_flows(aggregate_counterparty_flows(qs, user_ids))
+
+
+def shown_flows(flows: List[Dict], limit: int = FLOW_LIMIT) -> List[Dict]:
+    """The top `limit` flows by volume plus every hostile flow past it, in volume order."""
+    return [f for i, f in enumerate(flows) if i < limit or f["hostile"]]
+
+
+def render_flows(flows: List[Dict], limit: int = FLOW_LIMIT) -> str:
+    """
+    Render aggregated counterparty flows as an HTML table, hostile rows in red.
+
+    Only the top `limit` counterparties by volume are listed, but hostile
+    ones are always shown, however small.
+    """
+    if not flows:  # No wallet activity with outside parties.
+        return "<p>No wallet counterparties found.</p>"
+
+    headers = [
+        "Counterparty", "Corporation", "Alliance", "ISK In", "ISK Out",
+        "Net", "# In", "# Out", "First Seen", "Last Seen",
+    ]
+    parts = ['<table class="table table-striped">', "<thead>", "<tr>"]
+    parts.extend(f"<th>{h}</th>" for h in headers)
+    parts.extend(["</tr>", "</thead>", "<tbody>"])
+
+    shown = shown_flows(flows, limit)
+    for f in shown:
+        cells = [
+            f["name"], f["corp_name"], f["alli_name"],
+            f"{f['isk_in']:,.2f}", f"{f['isk_out']:,.2f}", f"{f['net']:,.2f}",
+            f["count_in"], f["count_out"],
+            f["first_seen"].strftime("%Y-%m-%d"), f["last_seen"].strftime("%Y-%m-%d"),
+        ]
+        tr_open = '<tr style="color: red;">' if f["hostile"] else "<tr>"
+        parts.append(tr_open + "".join(f"<td>{html.escape(str(c))}</td>" for c in cells) + "</tr>")
+
+    parts.extend(["</tbody>", "</table>"])
+    if len(shown) < len(flows):  # Let the reviewer know smaller counterparties are omitted.
+        extra = len(shown) - limit
+        note = f", plus {extra} smaller hostile ones" if extra else ""
+        parts.append(f"<p>Showing top {limit} of {len(flows)} counterparties by volume{note}.</p>")
+    return "\n".join(parts)
+
+
+def flows_ok(flows: List[Dict]) -> bool:
+    """Card status: True when no counterparty, listed or not, is hostile."""
+    return not any(f["hostile"] for f in flows)
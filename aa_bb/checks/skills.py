@@ -10,11 +10,11 @@ from allianceauth.authentication.models import CharacterOwnership
 from corptools.models import CharacterAudit, Skill, SkillTotals, CorporationHistory
 from django.utils.html import format_html
 from ..app_settings import get_user_characters, format_int, get_character_id
+from ..fragments import Cell, Table, render_tables
 import logging
 import json
 import os
 from typing import Dict
-from django.utils.safestring import mark_safe
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -169,20 +169,16 @@ def get_multiple_user_skill_info(user_id: int, skill_ids: list[int]) -> dict[str
 
     return result
 
-def render_user_skills_html(user_id: int) -> str:
+def get_user_skill_tables(user_id: int) -> list[Table]:
     """
-    Generates an HTML block containing:
-      - <h3>Character Name (total SP)</h3>
-      - <table> of skill levels (trained vs. active) for each skill_id in skill_ids
-    
-    No external links are included.
+    One Table per character, titled with name, total SP, age and SP/age
+    ratio, listing trained vs. active level for each skill_id in skill_ids.
     """
     skill_name_map = get_skill_map()
     # 1) Fetch all characters’ skill info in one go
     data = get_multiple_user_skill_info(user_id, skill_ids)
     # data is: { "CharName": { "total_sp": int, skill_id: {"trained": int, "active": int}, ... }, ... }
-    #logger.info(len(data))
-    html_parts = []
+    tables = []
     for char_name, info in data.items():
         total_sp = info.get("total_sp", 0)
         char_id = get_character_id(char_name)
@@ -195,63 +191,47 @@ def render_user_skills_html(user_id: int) -> str:
         # Guard against missing or zero age
         if isinstance(char_age, (int, float)) and char_age > 0:  # Only compute ratios when age data available.
             sp_age_ratio = round(sp_days / char_age, 2)
-            formatted = mark_safe(f'<span style="color:red;">{sp_age_ratio}</span>')
+            formatted = format_html('<span style="color:red;">{}</span>', sp_age_ratio)
             ratio_display = sp_age_ratio if sp_age_ratio < 1 else formatted
             age_display = char_age
         else:
             ratio_display = "N/A"
             age_display = "N/A"
 
-        # Header with total SP next to name
-        html_parts.append(format_html(
-            "<h3>{} (<b>{}</b> SP / <b>{}</b> days old / SP to Age ratio: <b>{}</b>)</h3>",
+        # Title with total SP next to name
+        title = format_html(
+            "{} (<b>{}</b> SP / <b>{}</b> days old / SP to Age ratio: <b>{}</b>)",
             char_name,
             format_int(total_sp),
             age_display,
             ratio_display,
-        ))
-
-        # Build table header
-        html_parts.append(
-            '<table class="table table-striped">'
-            '<thead><tr>'
-            '<th>Skill</th>'
-            '<th>Trained Level</th>'
-            '<th>Active Level</th>'
-            '</tr></thead>'
-            '<tbody>'
         )
 
         # One row per skill_id, following the global list order
+        rows = []
         for sid in skill_ids:
             levels = info.get(sid, {"trained": 0, "active": 0})
             trained = levels["trained"]
             active = levels["active"]
             style_t = ''
             style_a = ''
-            skill_name = skill_name_map.get(sid, str(sid))
             if trained > 0 and sid != 3426 or trained > 3:  # Highlight suspiciously high trained levels.
-                style_t = ' style="color:red;"'
+                style_t = "color:red;"
             if active > 0 and sid != 3426 or active > 3:  # Same for active levels beyond alpha caps.
-                style_a = ' style="color:red;"'
-            html_parts.append(format_html(
-                "<tr>"
-                "<td>{skill}</td>"
-                "<td {t_attr}>{t_val}</td>"
-                "<td {a_attr}>{a_val}</td>"
-                "</tr>",
-                skill=skill_name,
-                t_attr=mark_safe(style_t),
-                t_val=trained,
-                a_attr=mark_safe(style_a),
-                a_val=active,
-            ))
-
-        # Close table
-        html_parts.append("</tbody></table>")
-
-    # Join everything into one HTML-safe string
-    return format_html("".join(html_parts))
+                style_a = "color:red;"
+            rows.append([
+                skill_name_map.get(sid, str(sid)),
+                Cell(trained, style=style_t),
+                Cell(active, style=style_a),
+            ])
+
+        tables.append(Table(title, ["Skill", "Trained Level", "Active Level"], rows))
+    return tables
+
+
+def render_user_skills_html(user_id: int) -> str:
+    """HTML for get_user_skill_tables; no external links are included."""
+    return render_tables(get_user_skill_tables(user_id))
 
 def get_char_age(char_id: int) -> int | None:
     """
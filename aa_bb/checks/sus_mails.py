@@ -5,13 +5,14 @@ These helpers normalize MailMessage rows, detect suspicious senders or
 recipients, and persist short notes for repeated reporting.
 """
 
-import html
 import logging
 
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 from functools import lru_cache
 from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 
 from ..app_settings import (
     is_npc_corporation,
@@ -29,6 +30,7 @@ from ..app_settings import (
 from .corp_blacklist import check_char_corp_bl
 from corptools.models import MailMessage, MailRecipient
 from ..models import BigBrotherConfig, ProcessedMail, SusMailNote
+from ..fragments import Cell, render_table
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -202,14 +204,10 @@ def render_mails(user_id: int) -> str:
         'recipient_names', 'recipient_corps', 'recipient_alliances', 'status',
     ]
 
-    # Build HTML table
-    html_parts = ['<table class="table table-striped">', '<thead><tr>']
-    for col in VISIBLE:
-        html_parts.append(f'<th>{html.escape(col.replace("_", " ").title())}</th>')
-    html_parts.append('</tr></thead><tbody>')
-
+    cfg = BigBrotherConfig.get_solo()
+    table_rows = []
     for row in display:
-        html_parts.append('<tr>')
+        cells = []
         for col in VISIBLE:
             val = row.get(col, '')
             # recipients come as lists
@@ -222,51 +220,43 @@ def render_mails(user_id: int) -> str:
                         rid = row['recipient_ids'][idx]
                         if check_char_corp_bl(rid):  # Highlight individual recipients on the blacklist.
                             style = 'color:red;'
-                        elif str(row['recipient_corp_ids'][idx]) in BigBrotherConfig.get_solo().hostile_corporations:  # Recipient corp flagged hostile.
+                        elif str(row['recipient_corp_ids'][idx]) in cfg.hostile_corporations:  # Recipient corp flagged hostile.
                             style = 'color:red;'
-                        elif str(row['recipient_alliance_ids'][idx]) in BigBrotherConfig.get_solo().hostile_alliances:  # Recipient alliance flagged hostile.
+                        elif str(row['recipient_alliance_ids'][idx]) in cfg.hostile_alliances:  # Recipient alliance flagged hostile.
                             style = 'color:red;'
                     elif col == 'recipient_corps':  # Corp column uses corp id list for styling.
                         cid = row['recipient_corp_ids'][idx]
-                        if cid and str(cid) in BigBrotherConfig.get_solo().hostile_corporations:  # Hostile corporation entry.
+                        if cid and str(cid) in cfg.hostile_corporations:  # Hostile corporation entry.
                             style = 'color:red;'
                     elif col == 'recipient_alliances':  # Alliance column uses alliance ids.
                         aid = row['recipient_alliance_ids'][idx]
-                        if aid and str(aid) in BigBrotherConfig.get_solo().hostile_alliances:  # Hostile alliance entry.
+                        if aid and str(aid) in cfg.hostile_alliances:  # Hostile alliance entry.
                             style = 'color:red;'
 
                     if style:  # Wrap each entry in a span to apply per-recipient color.
-                        prefix = f"<span style='{style}'>"
+                        parts.append(format_html("<span style='{}'>{}</span>", style, item))
                     else:
-                        prefix = "<span>"
-
-                    parts.append(f"{prefix}{html.escape(str(item))}</span>")
-                cell = '<td>' + ', '.join(parts) + '</td>'
+                        parts.append(format_html("<span>{}</span>", item))
+                cells.append(mark_safe(', '.join(parts)))
             else:
                 # single-value columns
                 style = ''
                 if col.startswith('sender_'):  # Sender cells reuse the same hostile checks as the list-based helper.
                     if col == 'sender_name' and check_char_corp_bl(row['sender_id']):  # Sender is blacklisted.
                         style = 'color:red;'
-                    elif col == 'sender_corporation' and str(row['sender_corporation_id']) in BigBrotherConfig.get_solo().hostile_corporations:  # Sender corp hostility.
+                    elif col == 'sender_corporation' and str(row['sender_corporation_id']) in cfg.hostile_corporations:  # Sender corp hostility.
                         style = 'color:red;'
-                    elif col == 'sender_alliance' and str(row['sender_alliance_id']) in BigBrotherConfig.get_solo().hostile_alliances:  # Sender alliance hostility.
+                    elif col == 'sender_alliance' and str(row['sender_alliance_id']) in cfg.hostile_alliances:  # Sender alliance hostility.
                         style = 'color:red;'
                 # subject/content keyword highlighting can be done client-side
-                if style:  # Only emit style attribute when a highlight is needed.
-                    style_attr = f" style='{style}'"
-                else:
-                    style_attr = ""
-                cell = f"<td{style_attr}>{html.escape(str(val))}</td>"
-
-            html_parts.append(cell)
-        html_parts.append('</tr>')
+                cells.append(Cell(val, style=style))
+        table_rows.append(cells)
 
-    html_parts.append('</tbody></table>')
+    out = render_table([col.replace("_", " ").title() for col in VISIBLE], table_rows)
     if skipped:  # Alert reviewers when more hostile mails exist beyond the table.
-        html_parts.append(f'<p>Showing {limit} of {total} hostile mails; skipped {skipped}.</p>')
+        out += format_html('<p>Showing {} of {} hostile mails; skipped {}.</p>', limit, total, skipped)
 
-    return '\n'.join(html_parts)
+    return out
 
 
 
@@ -13,7 +13,7 @@ from allianceauth.eveonline.models import EveCorporationInfo
 from corptools.models import CorporationAudit, CorpAsset, EveLocation
 from ..app_settings import get_system_owner
 from ..models import BigBrotherConfig
-from django.utils.html import format_html
+from ..fragments import Cell, render_table
 from typing import List, Optional, Dict
 import logging
 
@@ -120,9 +120,7 @@ def render_assets(corp_id: int) -> Optional[str]:
     hostile_ids = {int(s) for s in hostile_str.split(",") if s.strip().isdigit()}
     #logger.debug(f"Hostile IDs for assets: {hostile_ids}")
 
-    html = '<table class="table table-striped">'
-    html += '<thead><tr><th>System</th><th>Owner</th></tr></thead><tbody>'
-
+    rows = []
     for system_id, system_name in systems.items():
         # build the dict your get_system_owner() wants:
         owner_info = get_system_owner({
@@ -149,12 +147,9 @@ def render_assets(corp_id: int) -> Optional[str]:
             oname = "—"
             hostile = False
 
-        # ← THIS must be indented inside the loop!
         if hostile:  # Paint hostile ownership red for attention.
-            row_tpl = '<tr><td>{}</td><td style="color: red;">{}</td></tr>'
+            rows.append([system_name, Cell(oname, style="color: red;")])
         else:  # Neutral owners get default styling.
-            row_tpl = '<tr><td>{}</td><td>{}</td></tr>'
-        html += format_html(row_tpl, system_name, oname)
+            rows.append([system_name, oname])
 
-    html += "</tbody></table>"
-    return html
+    return render_table(["System", "Owner"], rows)
@@ -0,0 +1,31 @@
+"""
+Corporate counterpart of checks.isk_flow: per-counterparty ISK flows across
+every wallet division of a corporation, summarized in one GROUP BY query.
+"""
+
+import logging
+
+from typing import Dict, List
+
+from django.db.models import BigIntegerField, Value
+
+from aa_bb.checks.isk_flow import (
+    aggregate_counterparty_flows,
+    classify_counterparty_flows,
+)
+from corptools.models import CorporationAudit, CorporationWalletJournalEntry
+from allianceauth.eveonline.models import EveCorporationInfo
+
+logger = logging.getLogger(__name__)
+
+
+def gather_corp_flows(corp_id: int) -> List[Dict]:
+    """Aggregated, classified counterparty flows for all wallet divisions of a corp."""
+    corp_id = int(corp_id)
+    corp_info = EveCorporationInfo.objects.get(corporation_id=corp_id)
+    corp_audit = CorporationAudit.objects.get(corporation=corp_info)
+
+    qs = CorporationWalletJournalEntry.objects.filter(
+        division__corporation=corp_audit
+    ).annotate(wallet_owner_id=Value(corp_id, output_field=BigIntegerField()))
+    return classify_counterparty_flows(aggregate_counterparty_flows(qs, {corp_id}))
@@ -8,6 +8,7 @@ import logging
 from typing import Dict, Optional, List
 from datetime import datetime
 
+from django.db.models import Q
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -67,7 +68,6 @@ def gather_user_transactions(corp_id: int):
     corp_audit = CorporationAudit.objects.get(corporation=corp_info)
 
     qs = CorporationWalletJournalEntry.objects.filter(division__corporation=corp_audit)
-    logger.info(f"qs:{qs.count()}")
     return qs
 
 
@@ -232,11 +232,51 @@ def render_transactions(corp_id: int) -> str:
     return '\n'.join(parts)
 
 
-def get_corp_hostile_transactions(corp_id: int) -> Dict[int, str]:
+def _entries_past_watermarks(qs_all, watermarks: dict):
+    """
+    Narrow qs_all to journal rows above each wallet division's high-water mark.
+
+    Returns (queryset, new_marks) where new_marks holds the newest
+    {entry_id, date} per division id seen in that slice; the caller stores it
+    once the slice has been processed.
+    """
+    division_ids = list(
+        qs_all.model._meta.get_field("division").related_model.objects
+        .filter(pk__in=qs_all.order_by().values("division_id"))
+        .values_list("pk", flat=True)
+    )
+    slice_filter = Q(pk__in=[])
+    new_marks = {}
+    for div_id in division_ids:
+        mark = (watermarks.get(str(div_id)) or {}).get("entry_id") or 0
+        div_filter = Q(division_id=div_id, entry_id__gt=mark)
+        slice_filter |= div_filter
+        top = (
+            qs_all.filter(div_filter)
+            .order_by("-entry_id")
+            .values("entry_id", "date")
+            .first()
+        )
+        if top:  # Division has journal rows past its mark.
+            new_marks[str(div_id)] = {
+                "entry_id": top["entry_id"],
+                "date": top["date"].isoformat() if top["date"] else None,
+            }
+    return qs_all.filter(slice_filter), new_marks
+
+
+def get_corp_hostile_transactions(corp_id: int, watermarks: dict | None = None) -> Dict[int, str]:
     """
     Persist and return formatted notes for hostile corporate transactions.
+
+    When `watermarks` (CorpStatus.trans_watermarks) is passed, only journal
+    rows above each division's high-water mark are scanned and the dict is
+    advanced in place once they have been processed.
     """
     qs_all = gather_user_transactions(corp_id)
+    new_marks = {}
+    if watermarks is not None:  # Incremental scan: skip everything already below the marks.
+        qs_all, new_marks = _entries_past_watermarks(qs_all, watermarks)
     all_ids = list(qs_all.values_list('entry_id', flat=True))
     seen = set(ProcessedTransaction.objects.filter(entry_id__in=all_ids)
                                               .values_list('entry_id', flat=True))
@@ -295,6 +335,9 @@ def get_corp_hostile_transactions(corp_id: int) -> Dict[int, str]:
             )
             notes[eid] = note
 
+    if watermarks is not None:  # Advance marks only after the slice was processed.
+        watermarks.update(new_marks)
+
     for note_obj in SusTransactionNote.objects.filter(user_id=corp_id):  # Merge previously stored notes to maintain history.
         notes[note_obj.transaction.entry_id] = note_obj.note
 
@@ -0,0 +1,290 @@
+"""
+Sharded, resumable EntityInfoCache warmer shared by the BigBrother and
+CorpBrother dashboards.
+
+A warm run diffs the wanted (entity_id, as_of) pairs against EntityInfoCache,
+splits what is missing into at most MAX_SHARDS shards and hands them to Celery.
+One atomic cache `add` acts as a lease per pilot/corp, shards count progress in
+the cache and flush it to WarmProgress every FLUSH_INTERVAL seconds, and the
+last shard to finish cleans up. Because each run starts from a fresh diff, an
+interrupted run simply resumes with whatever is still missing.
+
+prewarm_user_task runs the same pipeline ahead of time, at low priority, when
+an applicant's audit is created or corptools refreshes the data the suspicious
+contract/mail/journal cards read (see signals.py).
+
+Every WarmProgress change is also published as a versioned snapshot in the
+cache; the async warm-progress SSE streams (views_async) relay new versions to
+open dashboards, so watching a warm-up costs cache reads instead of a
+DB-backed poll per client.
+"""
+
+import json
+import logging
+import math
+import time
+import uuid
+from datetime import datetime
+
+from celery import shared_task
+from django.core.cache import cache
+
+from .app_settings import get_entity_info, bucket_as_of, get_character_id, get_main_character_name
+from .models import BigBrotherConfig, EntityInfoCache, WarmProgress
+
+logger = logging.getLogger(__name__)
+
+DIFF_CHUNK = 500  # Wanted pairs checked against the cache per query.
+SHARD_SIZE = 25  # Smallest shard worth its own Celery task.
+MAX_SHARDS = 8  # Upper bound on shards (and so parallel ESI lookups) per run.
+FLUSH_INTERVAL = 5  # Seconds between WarmProgress writes per shard.
+LEASE_TTL = 300  # Seconds; renewed by every flush, so only a dead run lets it lapse.
+COUNTER_TTL = 24 * 60 * 60
+
+PROGRESS_KEY = "aa_bb:warm:progress"
+PROGRESS_VERSION_KEY = "aa_bb:warm:progress_version"
+STREAM_POLL = 1  # Seconds between cache checks per open progress stream.
+STREAM_PING = 15  # Seconds between keep-alive comments when nothing changed.
+STREAM_LIFETIME = 600  # Seconds; EventSource reconnects on its own afterwards.
+
+PREWARM_DEBOUNCE = 15 * 60  # Seconds; one pre-warm per user per window, however many saves fire.
+PREWARM_DELAY = 5 * 60  # Seconds; let the rest of a corptools update chain land first.
+PREWARM_PRIORITY = 9  # Lowest Celery priority so dashboards and CT updates go first.
+
+
+def _key(kind: str, ident: str) -> str:
+    """Cache key; the lease is keyed by pilot/corp, run counters by lease token."""
+    return f"aa_bb:warm:{kind}:{ident}"
+
+
+def progress_payload() -> dict:
+    """
+    All in-flight and queued warm-ups:
+      { in_progress: bool, users: [ { user, current, total }, … ], queued: { count, names } }
+    """
+    rows = list(WarmProgress.objects.all())
+    users = [
+        {"user": wp.user_main, "current": wp.current, "total": wp.total}
+        for wp in rows
+    ]
+    # Those still at current == 0 are queued/not yet started
+    queued_names = [wp.user_main for wp in rows if wp.current == 0]
+    return {
+        "in_progress": bool(users),
+        "users": users,
+        "queued": {
+            "count": len(queued_names),
+            "names": queued_names,
+        },
+    }
+
+
+def publish_progress() -> None:
+    """Store a fresh progress snapshot and bump its version for the SSE relays."""
+    cache.set(PROGRESS_KEY, progress_payload(), None)
+    try:
+        cache.incr(PROGRESS_VERSION_KEY)
+    except ValueError:  # First publish (or the cache was flushed).
+        cache.set(PROGRESS_VERSION_KEY, 1, None)
+
+
+def progress_event(payload: dict) -> str:
+    return f"event: progress\ndata:{json.dumps(payload)}\n\n"
+
+
+def user_warm_candidates(user_id: int) -> list:
+    """(entity_id, as_of) pairs the suspicious contract/mail/transaction cards will look up for a user."""
+    from .checks.sus_contracts import gather_user_contracts
+    from .checks.sus_mails import gather_user_mails
+    from .checks.sus_trans import gather_user_transactions
+
+    candidates = []
+    for c in gather_user_contracts(user_id):
+        issuer_id = get_character_id(c.issuer_name)
+        candidates.append((issuer_id, getattr(c, "date_issued")))
+        assignee = c.assignee_id or c.acceptor_id
+        candidates.append((assignee, getattr(c, "date_issued")))
+    for m in gather_user_mails(user_id):
+        candidates.append((m.from_id, getattr(m, "timestamp")))
+        for mr in m.recipients.all():
+            candidates.append((mr.recipient_id, getattr(m, "timestamp")))
+    for t in gather_user_transactions(user_id):
+        candidates.append((t.first_party_id, getattr(t, "date")))
+        candidates.append((t.second_party_id, getattr(t, "date")))
+    return candidates
+
+
+def schedule_prewarm(user_id: int) -> bool:
+    """
+    Queue a low-priority pre-warm for user_id unless one was queued recently.
+    Returns True when a task was enqueued.
+    """
+    if not user_id:  # Unowned characters have no dashboard to warm.
+        return False
+    if not BigBrotherConfig.get_solo().is_warmer_active:  # Warmer disabled by admins.
+        return False
+    if not cache.add(f"aa_bb:prewarm:{user_id}", 1, PREWARM_DEBOUNCE):  # Already queued in this window.
+        return False
+    prewarm_user_task.apply_async(
+        args=[user_id], countdown=PREWARM_DELAY, priority=PREWARM_PRIORITY
+    )
+    return True
+
+
+def acquire_lease(user_main: str) -> str | None:
+    """Atomically claim the warm lease for user_main; returns the lease token or None if held."""
+    token = uuid.uuid4().hex
+    if cache.add(_key("lease", user_main), token, LEASE_TTL):  # SET NX on redis.
+        return token
+    return None
+
+
+def _owns_lease(user_main: str, token: str) -> bool:
+    return cache.get(_key("lease", user_main)) == token
+
+
+def _hold_lease(user_main: str, token: str) -> bool:
+    """
+    True when token owns the lease, re-claiming it if it lapsed without a
+    newer run taking over (e.g. shards waited in a busy queue past LEASE_TTL).
+    """
+    key = _key("lease", user_main)
+    if cache.add(key, token, LEASE_TTL):  # Lapsed and unclaimed: still ours.
+        return True
+    return cache.get(key) == token
+
+
+def release_lease(user_main: str, token: str) -> None:
+    """Drop the lease if it still belongs to token."""
+    if _owns_lease(user_main, token):  # Never release a lease a newer run has taken over.
+        cache.delete(_key("lease", user_main))
+
+
+def missing_pairs(candidates) -> list[tuple[int, datetime]]:
+    """
+    Return the distinct (entity_id, as_of) pairs from candidates that are not cached yet.
+
+    Pairs are bucketed like get_entity_info and checked in DIFF_CHUNK-sized
+    batches; each batch is one `entity_id IN (...) AND as_of IN (...)` query
+    on the unique index, filtered down to exact pairs in Python.
+    """
+    wanted = sorted({
+        (int(eid), bucket_as_of(ts))
+        for eid, ts in candidates
+        if eid is not None and ts is not None
+    })
+    missing = []
+    for i in range(0, len(wanted), DIFF_CHUNK):
+        chunk = wanted[i:i + DIFF_CHUNK]
+        have = set(
+            EntityInfoCache.objects.filter(
+                entity_id__in={eid for eid, _ in chunk},
+                as_of__in={ts for _, ts in chunk},
+            ).values_list("entity_id", "as_of")
+        )
+        missing.extend(pair for pair in chunk if pair not in have)
+    return missing
+
+
+def start_warm(user_main: str, candidates) -> int | None:
+    """
+    Diff candidates against the cache and dispatch shard tasks for the gap.
+
+    Returns the number of pairs queued, or None when another run holds the lease.
+    """
+    token = acquire_lease(user_main)
+    if token is None:  # A live run already owns this pilot/corp.
+        logger.info(f"[{user_main}] warm lease held by another run; skipping.")
+        return None
+
+    dispatched = False
+    try:
+        entries = missing_pairs(candidates)
+        total = len(entries)
+        logger.info(f"Starting warm cache for {user_main} ({total} entries)")
+        WarmProgress.objects.update_or_create(
+            user_main=user_main,
+            defaults={"current": 0, "total": total}
+        )
+        publish_progress()
+        if not entries:  # Everything is cached already.
+            dispatched = True
+            _finish(user_main, token)
+            return 0
+
+        n_shards = min(MAX_SHARDS, math.ceil(total / SHARD_SIZE))
+        cache.set(_key("done", token), 0, COUNTER_TTL)
+        cache.set(_key("shards", token), n_shards, COUNTER_TTL)
+        for i in range(n_shards):
+            shard = [(eid, ts.isoformat()) for eid, ts in entries[i::n_shards]]
+            warm_entity_shard_task.delay(user_main, token, shard)
+        dispatched = True
+        return total
+    finally:
+        if not dispatched:  # Failed before any shard ran; don't block retries for LEASE_TTL.
+            release_lease(user_main, token)
+
+
+def _flush(user_main: str, token: str) -> None:
+    """Copy the cache counter into WarmProgress and extend the lease."""
+    if not _hold_lease(user_main, token):  # A newer run owns the progress row now.
+        return
+    done = cache.get(_key("done", token)) or 0
+    WarmProgress.objects.filter(user_main=user_main).update(current=done)
+    publish_progress()
+    cache.touch(_key("lease", user_main), LEASE_TTL)
+
+
+def _finish(user_main: str, token: str) -> None:
+    """
+    Drop the run's counters and, unless a newer run has taken the lease over,
+    its progress row. A lease that merely lapsed is re-claimed first, so the
+    row never outlives the run.
+    """
+    cache.delete_many([_key("done", token), _key("shards", token)])
+    if _hold_lease(user_main, token):  # Leave a newer run's progress untouched.
+        WarmProgress.objects.filter(user_main=user_main).delete()
+        cache.delete(_key("lease", user_main))
+        publish_progress()
+    logger.info(f"Completed warm cache for {user_main}")
+
+
+@shared_task(bind=True)
+def warm_entity_shard_task(self, user_main, token, pairs):
+    """Hydrate one shard of (entity_id, iso timestamp) pairs for a warm run."""
+    last_flush = time.monotonic()
+    try:
+        for eid, ts in pairs:
+            try:
+                get_entity_info(eid, datetime.fromisoformat(ts))
+            except Exception as e:
+                logger.warning(f"[{user_main}] warm failed for {eid} @ {ts}: {e}")
+            try:
+                cache.incr(_key("done", token))
+            except ValueError:  # Counter expired; progress display only.
+                pass
+            if time.monotonic() - last_flush >= FLUSH_INTERVAL:  # Periodic DB write instead of one per item.
+                if not _hold_lease(user_main, token):  # Lease lost: a newer run took over.
+                    logger.info(f"[{user_main}] warm lease lost; stopping shard.")
+                    return
+                _flush(user_main, token)
+                last_flush = time.monotonic()
+    finally:
+        try:
+            remaining = cache.decr(_key("shards", token))
+        except ValueError:
+            remaining = 0
+        if remaining <= 0:  # Last shard out cleans up.
+            _finish(user_main, token)
+        else:
+            _flush(user_main, token)
+
+
+@shared_task
+def prewarm_user_task(user_id):
+    """Warm the entity cache for a user before anyone opens their dashboard."""
+    user_main = get_main_character_name(user_id) or str(user_id)
+    total = start_warm(user_main, user_warm_candidates(user_id))
+    if total is None:  # A dashboard-triggered run is already on it.
+        return 0
+    return total
@@ -0,0 +1,77 @@
+"""
+Small HTML rendering layer for the check cards.
+
+Checks describe their output as structured data: a list of `Table`s whose rows
+are lists of `Cell`s (or plain values). `render_tables` turns that into HTML
+in a single `''.join` pass, escaping every value exactly once, so render time
+stays linear in the number of cells.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Sequence
+
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+TABLE_CLASS = "table table-striped"
+
+
+@dataclass(frozen=True)
+class Cell:
+    """
+    One table cell. `value` is escaped unless it is already safe HTML
+    (mark_safe/format_html), which is how links and icons are passed through.
+    """
+    value: Any
+    style: str = ""
+    css_class: str = ""
+    colspan: int = 1
+
+
+@dataclass
+class Table:
+    """A titled table; `title` may be plain text or safe HTML."""
+    title: Any
+    headers: Sequence[str]
+    rows: List[Sequence[Any]] = field(default_factory=list)
+
+
+def _td(cell) -> str:
+    if not isinstance(cell, Cell):  # Plain values need no attributes.
+        return f"<td>{conditional_escape(cell)}</td>"
+    attrs = ""
+    if cell.css_class:  # Bootstrap text-* classes drive some card status checks.
+        attrs += f' class="{cell.css_class}"'
+    if cell.style:  # Inline colour highlights.
+        attrs += f' style="{cell.style}"'
+    if cell.colspan > 1:  # Summary rows span the value columns.
+        attrs += f' colspan="{cell.colspan}"'
+    return f"<td{attrs}>{conditional_escape(cell.value)}</td>"
+
+
+def _table_chunks(headers: Sequence[str], rows: Iterable[Sequence[Any]]):
+    yield f'<table class="{TABLE_CLASS}"><thead><tr>'
+    for h in headers:
+        yield f"<th>{conditional_escape(h)}</th>"
+    yield "</tr></thead><tbody>"
+    for row in rows:
+        yield "<tr>"
+        for cell in row:
+            yield _td(cell)
+        yield "</tr>"
+    yield "</tbody></table>"
+
+
+def render_table(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> str:
+    """Render one striped table."""
+    return mark_safe("".join(_table_chunks(headers, rows)))
+
+
+def render_tables(tables: Iterable[Table], heading: str = "h3") -> str:
+    """Render each table under its own heading."""
+    def chunks():
+        for t in tables:
+            yield f"<{heading}>{conditional_escape(t.title)}</{heading}>"
+            yield from _table_chunks(t.headers, t.rows)
+    return mark_safe("".join(chunks()))
+
@@ -0,0 +1,57 @@
+"""
+Cached state for the BigBrother sidebar entries.
+
+Alliance Auth renders every menu hook on every page, so the hooks in
+auth_hooks.py must not query the database on their own. The DLC toggles they
+need are snapshotted once into the cache (refreshed when BigBrotherConfig is
+saved) and memoized on the request; the pending-LoA badge count is kept in the
+cache and recomputed by the LeaveRequest save/delete signals.
+"""
+
+from django.core.cache import cache
+
+from .models import BigBrotherConfig
+from .modelss import LeaveRequest
+
+MENU_FLAGS_KEY = "aa_bb:menu:flags"
+PENDING_LOA_KEY = "aa_bb:menu:pending_loa"
+MENU_TTL = 24 * 60 * 60  # Seconds; signals keep both keys fresh, the TTL only bounds drift.
+_REQUEST_ATTR = "_aa_bb_menu_flags"
+
+
+def _load_flags() -> dict:
+    try:
+        cfg = BigBrotherConfig.get_solo()
+    except BigBrotherConfig.DoesNotExist:
+        return {}
+    return {field: bool(getattr(cfg, field)) for field in BigBrotherConfig.DLC_FLAG_MAP.values()}
+
+
+def menu_flags(request) -> dict:
+    """DLC toggles ({dlc_*_active: bool}) for this request; at most one cache read per request."""
+    flags = getattr(request, _REQUEST_ATTR, None)
+    if flags is None:  # First menu hook rendered for this request.
+        flags = cache.get(MENU_FLAGS_KEY)
+        if flags is None:  # Cold cache or config just saved.
+            flags = _load_flags()
+            cache.set(MENU_FLAGS_KEY, flags, MENU_TTL)
+        setattr(request, _REQUEST_ATTR, flags)
+    return flags
+
+
+def invalidate_menu_flags() -> None:
+    cache.delete(MENU_FLAGS_KEY)
+
+
+def refresh_pending_loa_count() -> int:
+    """Recount pending LoA requests into the cache; called whenever a LeaveRequest changes."""
+    count = LeaveRequest.objects.filter(status="pending").count()
+    cache.set(PENDING_LOA_KEY, count, MENU_TTL)
+    return count
+
+
+def pending_loa_count() -> int:
+    count = cache.get(PENDING_LOA_KEY)
+    if count is None:  # Cold cache: one count, then signals take over.
+        count = refresh_pending_loa_count()
+    return count
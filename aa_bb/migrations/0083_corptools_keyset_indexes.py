@@ -0,0 +1,35 @@
+"""
+Covering indexes for the keyset-paginated contract/mail/journal endpoints.
+"""
+
+from django.db import migrations
+
+from ._corptools_indexes import create_indexes, drop_indexes
+
+KEYSET_INDEXES = [
+    # (index name, table, columns)
+    ("aa_bb_ks_contract", "corptools_contract", ["character_id", "date_issued", "contract_id"]),
+    ("aa_bb_ks_corpcontract", "corptools_corporatecontract", ["corporation_id", "date_issued", "contract_id"]),
+    ("aa_bb_ks_mail", "corptools_mailmessage", ["timestamp", "id_key"]),
+    ("aa_bb_ks_wallet", "corptools_characterwalletjournalentry", ["second_party_id", "date", "entry_id"]),
+]
+
+
+def create_keyset_indexes(apps, schema_editor):
+    create_indexes(schema_editor, KEYSET_INDEXES)
+
+
+def drop_keyset_indexes(apps, schema_editor):
+    drop_indexes(schema_editor, KEYSET_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aa_bb', '0082_remove_bigbrotherconfig_token_and_more'),
+        ('corptools', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_keyset_indexes, drop_keyset_indexes),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+from ._corptools_indexes import create_indexes, drop_indexes
+
+WATERMARK_INDEXES = [
+    # (index name, table, columns)
+    ("aa_bb_wm_corpwallet", "corptools_corporationwalletjournalentry", ["division_id", "entry_id"]),
+]
+
+
+def create_watermark_indexes(apps, schema_editor):
+    create_indexes(schema_editor, WATERMARK_INDEXES)
+
+
+def drop_watermark_indexes(apps, schema_editor):
+    drop_indexes(schema_editor, WATERMARK_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aa_bb', '0083_corptools_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='corpstatus',
+            name='trans_watermarks',
+            field=models.JSONField(blank=True, default=dict, help_text='Per wallet division high-water mark ({division_id: {entry_id, date}}) of journal entries already scanned'),
+        ),
+        migrations.RunPython(create_watermark_indexes, drop_watermark_indexes),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aa_bb', '0084_corpstatus_trans_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='corporation_names',
+            index=models.Index(fields=['updated'], name='aa_bb_corpo_updated_6054ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alliance_names',
+            index=models.Index(fields=['updated'], name='aa_bb_allia_updated_497c4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character_names',
+            index=models.Index(fields=['updated'], name='aa_bb_chara_updated_b16e4b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='id_types',
+            index=models.Index(fields=['last_accessed'], name='aa_bb_ids_last_ac_3e31a3_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+"""
+Drop the (entity_id, as_of) index; the unique constraint already provides it.
+"""
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('aa_bb', '0085_name_cache_age_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='entityinfocache',
+            name='aa_bb_entit_entity__79afd6_idx',
+        ),
+    ]
@@ -0,0 +1,37 @@
+"""
+Monthly PAP rollup table read by the PAP form, history and charts.
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('aa_bb', '0086_entityinfocache_drop_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PapMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month these PAPs belong to')),
+                ('corp_paps', models.PositiveIntegerField(default=0, help_text='Corp PAPs (group bonuses + AFAT FATs, or the submitted value)')),
+                ('alliance_paps', models.PositiveIntegerField(default=0, help_text='Alliance PAPs submitted for the month')),
+                ('coalition_paps', models.PositiveIntegerField(default=0, help_text='Coalition PAPs submitted for the month')),
+                ('compliant', models.BooleanField(default=False, help_text='Weighted total met the PAP requirement')),
+                ('pap_score', models.IntegerField(blank=True, help_text='PAP compliance meter after this month was finalized', null=True)),
+                ('finalized', models.BooleanField(default=False, help_text='Month closed; values are final')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pap_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='aa_bb_papmo_month_972f59_idx')],
+                'unique_together': {('user', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+"""
+UPPER(name) indexes behind the case-insensitive typeahead searches on PostgreSQL.
+"""
+
+from django.db import migrations
+
+from ._corptools_indexes import create_upper_indexes, drop_indexes
+
+SEARCH_INDEXES = [
+    # (index name, table, column)
+    ("aa_bb_search_char_name", "eveonline_evecharacter", "character_name"),
+    ("aa_bb_search_corp_name", "eveonline_evecorporationinfo", "corporation_name"),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    create_upper_indexes(schema_editor, SEARCH_INDEXES)
+
+
+def drop_search_indexes(apps, schema_editor):
+    drop_indexes(schema_editor, SEARCH_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aa_bb', '0087_papmonthlyrollup'),
+        ('eveonline', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
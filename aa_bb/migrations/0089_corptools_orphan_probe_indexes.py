@@ -0,0 +1,36 @@
+"""
+Single-column indexes for the NOT EXISTS probes in BB_daily_DB_cleanup, which
+look corptools contracts and journal entries up by their ESI ids.
+"""
+
+from django.db import migrations
+
+from ._corptools_indexes import create_indexes, drop_indexes
+
+ORPHAN_PROBE_INDEXES = [
+    # (index name, table, columns)
+    ("aa_bb_op_contract", "corptools_contract", ["contract_id"]),
+    ("aa_bb_op_corpcontract", "corptools_corporatecontract", ["contract_id"]),
+    ("aa_bb_op_wallet", "corptools_characterwalletjournalentry", ["entry_id"]),
+    ("aa_bb_op_corpwallet", "corptools_corporationwalletjournalentry", ["entry_id"]),
+]
+
+
+def create_probe_indexes(apps, schema_editor):
+    create_indexes(schema_editor, ORPHAN_PROBE_INDEXES)
+
+
+def drop_probe_indexes(apps, schema_editor):
+    drop_indexes(schema_editor, ORPHAN_PROBE_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aa_bb', '0088_name_search_upper_indexes'),
+        ('corptools', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_probe_indexes, drop_probe_indexes),
+    ]
@@ -0,0 +1,61 @@
+"""
+Helpers for migrations that add indexes to corptools (and other apps') tables.
+
+Those tables belong to another app, so the indexes are created by hand and
+only when the table and columns exist; re-running is a no-op.
+"""
+
+
+def _existing(schema_editor, table):
+    """Return (column names, index names) for table, or (None, None) if it is missing."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):  # corptools table not created (yet).
+            return None, None
+        columns = {col.name for col in connection.introspection.get_table_description(cursor, table)}
+        indexes = set(connection.introspection.get_constraints(cursor, table))
+    return columns, indexes
+
+
+def create_indexes(schema_editor, specs):
+    """Create each (index name, table, columns) index that is not there yet."""
+    qn = schema_editor.quote_name
+    for name, table, columns in specs:
+        existing_cols, existing_idx = _existing(schema_editor, table)
+        if existing_cols is None or not set(columns) <= existing_cols or name in existing_idx:  # Skip missing tables/columns and re-runs.
+            continue
+        schema_editor.execute(
+            f"CREATE INDEX {qn(name)} ON {qn(table)} ({', '.join(qn(c) for c in columns)})"
+        )
+
+
+def create_upper_indexes(schema_editor, specs):
+    """
+    Create each (index name, table, column) index on UPPER(column) for
+    case-insensitive prefix lookups (`istartswith`), PostgreSQL only: MySQL's
+    default collations are case-insensitive, so the plain column index
+    already serves them there.
+    """
+    if schema_editor.connection.vendor != "postgresql":  # Only PostgreSQL needs the expression index.
+        return
+    qn = schema_editor.quote_name
+    for name, table, column in specs:
+        existing_cols, existing_idx = _existing(schema_editor, table)
+        if existing_cols is None or column not in existing_cols or name in existing_idx:  # Skip missing tables/columns and re-runs.
+            continue
+        schema_editor.execute(
+            f"CREATE INDEX {qn(name)} ON {qn(table)} (UPPER({qn(column)}::text) text_pattern_ops)"
+        )
+
+
+def drop_indexes(schema_editor, specs):
+    """Drop each (index name, table, columns) index if present."""
+    qn = schema_editor.quote_name
+    for name, table, _columns in specs:
+        _cols, existing_idx = _existing(schema_editor, table)
+        if not existing_idx or name not in existing_idx:  # Nothing to drop.
+            continue
+        if schema_editor.connection.vendor == "mysql":  # MySQL scopes index names per table.
+            schema_editor.execute(f"DROP INDEX {qn(name)} ON {qn(table)}")
+        else:
+            schema_editor.execute(f"DROP INDEX {qn(name)}")
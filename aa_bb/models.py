@@ -156,6 +156,7 @@ class CorpStatus(models.Model):
     - has_hostile_assets / hostile_assets: hostile staging systems for corp assets.
     - has_sus_contracts / sus_contracts: hostile contracts involving the corp.
     - has_sus_trans / sus_trans: suspicious corp wallet transactions.
+    - trans_watermarks: per wallet division high-water mark of scanned journal entries.
     - updated: when the cache row last changed.
     """
     corp_id = models.PositiveIntegerField(default=1)
@@ -166,6 +167,11 @@ class CorpStatus(models.Model):
     sus_contracts = JSONField(default=dict, blank=True)
     has_sus_trans = models.BooleanField(default=False)
     sus_trans = JSONField(default=dict, blank=True)
+    trans_watermarks = JSONField(
+        default=dict,
+        blank=True,
+        help_text="Per wallet division high-water mark ({division_id: {entry_id, date}}) of journal entries already scanned",
+    )
     updated = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -783,6 +789,9 @@ class Corporation_names(models.Model):
         db_table = 'aa_bb_corporations'
         verbose_name = 'Corporation Name'
         verbose_name_plural = 'Corporation Names'
+        indexes = [
+            models.Index(fields=["updated"]),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.name}"
@@ -812,6 +821,9 @@ class Alliance_names(models.Model):
         db_table = 'aa_bb_alliances'
         verbose_name = 'Alliance Name'
         verbose_name_plural = 'Alliance Names'
+        indexes = [
+            models.Index(fields=["updated"]),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.name}"
@@ -841,6 +853,9 @@ class Character_names(models.Model):
         db_table = 'aa_bb_characters'
         verbose_name = 'Character Name'
         verbose_name_plural = 'Character Names'
+        indexes = [
+            models.Index(fields=["updated"]),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.name}"
@@ -875,6 +890,9 @@ class id_types(models.Model):
         db_table = 'aa_bb_ids'
         verbose_name = 'ID Type'
         verbose_name_plural = 'ID Types'
+        indexes = [
+            models.Index(fields=["last_accessed"]),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.name}"
@@ -1059,7 +1077,12 @@ class WarmProgress(models.Model):
     
 
 class EntityInfoCache(models.Model):
-    """Cache of resolved entity info (name + corp/alliance pointers) per timestamp."""
+    """
+    Cache of resolved entity info (name + corp/alliance pointers) per timestamp.
+
+    `updated` doubles as the LRU stamp for BB_entity_cache_retention. Lookups and
+    warm-up diffs are served by the unique (entity_id, as_of) index alone.
+    """
     entity_id  = models.IntegerField()
     as_of      = models.DateTimeField()
     data       = JSONField()
@@ -1068,6 +1091,5 @@ class EntityInfoCache(models.Model):
     class Meta:
         unique_together = ("entity_id", "as_of")
         indexes = [
-            models.Index(fields=["entity_id", "as_of"]),
             models.Index(fields=["updated"]),
         ]
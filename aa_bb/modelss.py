@@ -168,6 +168,38 @@ class PapCompliance(models.Model):
     )
 
 
+class PapMonthlyRollup(models.Model):
+    """
+    PAPs per user and month, so history pages and checks never rescan AFAT.
+
+    Rows for open months hold the AFAT-derived corp PAPs and are refreshed by
+    BB_update_pap_rollups. Submitting the PAP form for a month stores the
+    final corp/alliance/coalition counts, records the compliance meter after
+    that month in `pap_score`, and marks the month finalized; finalized rows
+    are never recounted. `pap_score` is history only: PapCompliance stays the
+    live meter that admins edit and paps_check reads.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="pap_rollups",
+    )
+    month = models.DateField(help_text="First day of the month these PAPs belong to")
+    corp_paps = models.PositiveIntegerField(default=0, help_text="Corp PAPs (group bonuses + AFAT FATs, or the submitted value)")
+    alliance_paps = models.PositiveIntegerField(default=0, help_text="Alliance PAPs submitted for the month")
+    coalition_paps = models.PositiveIntegerField(default=0, help_text="Coalition PAPs submitted for the month")
+    compliant = models.BooleanField(default=False, help_text="Weighted total met the PAP requirement")
+    pap_score = models.IntegerField(null=True, blank=True, help_text="PAP compliance meter after this month was finalized")
+    finalized = models.BooleanField(default=False, help_text="Month closed; values are final")
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "month")
+        indexes = [
+            models.Index(fields=["month"]),
+        ]
+
+
 class TicketToolConfig(SingletonModel):
     """
     Configuration that drives the Discord compliance ticket automation.
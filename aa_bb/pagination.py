@@ -0,0 +1,66 @@
+"""
+Keyset (cursor) pagination helpers for the paginated card endpoints.
+
+A cursor is the (timestamp, id) pair of the last row a client has seen, handed
+out as an opaque url-safe token. Pages are selected with a WHERE on that sort
+key instead of an OFFSET, so deep pages cost the same as the first one and no
+queryset needs to be kept server-side between requests.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    """Pack a (timestamp, id) sort key into an opaque cursor token."""
+    raw = json.dumps([ts.isoformat(), int(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[datetime, int]:
+    """Unpack a cursor token; raises ValueError when it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(ts), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+
+def get_page_params(request) -> tuple[str | None, int]:
+    """
+    Read `cursor` and `limit` from the query string.
+    Raises ValueError for a bad limit; the cursor is validated in keyset_page.
+    """
+    cursor = request.GET.get("cursor") or None
+    limit = int(request.GET.get("limit", DEFAULT_PAGE_SIZE))
+    return cursor, max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(qs, ts_field: str, id_field: str, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for the page after `cursor`, newest first.
+
+    Rows are ordered by (ts_field, id_field) descending; next_cursor is None
+    once the last page has been returned.
+    """
+    qs = qs.order_by(f"-{ts_field}", f"-{id_field}")
+    if cursor:  # Continue strictly after the last row the client saw.
+        ts, row_id = decode_cursor(cursor)
+        qs = qs.filter(
+            Q(**{f"{ts_field}__lt": ts})
+            | Q(**{ts_field: ts, f"{id_field}__lt": row_id})
+        )
+
+    rows = list(qs[:limit + 1])
+    if len(rows) <= limit:  # Final page.
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, ts_field), getattr(last, id_field))
@@ -0,0 +1,260 @@
+"""
+Monthly PAP statistics for the PAP pages.
+
+`build_pap_stats` produces the rows of the PAP entry form for every member in
+a constant number of queries: one aggregate counts each user's AFAT FATs for
+the month through character ownership, one reads every member's group names,
+and `PapRules` snapshots PapsConfig once so the per-user group bonuses and
+the corp/alliance/coalition weightings are plain arithmetic.
+
+Counts are kept per user and month in PapMonthlyRollup. `refresh_pap_rollups`
+recounts a month's open rows; once a month is finalized its rows are what the
+form, the history table and paps_check read, so past months never touch
+AFAT's tables again.
+"""
+
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from allianceauth.groupmanagement.models import AuthGroup
+
+from .app_settings import afat_active, get_user_profiles
+from .models import PapsConfig
+from .modelss import PapMonthlyRollup
+
+User = get_user_model()
+
+
+class PapRules:
+    """Everything the PAP calculations need from PapsConfig, read once."""
+
+    def __init__(self, conf: PapsConfig = None):
+        conf = conf if conf is not None else PapsConfig.get_solo()
+        self.conf = conf
+        self.excluded_user_ids = set(conf.excluded_users.values_list("id", flat=True))
+        self.no_group_paps_ids = set(conf.excluded_users_paps.values_list("id", flat=True))
+        self.group_names = set(conf.group_paps.values_list("group__name", flat=True))
+        self.excluded_group_names = set(conf.excluded_groups.values_list("group__name", flat=True))
+        self.capital_bonuses = []
+        if conf.capital_groups_get_paps:  # Optional extra PAP points for capital pilots.
+            names = dict(
+                AuthGroup.objects.filter(
+                    pk__in=[conf.cap_group_id, conf.super_group_id, conf.titan_group_id]
+                ).values_list("pk", "group__name")
+            )
+            # Later entries win, so titan beats super beats cap.
+            for group_id, paps in (
+                (conf.cap_group_id, conf.cap_group_paps),
+                (conf.super_group_id, conf.super_group_paps),
+                (conf.titan_group_id, conf.titan_group_paps),
+            ):
+                if names.get(group_id):
+                    self.capital_bonuses.append((names[group_id], paps))
+
+    def group_paps(self, user_id: int, groups: set) -> int:
+        """Bonus corp PAPs a user earns from group membership."""
+        paps = 0
+        if user_id not in self.no_group_paps_ids:  # Only award group PAPs when user not excluded.
+            if not groups & self.excluded_group_names:  # Normal path: add modifier times group overlaps.
+                paps += len(groups & self.group_names) * self.conf.group_paps_modifier
+            elif self.conf.excluded_groups_get_paps:  # Optionally still award excluded groups.
+                paps += self.conf.group_paps_modifier
+
+        capital = 0
+        for name, bonus in self.capital_bonuses:
+            if name in groups:
+                capital = bonus
+        return paps + capital
+
+    def weigh(self, corp: int, alliance: int, coalition: int) -> dict:
+        """
+        Apply the configured modifiers to raw PAP counts.
+
+        Corp PAPs are capped at max_corp_paps; the part above the cap is
+        returned separately as `corp_ab` so charts can show it.
+        """
+        corp_raw = corp * self.conf.corp_modifier
+        return {
+            "corp": min(corp_raw, self.conf.max_corp_paps),
+            "corp_ab": max(corp_raw - self.conf.max_corp_paps, 0),
+            "alliance": alliance * self.conf.alliance_modifier,
+            "coalition": coalition * self.conf.coalition_modifier,
+        }
+
+    def meets(self, corp: int, alliance: int, coalition: int) -> bool:
+        """True when the weighted, capped total reaches required_paps."""
+        w = self.weigh(corp, alliance, coalition)
+        return w["corp"] + w["alliance"] + w["coalition"] >= self.conf.required_paps
+
+
+def monthly_fat_counts(user_ids, year: int, month: int) -> dict[int, int]:
+    """{user_id: AFAT FATs on any owned character in that month}, from one aggregate."""
+    if not afat_active():  # Without AFAT there is nothing to count.
+        return {}
+    from afat.models import Fat
+
+    rows = (
+        Fat.objects.filter(
+            character__character_ownership__user_id__in=user_ids,
+            fatlink__created__year=year,
+            fatlink__created__month=month,
+        )
+        .order_by()
+        .values("character__character_ownership__user_id")
+        .annotate(fats=Count("id"))
+        .values_list("character__character_ownership__user_id", "fats")
+    )
+    return dict(rows)
+
+
+def user_group_names(user_ids) -> dict[int, set]:
+    """{user_id: set of auth group names}, from one query."""
+    groups = {}
+    rows = User.groups.through.objects.filter(user_id__in=user_ids).values_list("user_id", "group__name")
+    for user_id, name in rows:
+        groups.setdefault(user_id, set()).add(name)
+    return groups
+
+
+def month_start(year: int, month: int) -> date:
+    return date(year, month, 1)
+
+
+def corp_pap_counts(profiles, year: int, month: int, rules: PapRules) -> dict[int, int]:
+    """{user_id: group bonuses + AFAT FATs} for the month."""
+    user_ids = [p.user_id for p in profiles]
+    fats = monthly_fat_counts(user_ids, year, month)
+    groups = user_group_names(user_ids)
+    return {
+        uid: rules.group_paps(uid, groups.get(uid, set())) + fats.get(uid, 0)
+        for uid in user_ids
+    }
+
+
+def build_pap_stats(profiles, year: int, month: int, rules: PapRules = None) -> list[dict]:
+    """
+    Unweighted PAP counts per member for the month, in `profiles` order.
+
+    Rows are {"user": profile, "corp_paps", "alliance_paps", "coalition_paps"}.
+    Members with a rollup row for the month get its stored counts; the rest
+    are counted live (group bonuses plus AFAT FATs, alliance/coalition at 0
+    until filled in from the form).
+    """
+    rules = rules if rules is not None else PapRules()
+    profiles = [p for p in profiles if p.user_id not in rules.excluded_user_ids]
+    stored = {
+        row[0]: row[1:]
+        for row in PapMonthlyRollup.objects.filter(
+            user_id__in=[p.user_id for p in profiles], month=month_start(year, month),
+        ).values_list("user_id", "corp_paps", "alliance_paps", "coalition_paps")
+    }
+    missing = [p for p in profiles if p.user_id not in stored]
+    counted = corp_pap_counts(missing, year, month, rules) if missing else {}
+    rows = []
+    for profile in profiles:
+        corp, alliance, coalition = stored.get(profile.user_id) or (counted[profile.user_id], 0, 0)
+        rows.append({
+            "user": profile,
+            "corp_paps": corp,
+            "alliance_paps": alliance,
+            "coalition_paps": coalition,
+        })
+    return rows
+
+
+def lock_pap_rollups() -> None:
+    """
+    Serialize rollup writers on the PapsConfig row. Call inside the writer's
+    transaction; row locks alone cannot cover rows that do not exist yet.
+    """
+    PapsConfig.objects.select_for_update().get(pk=PapsConfig.get_solo().pk)
+
+
+def refresh_pap_rollups(year: int, month: int, rules: PapRules = None) -> int:
+    """
+    Recount corp PAPs into every member's open rollup row for the month.
+
+    One FAT aggregate, then one update of the open rows and one insert of the
+    missing ones, under `lock_pap_rollups` so a PAP form submission finalizing
+    the month runs either before or after, never in between. Finalized rows
+    and the alliance/coalition counts already stored are never touched.
+    Returns the rows written.
+    """
+    rules = rules if rules is not None else PapRules()
+    start = month_start(year, month)
+    finalized = set(
+        PapMonthlyRollup.objects.filter(month=start, finalized=True).values_list("user_id", flat=True)
+    )
+    profiles = [
+        p for p in get_user_profiles()
+        if p.user_id not in rules.excluded_user_ids and p.user_id not in finalized
+    ]
+    if not profiles:  # Everyone finalized (or nobody to count).
+        return 0
+    counts = corp_pap_counts(profiles, year, month, rules)
+
+    with transaction.atomic():
+        lock_pap_rollups()
+        existing = {
+            row.user_id: row
+            for row in PapMonthlyRollup.objects.select_for_update().filter(month=start)
+        }
+        now = timezone.now()
+        changed = []
+        created = []
+        for uid, corp in counts.items():
+            row = existing.get(uid)
+            if row is None:  # First count for this member and month.
+                created.append(PapMonthlyRollup(
+                    user_id=uid,
+                    month=start,
+                    corp_paps=corp,
+                    compliant=rules.meets(corp, 0, 0),
+                ))
+            elif not row.finalized:  # Closed months keep their submitted values.
+                row.corp_paps = corp
+                row.compliant = rules.meets(corp, row.alliance_paps, row.coalition_paps)
+                row.updated = now
+                changed.append(row)
+        PapMonthlyRollup.objects.bulk_update(changed, ["corp_paps", "compliant", "updated"])
+        PapMonthlyRollup.objects.bulk_create(created, ignore_conflicts=True)
+    return len(changed) + len(created)
+
+
+def pap_history(year: int, month: int, months: int, rules: PapRules = None) -> tuple[list[date], list[dict]]:
+    """
+    Per-member PAP totals for `months` months ending at year/month, from one
+    range query over the rollup table.
+
+    Returns (month starts oldest first, rows) where each row is
+    {"name", "cells"} and each cell is None or {"total", "compliant", "finalized"}.
+    """
+    rules = rules if rules is not None else PapRules()
+    end = month_start(year, month)
+    starts = [end]
+    for _ in range(months - 1):
+        prev = starts[0]
+        starts.insert(0, date(prev.year - (prev.month == 1), (prev.month - 2) % 12 + 1, 1))
+    position = {m: i for i, m in enumerate(starts)}
+
+    by_user = {}
+    rows = (
+        PapMonthlyRollup.objects.filter(month__range=(starts[0], end))
+        .values_list(
+            "user_id", "user__profile__main_character__character_name", "month",
+            "corp_paps", "alliance_paps", "coalition_paps", "compliant", "finalized",
+        )
+    )
+    for user_id, name, m, corp, alliance, coalition, compliant, finalized in rows:
+        entry = by_user.setdefault(user_id, {"name": name or str(user_id), "cells": [None] * len(starts)})
+        w = rules.weigh(corp, alliance, coalition)
+        entry["cells"][position[m]] = {
+            "total": w["corp"] + w["alliance"] + w["coalition"],
+            "compliant": compliant,
+            "finalized": finalized,
+        }
+    return starts, sorted(by_user.values(), key=lambda r: r["name"].lower())
@@ -4,29 +4,42 @@ Django signal handlers used by BigBrother.
 Currently:
 1. When the singleton config is saved, Celery message tasks stay in sync.
 2. When a character ownership is deleted, optionally open a compliance ticket.
+3. When a character is added or corptools refreshes its contracts, mails or
+   wallet, queue a low-priority entity cache pre-warm for the owning user.
+4. Config saves, audit saves and ownership changes invalidate cached card renders.
+5. Config saves and LeaveRequest writes refresh the cached sidebar menu state.
 """
 
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 
 from allianceauth.authentication.models import CharacterOwnership
+from corptools.models import CharacterAudit
 from aadiscordbot.tasks import run_task_function
 from aadiscordbot.utils.auth import get_discord_user_id
 
 from .models import BigBrotherConfig
 from .tasks import BB_register_message_tasks
-from .modelss import TicketToolConfig
+from .modelss import TicketToolConfig, LeaveRequest
 from .app_settings import send_message
+from .entity_warmer import schedule_prewarm
+from .card_cache import invalidate_all_cards, invalidate_user_cards
+from .menu_state import invalidate_menu_flags, refresh_pending_loa_count
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# CharacterAudit stamps whose refresh means new rows for the warmed cards.
+PREWARM_UPDATE_FIELDS = {"last_update_contracts", "last_update_mails", "last_update_wallet"}
+
 
 @receiver(post_save, sender=BigBrotherConfig)
 def trigger_task_sync(sender, instance, **kwargs):
     """When the config changes make sure Celery schedules match the DB."""
     BB_register_message_tasks.delay()
+    invalidate_all_cards()
+    invalidate_menu_flags()
 
 
 @receiver(pre_delete, sender=CharacterOwnership)
@@ -61,3 +74,74 @@ def removed_character(sender, instance, **kwargs):
 
     except Exception as e:
         logger.error("Failed to create character-removed ticket: %s", e)
+
+
+@receiver(post_save, sender=CharacterOwnership)
+def prewarm_added_character(sender, instance, created, **kwargs):
+    """A freshly linked character brings new history; warm it before review."""
+    if not created:
+        return
+    try:
+        schedule_prewarm(instance.user_id)
+    except Exception as e:
+        logger.warning("Failed to queue pre-warm for new ownership: %s", e)
+
+
+@receiver(pre_save, sender=CharacterAudit)
+def remember_audit_stamps(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored refresh stamps so the post_save handler can tell whether they moved."""
+    instance._bb_prewarm_stamps = None
+    if instance.pk is None:  # Creation always pre-warms; nothing to compare.
+        return
+    fields = PREWARM_UPDATE_FIELDS & {f.name for f in sender._meta.concrete_fields}
+    if update_fields is not None:  # Only the stamps this save writes can move.
+        fields &= set(update_fields)
+    if not fields:  # This save cannot touch the stamps.
+        return
+    try:
+        instance._bb_prewarm_stamps = sender.objects.filter(pk=instance.pk).values(*sorted(fields)).first()
+    except Exception as e:
+        logger.warning("Failed to read audit stamps %s: %s", instance.pk, e)
+
+
+def _stamps_changed(instance) -> bool:
+    """True when a contracts/mail/wallet refresh stamp differs from the stored one."""
+    old = getattr(instance, "_bb_prewarm_stamps", None)
+    if old is None:  # Stamps not part of this save.
+        return False
+    return any(getattr(instance, field, None) != value for field, value in old.items())
+
+
+@receiver(post_save, sender=CharacterAudit)
+def audited_character_updated(sender, instance, created, **kwargs):
+    """
+    Any corptools audit write may change what the owner's cards show, so their
+    cached renders are invalidated. Creation or a contracts/mail/wallet refresh
+    (a changed `last_update_*` stamp, however the save was called) also queues
+    a pre-warm.
+    """
+    try:
+        ownership = CharacterOwnership.objects.filter(
+            character_id=instance.character_id
+        ).only("user_id").first()
+        if not ownership:  # Unowned characters have no dashboard.
+            return
+        invalidate_user_cards(ownership.user_id)
+        if created or _stamps_changed(instance):  # New history to resolve.
+            schedule_prewarm(ownership.user_id)
+    except Exception as e:
+        logger.warning("Failed to handle audit update %s: %s", instance.pk, e)
+
+
+@receiver(post_save, sender=CharacterOwnership)
+@receiver(post_delete, sender=CharacterOwnership)
+def invalidate_owner_cards(sender, instance, **kwargs):
+    """Adding or losing a character changes every card of the owner."""
+    invalidate_user_cards(instance.user_id)
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def update_pending_loa_count(sender, instance, **kwargs):
+    """Keep the LoA menu badge count current without querying on every page."""
+    refresh_pending_loa_count()
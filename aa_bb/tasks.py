@@ -27,6 +27,8 @@ import traceback
 from .tasks_cb import *
 from .tasks_ct import *
 from .tasks_tickets import *
+from .tasks_paps import *
+from .entity_warmer import warm_entity_shard_task, prewarm_user_task
 
 logger = logging.getLogger(__name__)
 
@@ -5,6 +5,9 @@ The functions here are called from Celery tasks as well as slash commands to
 create/rebalance compliance ticket channels.
 """
 
+import asyncio
+import logging
+
 import discord
 import re
 from django.utils import timezone
@@ -12,11 +15,18 @@ from .modelss import TicketToolConfig, ComplianceTicket
 from .app_settings import get_user_model
 from allianceauth.authentication.models import UserProfile
 from django.db import transaction
+from django.db.models import F
 from discord.commands import SlashCommandGroup
 from discord.ext import commands
 from aadiscordbot.cogs.utils.decorators import sender_is_admin
 from discord.commands import slash_command
 
+logger = logging.getLogger(__name__)
+
+CHANNEL_OP_DELAY = 1.0  # Seconds between channel create/delete calls in a batch.
+# Held by ticket batches and rebalance passes, so neither moves channels under the other's plan.
+CATEGORY_LOCK = asyncio.Lock()
+
 def get_staff_roles():
     """Parse the comma-separated list of Discord role IDs allowed on tickets."""
     cfg = TicketToolConfig.get_solo()
@@ -29,6 +39,11 @@ async def create_compliance_ticket(bot, user_id, discord_user_id: int, reason: s
     guild = bot.guilds[0]  # or use a known guild_id if multi-guild
     # Find or create a category with capacity (auto-clone with -2/-3 if needed)
     category = await ensure_ticket_category_with_capacity(guild, category_id)
+    await _open_ticket_channel(guild, category, user_id, discord_user_id, reason, message, get_next_ticket_number())
+
+
+async def _open_ticket_channel(guild, category, user_id, discord_user_id: int, reason: str, message: str, ticket_number: str):
+    """Create one ticket channel in `category`, post the opening message and record the ComplianceTicket."""
     member = guild.get_member(discord_user_id) or await guild.fetch_member(discord_user_id)
     User = get_user_model()
     user = User.objects.get(id=user_id)
@@ -47,8 +62,6 @@ async def create_compliance_ticket(bot, user_id, discord_user_id: int, reason: s
         if role:
             overwrites[role] = discord.PermissionOverwrite(view_channel=True, send_messages=True)
 
-    ticket_number = get_next_ticket_number()
-
     channel = await guild.create_text_channel(
         name=f"ticket-{ticket_number}",
         category=category,
@@ -66,6 +79,7 @@ async def create_compliance_ticket(bot, user_id, discord_user_id: int, reason: s
         reason=reason,
         ticket_id=ticket_number,
     )
+    return channel
 
 
 async def send_ticket_reminder(bot, channel_id: int, user_id: int, message: str):
@@ -79,19 +93,107 @@ async def close_ticket_channel(bot, channel_id: int):
     if channel:
         await channel.delete(reason="Compliance issue resolved")
 
-def get_next_ticket_number():
+async def run_ticket_ops(bot, ops: list[dict]):
+    """
+    Execute a batch of ticket operations in one bot round trip:
+
+      {"op": "close",  "channel_id"}
+      {"op": "create", "user_id", "discord_user_id", "reason", "message"}
+      {"op": "remind", "channel_id", "discord_user_id", "message"}
+
+    The category family is scanned once; placement of every new ticket is
+    planned in memory against CATEGORY_LIMIT (counting the slots this batch's
+    closes free up) before any channel is touched. Mutating calls are spaced
+    by CHANNEL_OP_DELAY on top of discord.py's own per-route buckets, so a
+    large wave does not stall on 429 retries. One failing op is logged and
+    skipped; the rest of the batch still runs.
+
+    Closes and creates run under CATEGORY_LOCK, so a rebalance pass waits
+    for the batch instead of filling the slots its plan counted on.
+    """
+    reminders = [op for op in ops if op["op"] == "remind"]
+    async with CATEGORY_LOCK:
+        await _run_channel_ops(
+            bot,
+            [op for op in ops if op["op"] == "close"],
+            [op for op in ops if op["op"] == "create"],
+        )
+
+    for op in reminders:
+        try:
+            await send_ticket_reminder(bot, op["channel_id"], op["discord_user_id"], op["message"])
+        except Exception as e:
+            logger.warning("Failed to send reminder to channel %s: %s", op["channel_id"], e)
+
+
+async def _run_channel_ops(bot, closes: list[dict], creates: list[dict]):
+    """Plan placement for `creates`, then run the closes and the creates."""
+    plan = None
+    if creates and bot.guilds:  # Plan before closing, while the channel cache is still consistent.
+        guild = bot.guilds[0]
+        base = guild.get_channel(int(TicketToolConfig.get_solo().Category_ID or 0))
+        if isinstance(base, discord.CategoryChannel):
+            family = _get_family_categories(guild, base)
+            closing = {op["channel_id"] for op in closes}
+            free = [
+                CATEGORY_LIMIT - sum(1 for ch in cat.channels if ch.id not in closing)
+                for _, cat in family
+            ]
+            plan = (guild, base, family, plan_ticket_placement(free, len(creates)))
+        else:
+            logger.error("Configured Category_ID is not a valid category; skipping %s ticket creations", len(creates))
+
+    for op in closes:
+        try:
+            await close_ticket_channel(bot, op["channel_id"])
+        except discord.HTTPException as e:
+            logger.warning("Failed to close ticket channel %s: %s", op["channel_id"], e)
+        await asyncio.sleep(CHANNEL_OP_DELAY)
+
+    if plan:
+        guild, base, family, placement = plan
+        categories = [cat for _, cat in family]
+        next_suffix = (family[-1][0] + 1) if family else 2
+        numbers = reserve_ticket_numbers(len(creates))
+        for op, idx, number in zip(creates, placement, numbers):
+            try:
+                while idx >= len(categories):  # Planned overflow category not created yet.
+                    categories.append(await _create_overflow_category(guild, base, next_suffix))
+                    next_suffix += 1
+                await _open_ticket_channel(
+                    guild, categories[idx], op["user_id"], op["discord_user_id"],
+                    op["reason"], op["message"], number,
+                )
+            except Exception as e:
+                logger.warning("Failed to create %s ticket for user %s: %s", op["reason"], op["user_id"], e)
+            await asyncio.sleep(CHANNEL_OP_DELAY)
+
+TICKET_NUMBER_WRAP = 10000  # Channel names carry four digits.
+
+
+def reserve_ticket_numbers(count: int) -> list[str]:
     """
-    Returns the next ticket number as a zero-padded string (0000–9999),
-    increments and wraps the counter in TicketToolConfig.
+    Reserve `count` consecutive ticket numbers and return them as zero-padded
+    strings (0000–9999).
+
+    The range is claimed with a single `F()` increment on the TicketToolConfig
+    row, so concurrent callers each get a distinct block without reading the
+    counter first; the row is only locked for the duration of that UPDATE.
+    The stored counter keeps growing and the four-digit wrap is applied when
+    formatting.
     """
+    if count <= 0:  # Nothing to reserve.
+        return []
+    pk = TicketToolConfig.get_solo().pk  # get_solo() also creates the row on first use.
     with transaction.atomic():
-        cfg = TicketToolConfig.get_solo()
-        num = cfg.ticket_counter or 0
-        formatted = f"{num:04d}"  # zero-padded to 4 digits
-        # increment & wrap
-        cfg.ticket_counter = (num + 1) % 10000
-        cfg.save(update_fields=["ticket_counter"])
-    return formatted
+        TicketToolConfig.objects.filter(pk=pk).update(ticket_counter=F("ticket_counter") + count)
+        end = TicketToolConfig.objects.filter(pk=pk).values_list("ticket_counter", flat=True).get()
+    return [f"{num % TICKET_NUMBER_WRAP:04d}" for num in range(end - count, end)]
+
+
+def get_next_ticket_number():
+    """Returns the next ticket number as a zero-padded string (0000–9999)."""
+    return reserve_ticket_numbers(1)[0]
 
 class CharRemovedCommands(commands.Cog):
     """Slash-command cog for operators handling character removal tickets."""
@@ -132,6 +234,7 @@ class CharRemovedCommands(commands.Cog):
 
 def setup(bot):
     bot.add_cog(CharRemovedCommands(bot))
+    bot.add_cog(TicketCategoryBalancer(bot))
 
 # ---- Category overflow helpers ----
 
@@ -190,16 +293,37 @@ async def ensure_ticket_category_with_capacity(guild: discord.Guild, base_catego
 
     # All full: create next clone
     next_suffix = (family[-1][0] + 1) if family else 2  # base missing → start at -2
-    name = f"{base.name}-{next_suffix}"
-    # Copy overwrites from base
-    overwrites = base.overwrites
-    new_cat = await guild.create_category(
-        name=name,
-        overwrites=overwrites,
+    return await _create_overflow_category(guild, base, next_suffix)
+
+
+async def _create_overflow_category(guild: discord.Guild, base: discord.CategoryChannel, suffix: int) -> discord.CategoryChannel:
+    """Create the "<base>-<suffix>" overflow category with the base category's overwrites."""
+    return await guild.create_category(
+        name=f"{base.name}-{suffix}",
+        overwrites=base.overwrites,
         reason="Auto-created ticket overflow category",
-        position=base.position + next_suffix - 1 if hasattr(base, "position") else None,
+        position=base.position + suffix - 1 if hasattr(base, "position") else None,
     )
-    return new_cat
+
+
+def plan_ticket_placement(free_slots: list[int], count: int) -> list[int]:
+    """
+    Category index for each of `count` new tickets, filling the family in order.
+    `free_slots[i]` is the spare capacity of family category i; indexes past the
+    end stand for overflow categories that still have to be created.
+    """
+    slots = list(free_slots)
+    plan = []
+    idx = 0
+    while len(plan) < count:
+        if idx >= len(slots):  # Family exhausted: plan a fresh overflow category.
+            slots.append(CATEGORY_LIMIT)
+        if slots[idx] > 0:  # Room left here.
+            slots[idx] -= 1
+            plan.append(idx)
+        else:
+            idx += 1
+    return plan
 
 def _is_ticket_channel(ch: discord.abc.GuildChannel) -> bool:
     return (
@@ -210,61 +334,186 @@ def _is_ticket_channel(ch: discord.abc.GuildChannel) -> bool:
         )
     )
 
-async def rebalance_ticket_categories(bot):
-    """
-    Try to keep earlier categories in the ticket family as full as possible by moving
-    ticket channels leftwards. Delete empty overflow categories (suffix >= 2).
-    """
-    cfg = TicketToolConfig.get_solo()
-    if not cfg.Category_ID:  # nothing configured → nothing to rebalance
-        return
-    if not bot.guilds:  # ensure the bot is connected to at least one guild
-        return
-    guild = bot.guilds[0]
-    base = guild.get_channel(int(cfg.Category_ID))
-    if not isinstance(base, discord.CategoryChannel):  # invalid configuration
-        return
+REBALANCE_FILL_THRESHOLD = 0.5  # Drain an overflow category once it is at most this full.
+REBALANCE_DEBOUNCE = 30  # Seconds to wait after a ticket closes, so a burst of closes yields one plan.
 
-    family = _get_family_categories(guild, base)
-    if not family:
-        return
 
-    MOVE_LIMIT = 30
-    moves = 0
+class _CategoryOccupancy:
+    """
+    In-memory view of the ticket category family: which channels sit in which
+    category, and which of those are ticket channels (the only ones we move).
+    Built once from the guild cache and then kept current from channel events.
+    """
 
-    # Build lists of ticket channels per category (only tickets)
-    cats = [cat for _, cat in family]
-    tickets_by_cat: dict[int, list[discord.TextChannel]] = {
-        cat.id: [ch for ch in cat.channels if _is_ticket_channel(ch)] for cat in cats
-    }
+    def __init__(self, guild: discord.Guild, base: discord.CategoryChannel):
+        self.guild = guild
+        family = _get_family_categories(guild, base)
+        self.order = [cat.id for _, cat in family]
+        self.suffix = {cat.id: suf for suf, cat in family}
+        self.channels = {cat.id: {ch.id for ch in cat.channels} for _, cat in family}
+        self.tickets = {cat.id: {ch.id for ch in cat.channels if _is_ticket_channel(ch)} for _, cat in family}
+
+    def add(self, ch) -> bool:
+        """Record a channel entering a family category; False if it is not ours to track."""
+        cat_id = getattr(ch, "category_id", None)
+        if cat_id not in self.channels:  # Outside the ticket family.
+            return False
+        self.channels[cat_id].add(ch.id)
+        if _is_ticket_channel(ch):  # Only tickets are candidates for moves.
+            self.tickets[cat_id].add(ch.id)
+        return True
+
+    def remove(self, ch) -> bool:
+        """Record a channel leaving a family category; False if it is not ours to track."""
+        cat_id = getattr(ch, "category_id", None)
+        if cat_id not in self.channels:  # Outside the ticket family.
+            return False
+        self.channels[cat_id].discard(ch.id)
+        self.tickets[cat_id].discard(ch.id)
+        return True
+
+    def plan(self) -> tuple[list[tuple[int, int]], list[int]]:
+        """
+        Minimal moves that free trailing overflow categories.
+
+        Working from the last category backwards, an overflow category is
+        drained only if it holds nothing but tickets, is at most
+        REBALANCE_FILL_THRESHOLD full, and the categories before it can absorb
+        all of its tickets. Channels in categories that will stay are never
+        touched. Returns ([(channel_id, target_category_id)], [emptied_category_id]).
+        """
+        used = {cat_id: len(chs) for cat_id, chs in self.channels.items()}
+        moves = []
+        emptied = []
+        for pos in range(len(self.order) - 1, 0, -1):
+            src = self.order[pos]
+            if self.suffix[src] < 2:  # Never drain the base category.
+                break
+            if not used[src]:  # Already empty; just remove it.
+                emptied.append(src)
+                continue
+            if used[src] != len(self.tickets[src]):  # Foreign channels pin the category.
+                break
+            if used[src] > CATEGORY_LIMIT * REBALANCE_FILL_THRESHOLD:  # Still busy enough to keep.
+                break
+            earlier = self.order[:pos]
+            if sum(CATEGORY_LIMIT - used[c] for c in earlier) < used[src]:  # Cannot be emptied completely.
+                break
+            pending = sorted(self.tickets[src])
+            for dst in earlier:
+                while pending and used[dst] < CATEGORY_LIMIT:
+                    moves.append((pending.pop(0), dst))
+                    used[dst] += 1
+            used[src] = 0
+            emptied.append(src)
+        return moves, emptied
+
+
+class TicketCategoryBalancer(commands.Cog):
+    """
+    Event-driven rebalancer for the ticket category family.
 
-    # Fill earlier categories from later ones
-    for idx in range(1, len(cats)):
-        if moves >= MOVE_LIMIT:  # avoid shuffling too many channels per invocation
-            break
-        left = cats[idx - 1]
-        right = cats[idx]
+    Channel create/delete/update events keep a `_CategoryOccupancy` model
+    current; when tickets close, a pass runs once no slot has opened for
+    REBALANCE_DEBOUNCE seconds, computes the minimal set of moves that lets
+    trailing overflow categories be deleted and runs them with
+    CHANNEL_OP_DELAY pacing. Nothing is rescanned on a schedule.
+    """
 
-        def left_capacity() -> int:
-            try:
-                return CATEGORY_LIMIT - len(left.channels)
-            except Exception:
-                return 0
+    def __init__(self, bot):
+        self.bot = bot
+        self._model: _CategoryOccupancy | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._pending: asyncio.Task | None = None
+
+    def _occupancy(self) -> _CategoryOccupancy | None:
+        if self._model is None:  # First event, or the family itself changed.
+            cfg = TicketToolConfig.get_solo()
+            if not cfg.Category_ID or not self.bot.guilds:  # Nothing configured/connected yet.
+                return None
+            guild = self.bot.guilds[0]
+            base = guild.get_channel(int(cfg.Category_ID))
+            if not isinstance(base, discord.CategoryChannel):  # Invalid configuration.
+                return None
+            self._model = _CategoryOccupancy(guild, base)
+        return self._model
+
+    def _schedule(self):
+        if self._timer:  # Restart the quiet period on every freed slot.
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(REBALANCE_DEBOUNCE, self._start_rebalance)
+
+    def _start_rebalance(self):
+        self._timer = None
+        self._pending = asyncio.create_task(self.rebalance())
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        if isinstance(channel, discord.CategoryChannel):  # Family may have grown; rebuild lazily.
+            self._model = None
+            return
+        model = self._occupancy()
+        if model:
+            model.add(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if isinstance(channel, discord.CategoryChannel):  # Family may have shrunk; rebuild lazily.
+            self._model = None
+            return
+        model = self._occupancy()
+        if model and model.remove(channel):  # A slot opened up somewhere in the family.
+            self._schedule()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if isinstance(after, discord.CategoryChannel):  # A rename can move a category in or out of the family.
+            if before.name != after.name:
+                self._model = None
+            return
+        if before.category_id == after.category_id:  # Not a move.
+            return
+        model = self._occupancy()
+        if model:
+            left = model.remove(before)
+            model.add(after)
+            if left:  # A family category lost a channel.
+                self._schedule()
+
+    async def rebalance(self):
+        """Run the moves the occupancy model calls for, then delete the emptied overflow categories."""
+        async with CATEGORY_LOCK:
+            model = self._occupancy()
+            if model is None:
+                return
+            moves, emptied = model.plan()
+            guild = model.guild
+            for channel_id, target_id in moves:
+                ch = guild.get_channel(channel_id)
+                target = guild.get_channel(target_id)
+                if ch is None or target is None:  # Gone since the plan was made.
+                    continue
+                try:
+                    await ch.edit(category=target, reason="Ticket overflow rebalancing")
+                except discord.HTTPException as e:
+                    logger.warning("Failed to move ticket channel %s: %s", channel_id, e)
+                await asyncio.sleep(CHANNEL_OP_DELAY)
+
+            for cat_id in emptied:
+                cat = guild.get_channel(cat_id)
+                if cat is None or len(cat.channels):  # Gone, or a move above failed.
+                    continue
+                try:
+                    await cat.delete(reason="Removing empty ticket overflow category")
+                except discord.HTTPException as e:
+                    logger.warning("Failed to delete overflow category %s: %s", cat_id, e)
+                await asyncio.sleep(CHANNEL_OP_DELAY)
 
-        while left_capacity() > 0 and tickets_by_cat.get(right.id) and moves < MOVE_LIMIT:
-            ch = tickets_by_cat[right.id].pop(0)
-            try:
-                await ch.edit(category=left, reason="Ticket overflow rebalancing")
-                moves += 1
-                # Track it in left collection if needed for subsequent steps
-                tickets_by_cat.setdefault(left.id, []).append(ch)
-            except discord.HTTPException:  # skip problematic/missing channel gracefully
-                continue
 
-    # Delete empty overflow categories (suffix >= 2)
-    for suffix, cat in reversed(family):
-        if suffix >= 2 and len(cat.channels) == 0:  # remove empty overflow categories
-            try:
-                await cat.delete(reason="Removing empty ticket overflow category")
-            except discord.HTTPException:
-                pass
+async def rebalance_ticket_categories(bot):
+    """
+    Run one rebalance pass now. Normally TicketCategoryBalancer does this on
+    its own from channel events; this entry point stays for manual triggers.
+    """
+    cog = bot.get_cog("TicketCategoryBalancer") or TicketCategoryBalancer(bot)
+    await cog.rebalance()
@@ -9,20 +9,20 @@ This file contains:
 """
 
 from celery import shared_task
-from allianceauth.eveonline.models import EveCharacter, EveCorporationInfo
-from allianceauth.authentication.models import UserProfile
+from allianceauth.eveonline.models import EveCorporationInfo
+from allianceauth.authentication.models import CharacterOwnership, UserProfile
+from django.db.models import Max
 from django_celery_beat.models import PeriodicTask, CrontabSchedule
 from .models import (
     BigBrotherConfig, CorpStatus, Messages, OptMessages1, OptMessages2, OptMessages3,
     OptMessages4, OptMessages5
 )
 import logging
-from .app_settings import send_message, get_pings, resolve_corporation_name, get_users, get_user_id, get_character_id, get_user_profiles
+from .app_settings import send_message, get_pings, resolve_corporation_name, get_users, get_user_id, get_user_profiles
 from aa_bb.checks_cb.hostile_assets import get_corp_hostile_asset_locations
 from aa_bb.checks_cb.sus_contracts import get_corp_hostile_contracts
 from aa_bb.checks_cb.sus_trans import get_corp_hostile_transactions
 from aa_bb.checks.roles_and_tokens import get_user_roles_and_tokens
-from corptools.api.helpers import get_alts_queryset
 from datetime import timedelta, date
 from django.utils import timezone
 import time
@@ -30,6 +30,7 @@ import traceback
 import random
 from . import __version__
 from .modelss import PapCompliance, LeaveRequest
+from .menu_state import refresh_pending_loa_count
 
 logger = logging.getLogger(__name__)
 
@@ -70,17 +71,18 @@ def CB_run_regular_updates():
                 ignored_ids = {int(s) for s in ignored_str.split(",") if s.strip().isdigit()}
                 if corp_id in ignored_ids:  # allow admins to hide certain corps entirely
                     continue
+                # Load or create existing record (its wallet watermarks bound the journal scan)
+                corpstatus, created = CorpStatus.objects.get_or_create(corp_id=corp_id)
+                trans_watermarks = dict(corpstatus.trans_watermarks or {})
+
                 hostile_assets_result = get_corp_hostile_asset_locations(corp_id)
                 sus_contracts_result = { str(issuer_id): v for issuer_id, v in get_corp_hostile_contracts(corp_id).items() }
-                sus_trans_result = { str(issuer_id): v for issuer_id, v in get_corp_hostile_transactions(corp_id).items() }
+                sus_trans_result = { str(issuer_id): v for issuer_id, v in get_corp_hostile_transactions(corp_id, trans_watermarks).items() }
 
                 has_hostile_assets = bool(hostile_assets_result)
                 has_sus_contracts = bool(sus_contracts_result)
                 has_sus_trans = bool(sus_trans_result)
 
-                # Load or create existing record
-                corpstatus, created = CorpStatus.objects.get_or_create(corp_id=corp_id)
-
                 corp_changes = []
 
                 #corpstatus.hostile_assets = []
@@ -198,6 +200,7 @@ def CB_run_regular_updates():
                         logger.info(f"Measage: {msg}")
                         send_message(msg)
                         time.sleep(0.03)
+                corpstatus.trans_watermarks = trans_watermarks
                 corpstatus.updated = timezone.now()
                 corpstatus.save()
 
@@ -656,7 +659,11 @@ def BB_register_message_tasks():
 @shared_task
 def BB_run_regular_loa_updates():
     """
-    Scan every member main and update LoA statuses / inactivity flags.
+    Update LoA statuses and inactivity flags for every member main.
+
+    Works set-based: a handful of queries cover all members however many
+    there are, status changes are saved with one bulk_update and announced in
+    one digest message.
 
     - Skips entirely when the LoA DLC or feature toggle is off.
     - Marks approved requests as in-progress/finished based on dates.
@@ -670,71 +677,151 @@ def BB_run_regular_loa_updates():
     if not cfg.is_loa_active:  # Admin turned off the LoA feature.
         logger.info("LoA feature disabled; skipping updates.")
         return
-    member_states = BigBrotherConfig.get_solo().bb_member_states.all()
+    member_states = cfg.bb_member_states.all()
     qs_profiles = (
         UserProfile.objects
         .filter(state__in=member_states)
         .exclude(main_character=None)
         .select_related("user", "main_character")
     )
-    if not qs_profiles.exists():  # No members matching filters, so nothing to process.
+    mains = {p.user_id: p.main_character for p in qs_profiles}
+    if not mains:  # No members matching filters, so nothing to process.
         logger.info("No member mains found.")
         return
-    
+    member_ids = qs_profiles.values("user_id")  # Subquery; keeps the IN clause off the wire.
+    today = timezone.localdate()
+    now = timezone.now()
+
+    # 1) Status transitions for every member's requests, decided by the database.
+    started = list(
+        LeaveRequest.objects.filter(
+            user_id__in=member_ids, status="approved", start_date__lte=today, end_date__gte=today,
+        )
+    )
+    finished = list(
+        LeaveRequest.objects.filter(user_id__in=member_ids, end_date__lt=today)
+        .exclude(status="finished")
+    )
+    for lr in started:
+        lr.status = "in_progress"
+    for lr in finished:
+        lr.status = "finished"
+    if started or finished:  # One write and one digest for the whole run.
+        LeaveRequest.objects.bulk_update(started + finished, ["status"])
+        refresh_pending_loa_count()  # bulk_update skips the post_save signal that keeps the badge current.
+        lines = [f"- **{mains[lr.user_id]}**'s LoA Request status changed to in progress" for lr in started]
+        lines += [
+            f"- **{mains[lr.user_id]}**'s LoA from **{lr.start_date}** to **{lr.end_date}** "
+            f"for **{lr.reason}** has finished"
+            for lr in finished
+        ]
+        send_message(f"##{get_pings('LoA Changed Status')} LoA Status Changes:\n" + "\n".join(lines))
+
+    # 2) Inactivity: newest logoff across each member's characters, in one aggregate.
+    active_loa = set(
+        LeaveRequest.objects.filter(
+            user_id__in=member_ids, status="in_progress", start_date__lte=today, end_date__gte=today,
+        ).values_list("user_id", flat=True)
+    )
+    latest_logoffs = dict(
+        CharacterOwnership.objects.filter(user_id__in=member_ids)
+        .order_by()
+        .values("user_id")
+        .annotate(latest=Max("character__characteraudit__last_known_logoff"))
+        .values_list("user_id", "latest")
+    )
+
     flags = []
+    for user_id, main in mains.items():
+        latest_logoff = latest_logoffs.get(user_id)
+        if not latest_logoff:  # Without logoff data inactivity cannot be determined.
+            continue
+        days_since = (now - latest_logoff).days
+        if days_since > cfg.loa_max_logoff_days and user_id not in active_loa:  # Flag members inactive beyond policy without LoA.
+            flags.append(f"- **{main}** was last seen online on {latest_logoff} (**{days_since}** days ago where maximum w/o a LoA request is **{cfg.loa_max_logoff_days}**)")
+    if flags:  # Notify staff when inactivity breaches are detected.
+        flags_text = "\n".join(flags)
+        send_message(f"##{get_pings('LoA Inactivity')} Inactive Members Found:\n{flags_text}")
 
-    for profile in qs_profiles:
-        user = profile.user
-        # Determine main_character_id
-        try:
-            main_id = profile.main_character.character_id
-        except Exception:
-            main_id = get_character_id(profile)
 
-        # Load main character
-        ec = EveCharacter.objects.filter(character_id=main_id).first()
-        if not ec:  # Skip mains that cannot be resolved to an EveCharacter.
-            continue
+CLEANUP_CHUNK_SIZE = 5000  # Rows removed per short delete transaction.
 
-        # Find the most recent logoff among all alts
-        latest_logoff = None
-        for char in get_alts_queryset(ec):
-            audit = getattr(char, "characteraudit", None)
-            ts = getattr(audit, "last_known_logoff", None) if audit else None
-            if ts and (latest_logoff is None or ts > latest_logoff):  # Track the most recent logoff across alts.
-                latest_logoff = ts
 
-        if not latest_logoff:  # Without logoff data inactivity cannot be determined.
-            continue
+def _delete_in_chunks(qs, chunk_size: int = CLEANUP_CHUNK_SIZE, order_by: str | None = None) -> tuple[int, dict]:
+    """
+    Delete every row matched by qs in ascending PK ranges.
+
+    Each range is deleted in its own short transaction so the cleanup never
+    holds long locks on busy tables. Returns the total like QuerySet.delete(),
+    with per-model counts that include cascaded rows.
+
+    With `order_by` (the indexed column qs filters on), each chunk is instead
+    the first chunk_size matches in that column's order, so the chunk
+    selection is a range scan on its index rather than a walk of the PK.
+    """
+    from django.db import transaction
+
+    total = 0
+    per_model = {}
+    if order_by:  # Deleted rows drop out of qs, so every chunk is the head of the range.
+        while True:
+            pks = list(qs.order_by(order_by).values_list("pk", flat=True)[:chunk_size])
+            if not pks:  # Nothing left to delete.
+                break
+            with transaction.atomic():
+                count, by_model = qs.model.objects.filter(pk__in=pks).delete()
+            total += count
+            for label, n in by_model.items():
+                per_model[label] = per_model.get(label, 0) + n
+            if len(pks) < chunk_size:  # Final partial chunk.
+                break
+        return total, per_model
+
+    last_pk = None
+    while True:
+        window = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        pks = list(window.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not pks:  # Nothing left to delete.
+            break
+        with transaction.atomic():
+            count, by_model = window.filter(pk__lte=pks[-1]).delete()
+        total += count
+        for label, n in by_model.items():
+            per_model[label] = per_model.get(label, 0) + n
+        last_pk = pks[-1]
+        if len(pks) < chunk_size:  # Final partial range.
+            break
+    return total, per_model
 
-        # Compute days since that logoff
-        days_since = (timezone.now() - latest_logoff).days
 
-        # 1) Check and update any existing approved requests for this user
-        lr_qs = LeaveRequest.objects.filter(
-            user=user,
+@shared_task
+def BB_entity_cache_retention():
+    """
+    Keep EntityInfoCache bounded.
+
+    Rows not read for BB_ENTITY_CACHE_MAX_AGE_DAYS are dropped first, then the
+    least recently used rows are trimmed until at most BB_ENTITY_CACHE_MAX_ROWS
+    remain. Both passes are range deletes on the `updated` index.
+    """
+    from .models import EntityInfoCache
+    from .app_settings_2 import entity_cache_max_age_days, entity_cache_max_rows
+
+    cutoff = timezone.now() - timedelta(days=entity_cache_max_age_days())
+    aged, _ = _delete_in_chunks(EntityInfoCache.objects.filter(updated__lt=cutoff))
+
+    trimmed = 0
+    max_rows = entity_cache_max_rows()
+    if max_rows:  # LRU trim: everything at or below the stamp of the first row past the cap.
+        boundary = (
+            EntityInfoCache.objects.order_by("-updated")
+            .values_list("updated", flat=True)[max_rows:max_rows + 1]
         )
-        today = timezone.localdate()
-        for lr in lr_qs:
-            if lr.start_date <= today <= lr.end_date and lr.status == "approved":  # Approved LoAs become in-progress when dates hit.
-                lr.status = "in_progress"
-                lr.save(update_fields=["status"])
-                send_message(f"{user.username}'s LoA Request status changed to in progress")
-            elif today > lr.end_date and lr.status != "finished":  # Auto-close requests whose end dates passed.
-                lr.status = "finished"
-                lr.save(update_fields=["status"])
-                send_message(f"##{get_pings('LoA Changed Status')} **{ec}**'s LoA\n- from **{lr.start_date}**\n- to **{lr.end_date}**\n- for **{lr.reason}**\n## has finished")
-        has_active_loa = LeaveRequest.objects.filter(
-            user=user,
-            status="in_progress",
-            start_date__lte=today,
-            end_date__gte=today,
-        ).exists()
-        if days_since > cfg.loa_max_logoff_days and not has_active_loa:  # Flag members inactive beyond policy without LoA.
-            flags.append(f"- **{ec}** was last seen online on {latest_logoff} (**{days_since}** days ago where maximum w/o a LoA request is **{cfg.loa_max_logoff_days}**)")
-    if flags:  # Notify staff when inactivity breaches are detected.
-        flags_text = "\n".join(flags)
-        send_message(f"##{get_pings('LoA Inactivity')} Inactive Members Found:\n{flags_text}")
+        boundary = next(iter(boundary), None)
+        if boundary is not None:  # Table is over the cap.
+            trimmed, _ = _delete_in_chunks(EntityInfoCache.objects.filter(updated__lte=boundary))
+
+    logger.info(f"EntityInfoCache retention: {aged} aged out, {trimmed} trimmed (LRU)")
+    return aged, trimmed
 
 
 @shared_task
@@ -744,10 +831,12 @@ def BB_daily_DB_cleanup():
 
     Deletes stale name caches, employment caches, processed mail/contract/transaction
     entries that no longer have backing data, and non-member PAP compliance rows.
+    Orphans are found with NOT EXISTS anti-joins and every delete runs in
+    bounded PK-range chunks (see _delete_in_chunks).
     """
+    from django.db.models import Exists, OuterRef
     from .models import (
-        Alliance_names, Character_names, Corporation_names, UserStatus, EntityInfoCache,
-        id_types,
+        Alliance_names, Character_names, Corporation_names, UserStatus, id_types,
     )
     from .modelss import (
         CharacterEmploymentCache, FrequentCorpChangesCache, CurrentStintCache, AwoxKillsCache,
@@ -755,23 +844,24 @@ def BB_daily_DB_cleanup():
     )
     two_months_ago = timezone.now() - timedelta(days=60)
     flags = []
-    #Delete old model entries
+    #Delete old model entries (chunks walk the `updated` index where the model has one)
     models_to_cleanup = [
         (Alliance_names, "alliance"),
         (Character_names, "character"),
         (Corporation_names, "corporation"),
         (UserStatus, "User Status"),
-        (EntityInfoCache, "Entity Info Cache"),
         (CorporationInfoCache, "Corporation Info Cache"),
         (AllianceHistoryCache, "Alliance History Cache"),
         (SovereigntyMapCache, "Sovereignty Map Cache"),
     ]
 
     for model, name in models_to_cleanup:
-        old_entries = model.objects.filter(updated__lt=two_months_ago)
-        count, _ = old_entries.delete()
+        count, _ = _delete_in_chunks(model.objects.filter(updated__lt=two_months_ago), order_by="updated")
         flags.append(f"- Deleted {count} old {name} records.")
 
+    aged, trimmed = BB_entity_cache_retention()
+    flags.append(f"- Deleted {aged} old and {trimmed} least recently used Entity Info Cache records.")
+
     # Cleanup caches using last_accessed
     last_access_models = [
         (CharacterEmploymentCache, "Character Employment Cache"),
@@ -781,16 +871,14 @@ def BB_daily_DB_cleanup():
     ]
     for model, name in last_access_models:
         try:
-            old_entries = model.objects.filter(last_accessed__lt=two_months_ago)
-            count, _ = old_entries.delete()
+            count, _ = _delete_in_chunks(model.objects.filter(last_accessed__lt=two_months_ago), order_by="last_accessed")
             flags.append(f"- Deleted {count} old {name} records (by last access).")
         except Exception:
             continue
 
     # id_types: delete if not looked up in last 60 days
     try:
-        stale_ids = id_types.objects.filter(last_accessed__lt=two_months_ago)
-        count, _ = stale_ids.delete()
+        count, _ = _delete_in_chunks(id_types.objects.filter(last_accessed__lt=two_months_ago), order_by="last_accessed")
         flags.append(f"- Deleted {count} old ID type cache records (by last access).")
     except Exception:
         pass
@@ -808,61 +896,36 @@ def BB_daily_DB_cleanup():
         CharacterWalletJournalEntry,
         CorporationWalletJournalEntry,
     )
-    from django.db import transaction
+    # Sus*Note rows are OneToOne with CASCADE, so they go with their processed row
+    # and are counted from the per-model totals of each chunked delete.
+
     # -- CONTRACTS --
-    # Get all contract_ids that exist in Contract
-    existing_CorporateContract_ids = set(
-        CorporateContract.objects.values_list('contract_id', flat=True)
+    orphaned_processed_contracts = ProcessedContract.objects.filter(
+        ~Exists(Contract.objects.filter(contract_id=OuterRef("contract_id"))),
+        ~Exists(CorporateContract.objects.filter(contract_id=OuterRef("contract_id"))),
     )
-    existing_playercontract_ids = set(
-        Contract.objects.values_list('contract_id', flat=True)
-    )
-    existing_contract_ids = existing_CorporateContract_ids | existing_playercontract_ids
-    
-    # Find ProcessedContract entries not in Contract
-    orphaned_processed_contracts = ProcessedContract.objects.exclude(contract_id__in=existing_contract_ids)
-    orphaned_contract_ids = list(orphaned_processed_contracts.values_list('contract_id', flat=True))
-    
-    # Delete orphans in SusContractNote (OneToOneField links to ProcessedContract)
-    sus_contracts_to_delete = SusContractNote.objects.filter(contract_id__in=orphaned_contract_ids)
-    
-    with transaction.atomic():
-        count_sus = sus_contracts_to_delete.delete()[0]
-        count_proc = orphaned_processed_contracts.delete()[0]
-    
+    _, by_model = _delete_in_chunks(orphaned_processed_contracts)
+    count_proc = by_model.get(ProcessedContract._meta.label, 0)
+    count_sus = by_model.get(SusContractNote._meta.label, 0)
     flags.append(f"- Deleted {count_proc} old ProcessedContract and {count_sus} SusContractNote records.")
-    
+
     # -- MAILS --
-    existing_mail_ids = set(
-        MailMessage.objects.values_list('id_key', flat=True)
+    orphaned_processed_mails = ProcessedMail.objects.filter(
+        ~Exists(MailMessage.objects.filter(id_key=OuterRef("mail_id"))),
     )
-    
-    orphaned_processed_mails = ProcessedMail.objects.exclude(mail_id__in=existing_mail_ids)
-    orphaned_mail_ids = list(orphaned_processed_mails.values_list('mail_id', flat=True))
-    
-    sus_mails_to_delete = SusMailNote.objects.filter(mail_id__in=orphaned_mail_ids)
-    
-    with transaction.atomic():
-        count_sus = sus_mails_to_delete.delete()[0]
-        count_proc = orphaned_processed_mails.delete()[0]
-    
+    _, by_model = _delete_in_chunks(orphaned_processed_mails)
+    count_proc = by_model.get(ProcessedMail._meta.label, 0)
+    count_sus = by_model.get(SusMailNote._meta.label, 0)
     flags.append(f"- Deleted {count_proc} old ProcessedMail and {count_sus} SusMailNote records.")
-    
+
     # -- TRANSACTIONS --
-    existing_entry_ids = (
-        set(CharacterWalletJournalEntry.objects.values_list('entry_id', flat=True))
-        | set(CorporationWalletJournalEntry.objects.values_list('entry_id', flat=True))
+    orphaned_processed_transactions = ProcessedTransaction.objects.filter(
+        ~Exists(CharacterWalletJournalEntry.objects.filter(entry_id=OuterRef("entry_id"))),
+        ~Exists(CorporationWalletJournalEntry.objects.filter(entry_id=OuterRef("entry_id"))),
     )
-    
-    orphaned_processed_transactions = ProcessedTransaction.objects.exclude(entry_id__in=existing_entry_ids)
-    orphaned_entry_ids = list(orphaned_processed_transactions.values_list('entry_id', flat=True))
-    
-    sus_transactions_to_delete = SusTransactionNote.objects.filter(transaction_id__in=orphaned_entry_ids)
-    
-    with transaction.atomic():
-        count_sus = sus_transactions_to_delete.delete()[0]
-        count_proc = orphaned_processed_transactions.delete()[0]
-    
+    _, by_model = _delete_in_chunks(orphaned_processed_transactions)
+    count_proc = by_model.get(ProcessedTransaction._meta.label, 0)
+    count_sus = by_model.get(SusTransactionNote._meta.label, 0)
     flags.append(f"- Deleted {count_proc} old ProcessedTransaction and {count_sus} SusTransactionNote records.")
 
     # -- PAP COMPLIANCE: drop entries for non-members --
@@ -0,0 +1,322 @@
+"""
+Celery task that turns a submitted PAP form into the monthly chart.
+
+The web request only parses the form and queues `BB_generate_pap_chart`; the
+task applies the PAP modifiers, updates PapCompliance in bulk and renders the
+chart with matplotlib's headless Agg canvas (imported lazily, so processes
+that never draw a chart never load matplotlib).
+
+The submitted counts become the month's final PapMonthlyRollup rows;
+`BB_update_pap_rollups` keeps the rows of months still open current.
+
+Each render is written as PNG and SVG under MEDIA_ROOT/paps, named after the
+month and a version digest of the PAP config and data, next to a JSON
+manifest that also carries the chart data for client-side charting. The
+manifest is fronted by the Django cache.
+"""
+
+import calendar
+import glob
+import hashlib
+import json
+import logging
+import os
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .app_settings import get_user_profiles
+from .models import BigBrotherConfig
+from .modelss import LeaveRequest, PapCompliance, PapMonthlyRollup, TicketToolConfig
+from .paps_stats import PapRules, lock_pap_rollups, month_start, refresh_pap_rollups
+
+logger = logging.getLogger(__name__)
+
+PAP_CHART_DIR = "paps"
+PAP_CHART_TTL = 7 * 24 * 60 * 60  # Seconds; the manifest file on disk is the durable copy.
+PAP_CHART_PENDING_TTL = 10 * 60  # Seconds a queued render is reported as "in progress".
+CHART_COLUMNS = ["name", "alliance", "coalition", "corp", "corp_ab"]
+VERSIONED_FIELDS = ("required_paps", "corp_modifier", "max_corp_paps", "alliance_modifier", "coalition_modifier")
+
+
+def _chart_key(year: int, month: int) -> str:
+    return f"aa_bb:paps:chart:{year}:{month}"
+
+
+def _pending_key(year: int, month: int) -> str:
+    return f"aa_bb:paps:chart_pending:{year}:{month}"
+
+
+def _chart_path(name: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, PAP_CHART_DIR, name)
+
+
+def chart_url(name: str) -> str:
+    return f"{settings.MEDIA_URL}{PAP_CHART_DIR}/{name}"
+
+
+def chart_manifest(year: int, month: int) -> dict | None:
+    """Manifest of the latest chart for the month ({version, png, svg, data}), or None."""
+    manifest = cache.get(_chart_key(year, month))
+    if manifest is None:  # Cold cache: fall back to the manifest on disk.
+        try:
+            with open(_chart_path(f"pap_chart_{year}_{month}.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        cache.set(_chart_key(year, month), manifest, PAP_CHART_TTL)
+    return manifest
+
+
+def chart_pending(year: int, month: int) -> bool:
+    return bool(cache.get(_pending_key(year, month)))
+
+
+def queue_pap_chart(year: int, month: int, submitted: dict) -> None:
+    """Queue a chart render for the month; `submitted` is {user_id: [corp, alliance, coalition]}."""
+    cache.set(_pending_key(year, month), True, PAP_CHART_PENDING_TTL)
+    BB_generate_pap_chart.delay(year, month, {str(uid): paps for uid, paps in submitted.items()})
+
+
+def build_chart_data(year: int, month: int, rows: list, rules: PapRules) -> dict:
+    """Everything needed to draw the chart, as plain JSON-serialisable data."""
+    conf = rules.conf
+    return {
+        "year": year,
+        "month": month,
+        "title": f"{BigBrotherConfig.get_solo().main_corporation} Fleet Breakdown for {calendar.month_name[month]} {year}",
+        "required_paps": conf.required_paps,
+        "labels": {
+            "alliance": f"Alliance Paps(x{conf.alliance_modifier})",
+            "coalition": f"Coalition Paps(x{conf.coalition_modifier})",
+            "corp": f"Corp Paps(x{conf.corp_modifier}, max {conf.max_corp_paps})",
+            "corp_ab": f"Corp Paps above {conf.max_corp_paps}(x{conf.corp_modifier})",
+        },
+        "columns": CHART_COLUMNS,
+        "rows": rows,
+    }
+
+
+def rollup_chart_data(year: int, month: int) -> dict | None:
+    """Chart data for the month built from its PAP rollups (one query), or None without rows."""
+    rules = PapRules()
+    rollups = (
+        PapMonthlyRollup.objects.filter(month=month_start(year, month))
+        .exclude(user_id__in=rules.excluded_user_ids)
+        .order_by("user__profile__main_character__character_name")
+        .values_list(
+            "user__profile__main_character__character_name", "corp_paps", "alliance_paps", "coalition_paps",
+        )
+    )
+    rows = []
+    for name, corp, alliance, coalition in rollups:
+        w = rules.weigh(corp, alliance, coalition)
+        rows.append([name, w["alliance"], w["coalition"], w["corp"], w["corp_ab"]])
+    return build_chart_data(year, month, rows, rules) if rows else None
+
+
+def chart_version(data: dict, rules: PapRules) -> str:
+    """Digest of the PAP config and chart data; changes whenever the rendered image would."""
+    parts = [str(getattr(rules.conf, f)) for f in VERSIONED_FIELDS]
+    parts.append(json.dumps(data, sort_keys=True))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+
+def render_chart(data: dict, paths: list[str]) -> None:
+    """Draw the stacked PAP chart once and save it to each path (format from the extension)."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    fig.patch.set_facecolor('#4B4B4B')  # Dark grey background
+    ax.set_facecolor('#4B4B4B')
+
+    columns = data["columns"]
+    series = {c: [row[i] for row in data["rows"]] for i, c in enumerate(columns)}
+    names, alliance, coalition = series["name"], series["alliance"], series["coalition"]
+    corp, corp_abo = series["corp"], series["corp_ab"]
+    labels = data["labels"]
+    required = data["required_paps"]
+    x = range(len(names))
+
+    # Bottom: Alliance, then Coalition, Corp (capped part) and Corp above cap
+    ax.bar(x, alliance, label=labels["alliance"], color="#58D68D")
+    ax.bar(x, coalition, bottom=alliance, label=labels["coalition"], color="#F5B041")
+    bottom_stack = [l + im for l, im in zip(alliance, coalition)]
+    ax.bar(x, corp, bottom=bottom_stack, label=labels["corp"], color="#5DADE2")
+    corp_stack = [b + c for b, c in zip(bottom_stack, corp)]
+    ax.bar(x, corp_abo, bottom=corp_stack, label=labels["corp_ab"], color="#9EC5DF")
+
+    ax.axhline(y=required, color='red', linestyle='--', linewidth=2, label='PAP Requirement')
+
+    # Labels and style
+    ax.set_xticks(list(x))
+    ax.set_xticklabels(names, rotation=45, ha="right", color='white')
+    ax.set_ylabel("Total Paps", color='white')
+    ax.set_title(data["title"], color='white', fontweight='bold')
+    for spine in ax.spines.values():
+        spine.set_color('black')
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    ax.legend(loc='upper right', facecolor='#4B4B4B', edgecolor='white', labelcolor='white')
+
+    # Totals above the capped stack, plus the uncapped total where it differs
+    for i, (l, im, c, ca) in enumerate(zip(alliance, coalition, corp, corp_abo)):
+        total = l + im + c
+        ax.text(i, total, str(total), ha='center', va='bottom', color='white' if total >= required else 'red', fontsize=10)
+        if ca:  # Corp PAPs above the cap stack on top.
+            ax.text(i, total + ca, str(total + ca), ha='center', va='bottom', color='white', fontsize=10)
+
+    max_total = max([l + im + c + ca for l, im, c, ca in zip(alliance, coalition, corp, corp_abo)], default=0)
+    ax.set_ylim(0, max(max_total, required) * 1.1)
+
+    fig.tight_layout()
+    for path in paths:
+        fig.savefig(path, dpi=150, facecolor=fig.get_facecolor())  # save with background
+
+
+def _update_pap_compliance(profiles: list, meets: dict) -> dict:
+    """
+    Move each profile's PapCompliance meter one step, with one bulk write per
+    kind. Returns {profile pk: new meter value} ({} when the meter is off).
+    """
+    tcfg = TicketToolConfig.get_solo()
+    max_compliance = tcfg.max_months_without_pap_compliance or 0
+    if max_compliance == 0:  # PAP compliance meter disabled.
+        return {}
+    starting_compliance = tcfg.starting_pap_compliance or 1
+
+    existing = {}
+    for pc in PapCompliance.objects.filter(user_profile__in=profiles).order_by("-pk"):
+        existing[pc.user_profile_id] = pc  # Descending pk: the lowest pk (what get_or_create used) wins.
+
+    to_create, to_update = [], []
+    for profile in profiles:
+        pc = existing.get(profile.pk)
+        if pc is None:  # First month on record.
+            pc = PapCompliance(user_profile=profile, pap_compliant=starting_compliance)
+            to_create.append(pc)
+        else:
+            to_update.append(pc)
+        if meets[profile.pk]:  # Met the requirement this month.
+            pc.pap_compliant = min(pc.pap_compliant + 1, max_compliance)
+        else:
+            pc.pap_compliant = max(pc.pap_compliant - 1, 0)  # keep it non-negative
+    PapCompliance.objects.bulk_create(to_create)
+    PapCompliance.objects.bulk_update(to_update, ["pap_compliant"])
+    return {pc.user_profile_id: pc.pap_compliant for pc in to_create + to_update}
+
+
+def _finalize_rollups(year: int, month: int, profiles: list, submitted: dict, meets: dict) -> None:
+    """
+    Store the submitted counts as the month's final rollup rows.
+
+    The compliance meter moves only for members whose month was still open,
+    so submitting the form again for a closed month corrects the numbers and
+    the chart without counting the month twice. The meter step and the rows
+    are written in one transaction under `lock_pap_rollups`, so a failed or
+    concurrent submission can never step the meter without finalizing.
+    """
+    start = month_start(year, month)
+    with transaction.atomic():
+        lock_pap_rollups()
+        rows = {
+            row.user_id: row
+            for row in PapMonthlyRollup.objects.select_for_update().filter(month=start)
+        }
+        closed = {uid for uid, row in rows.items() if row.finalized}
+        scores = _update_pap_compliance([p for p in profiles if p.user_id not in closed], meets)
+
+        now = timezone.now()
+        changed, created = [], []
+        for p in profiles:
+            row = rows.get(p.user_id)
+            if row is None:  # No open row was counted for this member.
+                row = PapMonthlyRollup(user_id=p.user_id, month=start)
+                created.append(row)
+            else:
+                row.updated = now
+                changed.append(row)
+            row.corp_paps, row.alliance_paps, row.coalition_paps = submitted[p.user_id]
+            row.compliant = meets[p.pk]
+            if p.user_id not in closed:  # Closed months keep the meter value recorded first.
+                row.pap_score = scores.get(p.pk)
+            row.finalized = True
+        PapMonthlyRollup.objects.bulk_update(
+            changed,
+            ["corp_paps", "alliance_paps", "coalition_paps", "compliant", "pap_score", "finalized", "updated"],
+        )
+        PapMonthlyRollup.objects.bulk_create(created, ignore_conflicts=True)
+
+
+@shared_task
+def BB_generate_pap_chart(year: int, month: int, submitted: dict):
+    """
+    Apply the PAP rules to the submitted form values, finalize the month's
+    PAP rollups (and PapCompliance) and write the chart artifacts and manifest.
+    """
+    rules = PapRules()
+    on_loa = set(LeaveRequest.objects.filter(status="in_progress").values_list("user_id", flat=True))
+    profiles = [
+        p for p in get_user_profiles()
+        if p.user_id not in rules.excluded_user_ids and p.user_id not in on_loa  # Excluded pilots and members on leave.
+    ]
+
+    rows = []
+    meets = {}
+    counts = {}
+    for profile in profiles:
+        corp, alliance, coalition = (max(int(v), 0) for v in submitted.get(str(profile.user_id), (0, 0, 0)))
+        counts[profile.user_id] = (corp, alliance, coalition)
+        w = rules.weigh(corp, alliance, coalition)
+        rows.append([profile.main_character.character_name, w["alliance"], w["coalition"], w["corp"], w["corp_ab"]])
+        meets[profile.pk] = rules.meets(corp, alliance, coalition)
+
+    _finalize_rollups(year, month, profiles, counts, meets)
+
+    data = build_chart_data(year, month, rows, rules)
+    version = chart_version(data, rules)
+    stem = f"pap_chart_{year}_{month}"
+    os.makedirs(_chart_path(""), exist_ok=True)
+    stale = glob.glob(_chart_path(f"{stem}_*.png")) + glob.glob(_chart_path(f"{stem}_*.svg"))
+    png, svg = f"{stem}_{version}.png", f"{stem}_{version}.svg"
+    render_chart(data, [_chart_path(png), _chart_path(svg)])
+
+    manifest = {"version": version, "png": png, "svg": svg, "data": data}
+    tmp = _chart_path(f"{stem}.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, _chart_path(f"{stem}.json"))  # Readers never see a half-written manifest.
+    cache.set(_chart_key(year, month), manifest, PAP_CHART_TTL)
+    cache.delete(_pending_key(year, month))
+
+    for path in stale:
+        if os.path.basename(path) not in (png, svg):  # Older renders of the same month.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    logger.info(f"PAP chart {stem} rendered (version {version}, {len(rows)} members)")
+
+
+@shared_task
+def BB_update_pap_rollups():
+    """
+    Recount the open months' PAP rollups: the current month, and the previous
+    one until its PAP form is submitted and the month is finalized.
+    """
+    if not BigBrotherConfig.get_solo().is_paps_active:  # PAP module turned off.
+        logger.info("PAP module disabled; skipping BB_update_pap_rollups.")
+        return
+    rules = PapRules()
+    today = timezone.localdate()
+    previous = today.replace(day=1) - timedelta(days=1)
+    for month in (previous, today):
+        written = refresh_pap_rollups(month.year, month.month, rules)
+        logger.info(f"PAP rollups {month:%Y-%m}: {written} open rows refreshed")
@@ -1,143 +1,205 @@
 """Celery tasks and helpers that manage compliance tickets and reminders."""
 
 import logging
+from functools import cached_property
 from typing import Optional
 
 from celery import shared_task
+from django.db.models import Max
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from allianceauth.authentication.models import UserProfile
-from allianceauth.eveonline.models import EveCharacter
+from allianceauth.authentication.models import CharacterOwnership, UserProfile
 from allianceauth.services.modules.discord.models import DiscordUser
 from aadiscordbot.tasks import run_task_function
 from aadiscordbot.utils.auth import get_discord_user_id
 from aadiscordbot.cogs.utils.exceptions import NotAuthenticated
 from aadiscordbot.app_settings import get_admins
-from corptools.api.helpers import get_alts_queryset
 
 from .models import BigBrotherConfig
 from .modelss import TicketToolConfig, PapCompliance, LeaveRequest, ComplianceTicket
-from .app_settings import send_message, get_user_profiles, get_character_id
+from .app_settings import send_message, get_user_profiles
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-def corp_check(user) -> bool:
-    """
-    Determine whether the user passes the corp compliance filter.
+COMPLIANCE_CHECKS = ("corp_check", "paps_check", "afk_check", "discord_check")
 
-    Returns True whenever the corp check feature is disabled or when the current
-    ComplianceFilter evaluates truthy for the account.
-    """
-    if not TicketToolConfig.get_solo().corp_check_enabled:  # Feature disabled -> automatically compliant.
-        return True
-    try:
-        cfg: Optional[TicketToolConfig] = TicketToolConfig.get_solo()
-    except Exception:
-        # If the singleton isn't set up yet, be lenient.
-        logger.warning("TicketToolConfig.get_solo() failed; treating user as compliant.")
-        return True
 
-    if not cfg or not cfg.compliance_filter:  # Missing configuration leaves everyone compliant.
-        return True
-
-    try:
-        # process_filter(user) returns the 'check' boolean for this user,
-        # where 'check' already applies the filter and the 'negate' flag.
-        return bool(cfg.compliance_filter.process_filter(user))
-    except Exception:
-        # Misconfiguration or unexpected error: log and be lenient.
-        logger.exception("Error while running compliance filter for user id=%s", user.id)
-        return True
-
-
-def paps_check(user):
+class ComplianceSnapshot:
     """
-    Inspect PAP compliance state for the user, honoring LoA in-progress status.
+    Inputs of the four compliance checks, loaded once for a whole set of users.
 
-    Returns True when PAP checks are disabled, the user has an LoA pending, or
-    their PapCompliance row indicates compliance.
+    Each input (active LoAs, PAP scores, latest logoff, mains, Discord links,
+    exclusions, compliance filter results) is a single query over all users, run lazily on first use so a
+    snapshot built for one check only loads what that check needs. Per-user
+    decisions are then set/dict lookups.
     """
-    if not TicketToolConfig.get_solo().paps_check_enabled:  # Globally disabled -> compliant.
-        return True
-    lr_qs = LeaveRequest.objects.filter(
-            user=user,
-            status="in_progress",
-        ).exists()
-    if lr_qs:  # Active LoA suppresses PAP enforcement.
-        return True
-    try:
-        profile = user.profile  # thanks to related_name='profile'
-    except UserProfile.DoesNotExist:
-        return True  # No profile at all, treat as compliant
 
-    pc = PapCompliance.objects.filter(user_profile=profile).first()
-    if not pc:  # Without compliance data the check cannot fail the user.
-        return True
+    def __init__(self, users, tcfg: Optional[TicketToolConfig] = None):
+        self.user_ids = sorted({u.id for u in users if u is not None})
+        self.tcfg = tcfg if tcfg is not None else TicketToolConfig.get_solo()
+        self.now = timezone.now()
+
+    @cached_property
+    def excluded_ids(self) -> set:
+        return set(self.tcfg.excluded_users.values_list("id", flat=True))
+
+    @cached_property
+    def loa_ids(self) -> set:
+        """Users with an LoA in progress."""
+        return set(
+            LeaveRequest.objects.filter(user_id__in=self.user_ids, status="in_progress")
+            .values_list("user_id", flat=True)
+        )
 
-    return pc.pap_compliant > 0
+    @cached_property
+    def pap_scores(self) -> dict:
+        """{user_id: pap_compliant} from each profile's first PapCompliance row."""
+        rows = (
+            PapCompliance.objects.filter(user_profile__user_id__in=self.user_ids)
+            .order_by("-pk")
+            .values_list("user_profile__user_id", "pap_compliant")
+        )
+        return dict(rows)  # Descending pk: the lowest pk (what .first() returned) wins.
+
+    @cached_property
+    def main_ids(self) -> set:
+        """Users whose profile has a main character."""
+        return set(
+            UserProfile.objects.filter(user_id__in=self.user_ids)
+            .exclude(main_character=None)
+            .values_list("user_id", flat=True)
+        )
 
+    @cached_property
+    def latest_logoff(self) -> dict:
+        """{user_id: newest last_known_logoff across all owned characters}."""
+        rows = (
+            CharacterOwnership.objects.filter(user_id__in=self.user_ids)
+            .order_by()
+            .values("user_id")
+            .annotate(latest=Max("character__characteraudit__last_known_logoff"))
+            .values_list("user_id", "latest")
+        )
+        return dict(rows)
 
-def afk_check(user):
-    """
-    Evaluate AFK compliance based on most recent logoff among the user's alts.
+    @cached_property
+    def discord_ids(self) -> set:
+        """Users with a linked Discord account."""
+        return set(
+            DiscordUser.objects.filter(user_id__in=self.user_ids).values_list("user_id", flat=True)
+        )
 
-    Returns False if no logoff data exists, the main is missing, or the latest
-    logout exceeds the configured max AFK days.
-    """
-    if not TicketToolConfig.get_solo().afk_check_enabled:  # Disabled toggle => user passes check.
-        return True
-    tcfg = TicketToolConfig.get_solo()
-    max_afk_days = tcfg.Max_Afk_Days
-    lr_qs = LeaveRequest.objects.filter(
-            user=user,
-            status="in_progress",
-        ).exists()
-    if lr_qs:  # LoA overrides AFK failures.
-        return True
-    profile = UserProfile.objects.get(user=user)
-    if not profile:  # Missing profile prevents further evaluation.
-        return False
+    @cached_property
+    def corp_results(self) -> Optional[dict]:
+        """
+        {user_id: passes compliance filter}, from one audit_filter() call over
+        every user in the snapshot. None when the bulk call failed, in which
+        case corp_check falls back to the per-user path.
+        """
+        flt = self.tcfg.compliance_filter
+        try:
+            # audit_filter(users) returns {user_id: {"message": str, "check": bool}},
+            # where 'check' already applies the filter and the 'negate' flag.
+            results = flt.audit_filter(User.objects.filter(id__in=self.user_ids))
+        except Exception:
+            logger.exception("Bulk compliance filter evaluation failed; falling back to per-user checks.")
+            return None
+        return {
+            uid: bool(results[uid]["check"]) if uid in results else False  # Missing = filter did not match.
+            for uid in self.user_ids
+        }
+
+    def is_excluded(self, user) -> bool:
+        return user.id in self.excluded_ids
+
+    def corp_check(self, user) -> bool:
+        """
+        True whenever the corp check feature is disabled or when the current
+        ComplianceFilter evaluates truthy for the account.
+        """
+        cfg = self.tcfg
+        if not cfg.corp_check_enabled:  # Feature disabled -> automatically compliant.
+            return True
+        if not cfg.compliance_filter:  # Missing configuration leaves everyone compliant.
+            return True
+        if self.corp_results is not None and user.id in self.corp_results:  # Bulk result for this run.
+            return self.corp_results[user.id]
+        try:
+            # process_filter(user) returns the 'check' boolean for this user,
+            # where 'check' already applies the filter and the 'negate' flag.
+            return bool(cfg.compliance_filter.process_filter(user))
+        except Exception:
+            # Misconfiguration or unexpected error: log and be lenient.
+            logger.exception("Error while running compliance filter for user id=%s", user.id)
+            return True
+
+    def paps_check(self, user) -> bool:
+        """
+        True when PAP checks are disabled, the user has an LoA in progress, or
+        their PapCompliance row indicates compliance.
+        """
+        if not self.tcfg.paps_check_enabled:  # Globally disabled -> compliant.
+            return True
+        if user.id in self.loa_ids:  # Active LoA suppresses PAP enforcement.
+            return True
+        score = self.pap_scores.get(user.id)
+        if score is None:  # Without compliance data the check cannot fail the user.
+            return True
+        return score > 0
+
+    def afk_check(self, user) -> bool:
+        """
+        False if no logoff data exists, the main is missing, or the latest
+        logout across the user's characters exceeds the configured max AFK days.
+        """
+        if not self.tcfg.afk_check_enabled:  # Disabled toggle => user passes check.
+            return True
+        if user.id in self.loa_ids:  # LoA overrides AFK failures.
+            return True
+        if user.id not in self.main_ids:  # Cannot determine AFK without a main character.
+            return False
+        latest_logoff = self.latest_logoff.get(user.id)
+        if not latest_logoff:  # No logoff information means fail the AFK check.
+            return False
+        days_since = (self.now - latest_logoff).days
+        return days_since < self.tcfg.Max_Afk_Days  # Too many days inactive triggers failure.
+
+    def discord_check(self, user) -> bool:
+        """True when the Discord check is disabled or the user has linked Discord."""
+        if not self.tcfg.discord_check_enabled:  # Disabled toggle permits everyone.
+            return True
+        return user.id in self.discord_ids
+
+    def check(self, reason: str, user) -> bool:
+        return getattr(self, reason)(user)
+
+
+def corp_check(user) -> bool:
+    """Single-user corp filter check; see ComplianceSnapshot.corp_check."""
     try:
-        main_id = profile.main_character.character_id
+        tcfg: Optional[TicketToolConfig] = TicketToolConfig.get_solo()
     except Exception:
-        main_id = get_character_id(profile)
+        # If the singleton isn't set up yet, be lenient.
+        logger.warning("TicketToolConfig.get_solo() failed; treating user as compliant.")
+        return True
+    return ComplianceSnapshot([user], tcfg).corp_check(user)
 
-    # Load main character
-    ec = EveCharacter.objects.filter(character_id=main_id).first()
-    if not ec:  # Cannot determine AFK if the main character record is missing.
-        return False
 
-    # Find the most recent logoff among all alts
-    latest_logoff = None
-    for char in get_alts_queryset(ec):
-        audit = getattr(char, "characteraudit", None)
-        ts = getattr(audit, "last_known_logoff", None) if audit else None
-        if ts and (latest_logoff is None or ts > latest_logoff):  # Track the newest timestamp.
-            latest_logoff = ts
+def paps_check(user):
+    """Single-user PAP check; see ComplianceSnapshot.paps_check."""
+    return ComplianceSnapshot([user]).paps_check(user)
 
-    if not latest_logoff:  # No logoff information means fail the AFK check.
-        return False
 
-    # Compute days since that logoff
-    days_since = (timezone.now() - latest_logoff).days
-    if days_since >= max_afk_days:  # Too many days inactive triggers failure.
-        return False
-    return True
+def afk_check(user):
+    """Single-user AFK check; see ComplianceSnapshot.afk_check."""
+    return ComplianceSnapshot([user]).afk_check(user)
 
 
 def discord_check(user):
-    """
-    Ensure the user has authenticated a Discord account if the feature is enabled.
-    """
-    if not TicketToolConfig.get_solo().discord_check_enabled:  # Disabled toggle permits everyone.
-        return True
-    try:
-        discord_id = get_discord_user_id(user)
-    except NotAuthenticated:
-        return False  # Missing Discord auth fails the check.
-    return True
+    """Single-user Discord check; see ComplianceSnapshot.discord_check."""
+    return ComplianceSnapshot([user]).discord_check(user)
 
 
 
@@ -164,13 +226,6 @@ def hourly_compliance_check():
         "discord_check": tcfg.discord_check_frequency,
     }
 
-    reason_checkers = {
-        "corp_check": (corp_check, tcfg.corp_check_reason),
-        "paps_check": (paps_check, tcfg.paps_check_reason),
-        "afk_check": (afk_check, tcfg.afk_check_reason),
-        "discord_check": (discord_check, tcfg.discord_check_reason),
-    }
-
     reminder_messages = {
         "corp_check": tcfg.corp_check_reminder,
         "paps_check": tcfg.paps_check_reminder,
@@ -181,46 +236,53 @@ def hourly_compliance_check():
     now = timezone.now()
 
     profiles = list(get_user_profiles())
-    allowed_users = {p.user for p in profiles}
+    allowed_user_ids = {p.user_id for p in profiles}
+    tickets = list(ComplianceTicket.objects.select_related("user"))
+    open_tickets = {(t.user_id, t.reason) for t in tickets if not t.is_resolved}
+
+    # One snapshot covers members and ticket holders who may have left.
+    snapshot = ComplianceSnapshot([p.user for p in profiles] + [t.user for t in tickets], tcfg)
+
+    # Discord work is collected into one bot task dispatched at the end.
+    ops = []
 
     # 1. Check compliance reasons
-    for UserProfil in get_user_profiles():
-        user = UserProfil.user
-        if user in tcfg.excluded_users.all():  # Skip users explicitly excluded from checks.
+    for profile in profiles:
+        user = profile.user
+        if snapshot.is_excluded(user):  # Skip users explicitly excluded from checks.
             continue
-        for reason, (checker, msg_template) in reason_checkers.items():
-            checked = checker(user)
+        for reason in COMPLIANCE_CHECKS:
+            checked = snapshot.check(reason, user)
             if not checked:  # Non-compliant result requires a ticket/ensuring existing one.
                 logger.info(f"user{user},reason{reason},checked{checked}")
-                ensure_ticket(user, reason)
+                if (user.id, reason) not in open_tickets:  # ensure_ticket would find it and do nothing.
+                    ensure_ticket(user, reason, tcfg, ops=ops)
 
     # 2. Process existing tickets
-    for ticket in ComplianceTicket.objects.all():
+    for ticket in tickets:
         reason = ticket.reason
 
         if reason == "char_removed" or reason == "awox_kill":  # These rely on manual resolution flow.
             logger.info(f"reason:{reason}, resolved:{ticket.is_resolved}")
             if ticket.is_resolved:  # Completed ticket can be closed out and announced.
                 logger.info(f"reason:{reason}")
-                close_ticket(ticket)
+                close_ticket(ticket, ops=ops)
                 send_message(f"ticket for <@{ticket.discord_user_id}> resolved")
             continue
 
-        checker, _ = reason_checkers[reason]
-
         # resolved?
-        if ticket.user and checker(ticket.user):  # Condition cleared, close and notify.
-            close_ticket(ticket)
+        if ticket.user and snapshot.check(reason, ticket.user):  # Condition cleared, close and notify.
+            close_ticket(ticket, ops=ops)
             send_message(f"ticket for <@{ticket.discord_user_id}> resolved")
             continue
 
-        if ticket.user not in allowed_users:  # User left the org, close ticket and alert.
-            close_ticket(ticket)
+        if ticket.user_id not in allowed_user_ids:  # User left the org, close ticket and alert.
+            close_ticket(ticket, ops=ops)
             send_message(f"User <@{ticket.discord_user_id}> is no longer a member, closing ticket")
             continue
 
         if not ticket.user:  # Missing auth user entirely, close ticket.
-            close_ticket(ticket)
+            close_ticket(ticket, ops=ops)
             send_message(f"ticket for <@{ticket.discord_user_id}> closed due to missing auth user")
             continue
 
@@ -238,13 +300,12 @@ def hourly_compliance_check():
                    f"Issue **{reason}** has exceeded {max_dayss} days without resolution. "
                    f"Consider kicking this user.")
 
-            run_task_function.apply_async(
-                args=["aa_bb.tasks_bot.send_ticket_reminder"],
-                kwargs={
-                    "task_args": [ticket.discord_channel_id, ticket.discord_user_id, msg],
-                    "task_kwargs": {}
-                }
-            )
+            ops.append({
+                "op": "remind",
+                "channel_id": ticket.discord_channel_id,
+                "discord_user_id": ticket.discord_user_id,
+                "message": msg,
+            })
             continue
 
         # last_reminder_sent stores the last day number that was pinged
@@ -262,52 +323,37 @@ def hourly_compliance_check():
         else:
             msg = template.format(namee=mention, role=tcfg.Role_ID, days=days_left)
 
-        # Queue the bot-side reminder (ensure task_kwargs is present)
-        run_task_function.apply_async(
-            args=["aa_bb.tasks_bot.send_ticket_reminder"],
-            kwargs={
-                "task_args": [ticket.discord_channel_id, ticket.discord_user_id, msg],
-                "task_kwargs": {}
-            }
-        )
+        # Queue the bot-side reminder
+        ops.append({
+            "op": "remind",
+            "channel_id": ticket.discord_channel_id,
+            "discord_user_id": ticket.discord_user_id,
+            "message": msg,
+        })
 
         # Mark today as reminded so the system does not ping again today
         ticket.last_reminder_sent = days_elapsed
         ticket.save(update_fields=["last_reminder_sent"])
 
-    # Rebalance ticket categories after processing tickets
-    try:
-        run_task_function.apply_async(
-            args=["aa_bb.tasks_bot.rebalance_ticket_categories"],
-            kwargs={
-                "task_args": [],
-                "task_kwargs": {}
-            }
-        )
-    except Exception:
-        # Non-fatal if scheduling fails
-        pass
+    if ops:  # One bot round trip for every close, create and reminder of this run.
+        _dispatch_ticket_ops(ops)
 
 
-def ensure_ticket(user, reason):
+def ensure_ticket(user, reason, tcfg: Optional[TicketToolConfig] = None, ops: Optional[list] = None):
     """
     Guarantee there is an open compliance ticket for the given user/reason pair.
 
     Handles Discord lookup, fallbacks, and message templating before delegating
-    the actual ticket creation to the bot worker.
+    the actual ticket creation to the bot worker. With `ops`, the creation is
+    appended to that batch instead of being dispatched on its own.
     """
-    tcfg = TicketToolConfig.get_solo()
+    if tcfg is None:  # Batch callers pass the config they already loaded.
+        tcfg = TicketToolConfig.get_solo()
     max_afk_days = tcfg.Max_Afk_Days
-    reason_checkers = {
-        "corp_check": (corp_check, tcfg.corp_check_reason),
-        "paps_check": (paps_check, tcfg.paps_check_reason),
-        "afk_check": (afk_check, tcfg.afk_check_reason),
-        "discord_check": (discord_check, tcfg.discord_check_reason),
-    }
+    msg_template = getattr(tcfg, f"{reason}_reason")
     try:
         discord_id = get_discord_user_id(user)
         username = ""
-        _, msg_template = reason_checkers[reason]
         if reason == "afk_check":  # AFK templates expect {days}.
             ticket_message = msg_template.format(namee=discord_id, role=tcfg.Role_ID, days=max_afk_days)
         elif reason == "discord_check":  # Discord-specific template uses username, not Discord mention.
@@ -342,7 +388,6 @@ def ensure_ticket(user, reason):
             return
 
         discord_id = discord_user.uid
-        _, msg_template = reason_checkers[reason]
         if reason == "afk_check":  # Fallback message includes manual warning text.
             ticket_message = (
                 f"⚠️ Compliance issue for **{user.username}** "
@@ -368,25 +413,39 @@ def ensure_ticket(user, reason):
     ).exists()
     if not exists:  # Only emit side effects when a new ticket is needed.
         send_message(f"ticket for {user.username} created, reason - {reason}")
-        run_task_function.apply_async(
-            args=["aa_bb.tasks_bot.create_compliance_ticket"],
-            kwargs={
-                "task_args": [user.id, discord_id, reason, ticket_message],
-                "task_kwargs": {}
-            }
-        )
+        _queue_ticket_op({
+            "op": "create",
+            "user_id": user.id,
+            "discord_user_id": discord_id,
+            "reason": reason,
+            "message": ticket_message,
+        }, ops)
 
 
-def close_ticket(ticket):
+def close_ticket(ticket, ops: Optional[list] = None):
     """Close the Discord compliance ticket and delete it locally."""
-    run_task_function.delay(
-        "aa_bb.tasks_bot.close_ticket_channel",
-        task_args=[ticket.discord_channel_id],
-        task_kwargs={}
-    )
+    _queue_ticket_op({"op": "close", "channel_id": ticket.discord_channel_id}, ops)
     ticket.delete()
 
 
+def _dispatch_ticket_ops(ops: list):
+    run_task_function.apply_async(
+        args=["aa_bb.tasks_bot.run_ticket_ops"],
+        kwargs={
+            "task_args": [ops],
+            "task_kwargs": {}
+        }
+    )
+
+
+def _queue_ticket_op(op: dict, ops: Optional[list]):
+    """Append `op` to the caller's batch, or send it to the bot right away when there is none."""
+    if ops is None:  # Standalone call (signals, admin actions).
+        _dispatch_ticket_ops([op])
+    else:
+        ops.append(op)
+
+
 def close_char_removed_ticket(ticket):
     """Mark a char_removed ticket resolved without deleting it (legacy behavior)."""
     ticket.is_resolved = True
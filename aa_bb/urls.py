@@ -1,7 +1,7 @@
 """App URLs"""
 
 from django.urls import path
-from aa_bb import views, views_faq
+from aa_bb import views, views_async, views_faq
 
 app_name = "aa_bb"
 
@@ -35,11 +35,15 @@ urlpatterns = [
     ),  # Handle the Reddit OAuth callback and persist tokens.
     path("manual/faq/", views_faq.manual_faq, name="manual_faq"),  # General FAQ/guide landing page.
 
+    path("search/", views.search_accounts, name="search_accounts"),  # Typeahead search for the account picker.
+
     # Bulk loader (not used by paginated SUS_CONTR but retained)
-    path("load_cards/", views.load_cards, name="load_cards"),  # Legacy endpoint to generate all SUS cards at once.
+    path("load_cards/", views.load_cards, name="load_cards"),  # Render all non-streamed cards concurrently.
 
     # Single card AJAX fetch (all cards except paging for SUS_CONTR)
     path("load_card/", views.load_card, name="load_card"),  # Fetch one card’s HTML payload on-demand.
+    path("card-data/", views.card_data, name="card_data"),  # Fetch one card’s compact JSON data.
+    path("export/", views.export_findings, name="export_findings"),  # Stream suspicious findings as CSV.
     path("warm_cache/", views.warm_cache, name="warm_cache"),  # Trigger backend warm-up of cached card data.
     path("warm-progress/", views.get_warm_progress, name="warm_progress"),  # Poll for warm-up job status.
 
@@ -48,9 +52,17 @@ urlpatterns = [
     path("stream_mails_sse/", views.stream_mails_sse, name="stream_mails_sse"),  # SSE feed for suspicious mails.
     path("stream_transactions_sse/", views.stream_transactions_sse, name="stream_transactions_sse"),  # SSE feed for wallet transactions.
 
+    # Async (ASGI) variants of the SSE feeds, used when BB_ASYNC_SSE is enabled
+    path("async/stream_contracts_sse/", views_async.stream_contracts_sse, name="stream_contracts_sse_async"),  # Async SSE feed for contracts.
+    path("async/stream_mails_sse/", views_async.stream_mails_sse, name="stream_mails_sse_async"),  # Async SSE feed for suspicious mails.
+    path("async/stream_transactions_sse/", views_async.stream_transactions_sse, name="stream_transactions_sse_async"),  # Async SSE feed for wallet transactions.
+    path("async/warm-progress/stream/", views_async.stream_warm_progress, name="warm_progress_stream_async"),  # Async SSE push of warm-up job status.
+
     # Paginated Suspicious Contracts endpoints
     path("list_contract_ids/", views.list_contract_ids, name="list_contract_ids"),  # Provide IDs for contract pagination.
     path("check_contract_batch/", views.check_contract_batch, name="check_contract_batch"),  # Fetch specific contract batch details.
+    path("check_mail_batch/", views.check_mail_batch, name="check_mail_batch"),  # Cursor-paginated suspicious mail batches.
+    path("check_transaction_batch/", views.check_transaction_batch, name="check_transaction_batch"),  # Cursor-paginated suspicious transaction batches.
 
     # Blacklist management
     path("blacklist/add/", views.add_blacklist_view, name="add_blacklist"),  # Simple UI to add entries to corp blacklist.
@@ -2,6 +2,7 @@
 
 from django.urls import path
 from aa_bb import views_cb as views
+from aa_bb import views_async
 
 app_name = "aa_cb"
 
@@ -9,8 +10,10 @@ urlpatterns = [
     # Main index view
     path("",                 views.index,                  name="index"),  # CorpBrother dashboard root.
 
+    path("search/",          views.search_corporations,    name="search_corporations"),  # Typeahead search for the corp picker.
+
     # Bulk loader (not used by paginated SUS_CONTR but retained)
-    path("load_cards/",      views.load_cards,             name="load_cards"),  # Legacy full-card refresh endpoint.
+    path("load_cards/",      views.load_cards,             name="load_cards"),  # Render all non-streamed CB cards concurrently.
 
     # Single card AJAX fetch (all cards except paging for SUS_CONTR)
     path("load_card/",       views.load_card,              name="load_card"),  # Load a single CorpBrother card payload.
@@ -21,6 +24,11 @@ urlpatterns = [
     path('stream_contracts_sse/', views.stream_contracts_sse, name='stream_contracts_sse'),  # SSE feed for CB contracts.
     path('stream_transactions_sse/', views.stream_transactions_sse, name='stream_transactions_sse'),  # SSE feed for CB wallet transactions.
 
+    # Async (ASGI) variants of the SSE feeds, used when BB_ASYNC_SSE is enabled
+    path('async/stream_contracts_sse/', views_async.cb_stream_contracts_sse, name='stream_contracts_sse_async'),  # Async SSE feed for CB contracts.
+    path('async/stream_transactions_sse/', views_async.cb_stream_transactions_sse, name='stream_transactions_sse_async'),  # Async SSE feed for CB wallet transactions.
+    path('async/warm-progress/stream/', views_async.cb_stream_warm_progress, name='warm_progress_stream_async'),  # Async SSE push of CB warm-up progress.
+
     # Paginated Suspicious Contracts endpoints
     path('list_contract_ids/', views.list_contract_ids,       name='list_contract_ids'),  # Contract pagination helper.
     path('check_contract_batch/', views.check_contract_batch, name='check_contract_batch'),  # Fetch detailed contract batch data.
@@ -7,4 +7,5 @@ urlpatterns = [
     path("generate/", views_paps.index, name="index"),  # Entry point to generate PAP summaries.
     path("", views_paps.history, name="history"),  # Default view lists historical PAP exports.
     path("generate-chart/", views_paps.generate_pap_chart, name="generate_pap_chart"),  # Serve or build the PAP chart image/data.
+    path("chart-data/", views_paps.chart_data, name="chart_data"),  # JSON behind the month's chart.
 ]
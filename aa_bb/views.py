@@ -1,19 +1,21 @@
 import html
 import logging
-import time
 import json
 
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 from django.db import connection
+from django.db.models import F
 from django.core.handlers.wsgi import WSGIRequest
 from django.http import (
     JsonResponse,
     HttpResponseBadRequest,
     StreamingHttpResponse,
     HttpResponseForbidden,
+    HttpResponseNotModified,
 )
 from django.shortcuts import render, redirect, get_object_or_404
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_POST
 from django.core.cache import cache
 from django_celery_beat.models import PeriodicTask
@@ -28,6 +30,7 @@ from aa_bb.checks.cyno import render_user_cyno_info_html
 from aa_bb.checks.hostile_assets import render_assets
 from aa_bb.checks.hostile_clones import render_clones
 from aa_bb.checks.imp_blacklist import generate_blacklist_links
+from aa_bb.checks.isk_flow import flows_ok, gather_user_flows, render_flows
 from aa_bb.checks.lawn_blacklist import get_user_character_names_lawn
 from aa_bb.checks.sus_contacts import render_contacts
 from aa_bb.checks.sus_mails import (
@@ -57,8 +60,14 @@ from aa_bb.checks.sus_contracts import (
 )
 from aa_bb.checks.roles_and_tokens import render_user_roles_tokens_html
 from aa_bb.checks.clone_state import render_character_states_html
-from .app_settings import get_user_characters, get_entity_info, get_main_character_name, get_character_id, send_message, get_pings
+from .app_settings import get_user_characters, get_entity_info, get_main_character_name, send_message, get_pings, async_sse_enabled
 from .models import BigBrotherConfig, WarmProgress
+from . import card_cache
+from .card_data import build_card_data
+from .card_loader import STREAMED_CARDS, render_cards
+from .exports import EXPORT_COLUMNS, EXPORT_SCOPES, PERSISTED_KINDS, csv_lines, scope_mains
+from .entity_warmer import start_warm, user_warm_candidates, publish_progress, progress_payload
+from .pagination import get_page_params, keyset_page
 from .modelss import LeaveRequest
 from corptools.models import Contract  # Ensure this is the correct import for Contract model
 #from datetime import datetime
@@ -100,6 +109,7 @@ CARD_DEFINITIONS = [
     {"title": 'Suspicious Contracts', "key": "sus_contr"},
     {"title": 'Suspicious Mails', "key": "sus_mail"},
     {"title": 'Suspicious Transactions', "key": "sus_tra"},
+    {"title": 'ISK Flows', "key": "isk_flow"},
     {"title": 'Cyno?', "key": "cyno"},
     {"title": 'Skills', "key": "skills"},
 ]
@@ -159,123 +169,131 @@ def load_card(request):
     if target_user_id is None:  # Unknown character selection.
         return JsonResponse({"error": "Unknown account"}, status=404)
 
-    content, status = get_card_data(request, target_user_id, key)
-    return JsonResponse({
+    version = card_cache.data_version(target_user_id, key)
+    if card_cache.not_modified(request, version):  # Browser already holds this render.
+        return card_cache.tag_response(HttpResponseNotModified(), version)
+
+    content, status = card_cache.render_card_cached(
+        lambda: get_card_data(request, target_user_id, key), key, target_user_id, version
+    )
+    return card_cache.tag_response(JsonResponse({
         "title":   title,
         "content": content,
         "status":  status,
-    })
+    }), version)
 
 
-# Bulk loader (fallback)
+# Bulk CSV export of suspicious findings
+@login_required
+@permission_required("aa_bb.basic_access")
+def export_findings(request):
+    """
+    Stream one kind of finding (contracts, mails, transactions, contacts,
+    assets) as CSV for a user (`option`), a corp (`corp_id`) or the alliance.
+    Corp and alliance exports need full access and cover the persisted kinds
+    only; contacts and assets in bulk come from `bb_export_findings`.
+    """
+    kind  = request.GET.get("kind")
+    scope = request.GET.get("scope", "user")
+    if kind not in EXPORT_COLUMNS or scope not in EXPORT_SCOPES:  # Unknown export requested.
+        return HttpResponseBadRequest("Invalid kind or scope")
+
+    if scope == "user":
+        target_user_id = get_user_id(request.GET.get("option"))
+        profiles = _visible_profiles(request.user)
+        if target_user_id is None:  # Unknown character selection.
+            return JsonResponse({"error": "Unknown account"}, status=404)
+        if profiles is None or not profiles.filter(user_id=target_user_id).exists():  # Viewer may not inspect this account.
+            return HttpResponseForbidden("Not allowed")
+        ident = target_user_id
+    else:
+        if not request.user.has_perm("aa_bb.full_access"):  # Bulk exports are for full-access officers only.
+            return HttpResponseForbidden("Not allowed")
+        if kind not in PERSISTED_KINDS:  # Live per-user evaluation is too slow for a request.
+            return HttpResponseBadRequest(f"Bulk {kind} exports run through the bb_export_findings command")
+        ident = request.GET.get("corp_id") if scope == "corp" else request.GET.get("alliance_id")
+        if scope == "corp" and not (ident or "").isdigit():  # Corp exports need a corp id.
+            return HttpResponseBadRequest("Missing corp_id")
+        if ident and not ident.isdigit():  # Alliance id is optional but must be numeric.
+            return HttpResponseBadRequest("Invalid alliance_id")
+
+    mains = scope_mains(scope, ident)
+    response = StreamingHttpResponse(csv_lines(kind, mains), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="bb_{kind}_{scope}.csv"'
+    return response
+
+
+# Structured card data (JSON counterpart of load_card)
+@login_required
+@permission_required("aa_bb.basic_access")
+@gzip_page
+def card_data(request):
+    """
+    Compact JSON for one dashboard card, selected by `option` and `key`.
+    Supports conditional requests (ETag/If-None-Match) and gzip.
+    """
+    option = request.GET.get("option")
+    key    = request.GET.get("key")
+    if option is None or key is None:  # Card fetches require both parameters.
+        return HttpResponseBadRequest("Missing parameters")
+
+    card_def = next((c for c in get_available_cards() if c["key"] == key), None)
+    if card_def is None:  # Unknown or hidden card.
+        return HttpResponseBadRequest("Invalid card key")
+    if key in STREAMED_CARDS:  # Served by the paginated JSON endpoints.
+        return JsonResponse({"key": key, "title": card_def["title"], "streamed": True})
+
+    target_user_id = get_user_id(option)
+    if target_user_id is None:  # Unknown character selection.
+        return JsonResponse({"error": "Unknown account"}, status=404)
+
+    version = card_cache.data_version(target_user_id, key, fmt="json")
+    if card_cache.not_modified(request, version):  # Client already holds this payload.
+        return card_cache.tag_response(HttpResponseNotModified(), version)
+
+    data, status = card_cache.render_card_cached(
+        lambda: build_card_data(request, target_user_id, key), key, target_user_id, version
+    )
+    return card_cache.tag_response(JsonResponse({
+        "key":    key,
+        "title":  card_def["title"],
+        "status": status,
+        **data,
+    }), version)
+
+
+# Bulk loader
 @login_required
 @permission_required("aa_bb.basic_access")
 def load_cards(request: WSGIRequest) -> JsonResponse:
-    """Bulk-load every card for a selected user (fallback for legacy UI)."""
+    """
+    Render every non-streamed card for a selected user concurrently.
+    Cards that miss the deadline come back `deferred` for a load_card follow-up.
+    """
     selected_option = request.GET.get("option")
     user_id = get_user_id(selected_option)
-    warm_entity_cache_task.delay(user_id)
-    cards = []
-    for card in get_available_cards():
-        content, status = get_card_data(request, user_id, card["key"])
-        cards.append({
-            "title":   card["title"],
-            "content": content,
-            "status":  status,
-        })
-    return JsonResponse({"cards": cards})
+    if user_id is None:  # Unknown character selection.
+        return JsonResponse({"error": "Unknown account"}, status=404)
+
+    def render_one(key):
+        return card_cache.render_card_cached(
+            lambda: get_card_data(request, user_id, key),
+            key, user_id, card_cache.data_version(user_id, key),
+        )
+
+    return JsonResponse({"cards": render_cards(get_available_cards(), render_one)})
 
 @shared_task(bind=True)
 def warm_entity_cache_task(self, user_id):
     """
     Gather mails, contracts, transactions; warm entity cache.
-    Track progress in the DB via WarmProgress.
+    The diff, sharding and WarmProgress tracking live in entity_warmer.start_warm.
     """
     user_main = get_main_character_name(user_id) or str(user_id)
-    qs = WarmProgress.objects.all()
-    users = [
-        {"user": wp.user_main, "current": wp.current, "total": wp.total}
-        for wp in qs
-    ]
-    # Check for existing progress entry
-    try:
-        progress = WarmProgress.objects.get(user_main=user_main)
-    except WarmProgress.DoesNotExist:
-        progress = None
-
-    if progress and progress.total > 0:  # Another warm job is in-flight for this pilot.
-        first_current = progress.current
-        logger.info(f"[{user_main}] detected in-progress run (current={first_current}); probing…")
-        time.sleep(20)
-
-        # re-fetch to see if it's moved
-        try:
-            progress = WarmProgress.objects.get(user_main=user_main)
-            second_current = progress.current
-        except WarmProgress.DoesNotExist:
-            second_current = None
-
-        # Now *abort* if there *was* progress; otherwise continue
-        if second_current != first_current:  # Existing job advanced, so bail out to avoid duplicate work.
-            logger.info(
-                f"[{user_main}] progress advanced from {first_current} to {second_current}; aborting new task."
-            )
-            raise Ignore(f"Task for {user_main} is already running.")
-        else:
-            logger.info(
-                f"[{user_main}] no progress in 20 s (still {first_current}); continuing with new task."
-            )
-
-    # Build list of (entity_id, timestamp)
-    entries = []
-    contracts = gather_user_contracts(user_id)
-    trans = gather_user_transactions(user_id)
-    mails = gather_user_mails(user_id)
-    candidates = []
-    for c in contracts:
-        issuer_id = get_character_id(c.issuer_name)
-        candidates.append((issuer_id, getattr(c, "date_issued")))
-        assignee = c.assignee_id or c.acceptor_id
-        candidates.append((assignee, getattr(c, "date_issued")))
-    for m in mails:
-        candidates.append((m.from_id, getattr(m, "timestamp")))
-        for mr in m.recipients.all():
-            candidates.append((mr.recipient_id, getattr(m, "timestamp")))
-    for t in trans:
-        candidates.append((t.first_party_id, getattr(t, "date")))
-        candidates.append((t.second_party_id, getattr(t, "date")))
-    from django.db.models import Q
-    from .models import EntityInfoCache
-    query_filter = Q()
-    for entity_id, as_of in candidates:
-        query_filter |= Q(entity_id=entity_id, as_of=as_of)
-
-    existing = set(
-        EntityInfoCache.objects.filter(query_filter)
-        .values_list('entity_id', 'as_of')
-    )
-
-    for candidate in candidates:
-        if candidate not in existing:  # Only fetch entity info when cache lacks the tuple.
-            entries.append(candidate)
-
-    total = len(entries)
-    logger.info(f"Starting warm cache for {user_main} ({total} entries)")
-
-    # Initialize or update the progress record
-    WarmProgress.objects.update_or_create(
-        user_main=user_main,
-        defaults={"current": 0, "total": total}
-    )
-
-    # Process each entry, updating the DB record
-    for idx, (eid, ts) in enumerate(entries, start=1):
-        WarmProgress.objects.filter(user_main=user_main).update(current=idx)
-        get_entity_info(eid, ts)
-
-    # Clean up when done
-    WarmProgress.objects.filter(user_main=user_main).delete()
-    logger.info(f"Completed warm cache for {user_main}")
+    candidates = user_warm_candidates(user_id)
+    total = start_warm(user_main, candidates)
+    if total is None:  # Another run holds the lease for this target.
+        raise Ignore(f"Task for {user_main} is already running.")
     return total
 
 @login_required
@@ -298,6 +316,7 @@ def warm_cache(request):
         user_main=user_main,
         defaults={"current": 0, "total": 0}
     )
+    publish_progress()
 
     # Enqueue the celery task
     warm_entity_cache_task.delay(user_id)
@@ -315,30 +334,27 @@ def get_warm_progress(request):
         queued: { count, names: [...] }
       }
     """
-    qs = WarmProgress.objects.all()
-    users = [
-        {"user": wp.user_main, "current": wp.current, "total": wp.total}
-        for wp in qs
-    ]
-    # Those still at current == 0 are queued/not yet started
-    queued_names = [wp.user_main for wp in qs if wp.current == 0]
+    return JsonResponse(progress_payload())
+
+
+SEARCH_MIN_CHARS = 2  # Shortest prefix the account search answers.
+
+
+def _visible_profiles(user):
+    """UserProfiles (with a main) the viewer may inspect, or None without access."""
+    if user.has_perm("aa_bb.full_access"):  # Full-access sees every main character.
+        return UserProfile.objects.exclude(main_character=None)
+    if user.has_perm("aa_bb.recruiter_access"):  # Recruiters see only guest states.
+        guest_states = BigBrotherConfig.get_solo().bb_guest_states.all()
+        return UserProfile.objects.filter(state__in=guest_states).exclude(main_character=None)
+    return None
 
-    #logger.debug(f"get_warm_progress → users={users}, queued={queued_names}")
-    return JsonResponse({
-        "in_progress": bool(users),
-        "users": users,
-        "queued": {
-            "count": len(queued_names),
-            "names": queued_names,
-        },
-    })
 
 # Index view
 @login_required
 @permission_required("aa_bb.basic_access")
 def index(request: WSGIRequest):
-    """Render the dashboard shell plus dropdown options for authorized recruiters."""
-    dropdown_options = []
+    """Render the dashboard shell; accounts are picked through search_accounts."""
     task_name = 'BB run regular updates'
     task = PeriodicTask.objects.filter(name=task_name).first()
     if not BigBrotherConfig.get_solo().is_active or (task and not task.enabled):  # Guard against misconfigured BB.
@@ -347,27 +363,58 @@ def index(request: WSGIRequest):
         )
         return render(request, "aa_bb/disabled.html", {"message": msg})
 
-    if request.user.has_perm("aa_bb.full_access"):  # Full-access sees every main character.
-        qs = UserProfile.objects.exclude(main_character=None)
-    elif request.user.has_perm("aa_bb.recruiter_access"):  # Recruiters see only guest states.
-        guest_states = BigBrotherConfig.get_solo().bb_guest_states.all()
-        qs = UserProfile.objects.filter(state__in=guest_states).exclude(main_character=None)
-    else:
-        qs = None
-
-    if qs is not None:  # Build dropdown choices only when the viewer has visibility.
-        dropdown_options = (
-            qs.values_list("main_character__character_name", flat=True)
-              .order_by("main_character__character_name")
-        )
-
     context = {
-        "dropdown_options": dropdown_options,
         "CARD_DEFINITIONS": CARD_DEFINITIONS,
+        "async_sse": async_sse_enabled(),
+        "search_min_chars": SEARCH_MIN_CHARS,
     }
     return render(request, "aa_bb/index.html", context)
 
 
+@login_required
+@permission_required("aa_bb.basic_access")
+def search_accounts(request):
+    """
+    Typeahead for the account picker: mains whose own name or any linked
+    character name starts with `q` (case-insensitive), ordered by main name.
+    The two names are matched by separate queries joined with UNION, so
+    each can use its own name index.
+      { results: [ { value, label }, … ], next: <main name to pass as `after`> | null }
+    """
+    q = request.GET.get("q", "").strip()
+    after = request.GET.get("after") or None
+    try:
+        _, limit = get_page_params(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+
+    qs = _visible_profiles(request.user)
+    if qs is None or len(q) < SEARCH_MIN_CHARS:  # No visibility, or prefix too short to be selective.
+        return JsonResponse({"results": [], "next": None})
+
+    if after:  # Keyset continuation on the main name.
+        qs = qs.filter(main_character__character_name__gt=after)
+
+    def matching(**lookup):
+        return (
+            qs.filter(**lookup)
+            .annotate(name=F("main_character__character_name"))
+            .values_list("name", flat=True)
+            .order_by()
+        )
+
+    names = matching(main_character__character_name__istartswith=q).union(
+        matching(user__character_ownerships__character__character_name__istartswith=q)
+    ).order_by("name")
+
+    rows = list(names[:limit + 1])
+    next_after = rows[limit - 1] if len(rows) > limit else None
+    return JsonResponse({
+        "results": [{"value": n, "label": n} for n in rows[:limit]],
+        "next": next_after,
+    })
+
+
 
 
 # Paginated endpoints for Suspicious Contracts
@@ -397,30 +444,29 @@ def list_contract_ids(request):
 @permission_required("aa_bb.basic_access")
 def check_contract_batch(request):
     """
-    Check a slice of contracts for hostility by start/limit parameters.
-    Returns JSON with `checked` count and list of `hostile_found`,
-    each entry including a `cell_styles` dict for inline styling.
-    Now uses gather_user_contracts + get_user_contracts(qs) on the full set.
+    Check one page of contracts for hostility, newest first.
+    Pages are addressed by an opaque `cursor` (from the previous response's
+    `next_cursor`) plus `limit`. Returns JSON with `checked` count, list of
+    `hostile_found` (each with a `cell_styles` dict) and `next_cursor`.
     """
     option = request.GET.get("option")
-    start  = int(request.GET.get("start", 0))
-    limit  = int(request.GET.get("limit", 10))
+    try:
+        cursor, limit = get_page_params(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
     user_id = get_user_id(option)
     if user_id is None:  # Unknown selection -> 404.
         return JsonResponse({"error": "Unknown account"}, status=404)
 
-    # 1) Ensure the full QuerySet is available
-    cache_key = f"contract_qs_{user_id}"
-    qs_all = cache.get(cache_key)
-    if qs_all is None:  # Cache miss, gather the entire contract queryset now.
-        qs_all = gather_user_contracts(user_id)
-        cache.set(cache_key, qs_all, 300)
-
-    # 2) Slice out just this batch of model instances
-    batch_qs = qs_all[start:start + limit]
+    try:
+        batch, next_cursor = keyset_page(
+            gather_user_contracts(user_id), "date_issued", "contract_id", cursor, limit
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
 
-    # 3) Hydrate only this batch
-    batch_map = get_user_contracts(batch_qs)
+    # Hydrate only this batch
+    batch_map = get_user_contracts(batch)
 
     HIDDEN = {
         'assignee_alliance_id', 'assignee_corporation_id',
@@ -443,11 +489,86 @@ def check_contract_batch(request):
             hostile.append(payload)
 
     return JsonResponse({
-        'checked': len(batch_qs),
-        'hostile_found': hostile
+        'checked': len(batch),
+        'hostile_found': hostile,
+        'next_cursor': next_cursor,
     })
 
 
+@login_required
+@permission_required("aa_bb.basic_access")
+def check_mail_batch(request):
+    """
+    Cursor-paginated counterpart of check_contract_batch for mails.
+    Each hostile entry carries its visible fields plus the rendered `html` row.
+    """
+    option = request.GET.get("option")
+    try:
+        cursor, limit = get_page_params(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    user_id = get_user_id(option)
+    if user_id is None:  # Unknown selection -> 404.
+        return JsonResponse({"error": "Unknown account"}, status=404)
+
+    try:
+        batch, next_cursor = keyset_page(
+            gather_user_mails(user_id), "timestamp", "id_key", cursor, limit
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    hostile = []
+    for mid, row in get_user_mails(batch).items():
+        if is_mail_row_hostile(row):  # Only return rows flagged as hostile.
+            payload = {col: row.get(col, "") for col in VISIBLE}
+            payload['html'] = _render_mail_row_html(row)
+            hostile.append(payload)
+
+    return JsonResponse({
+        'checked': len(batch),
+        'hostile_found': hostile,
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@permission_required("aa_bb.basic_access")
+def check_transaction_batch(request):
+    """
+    Cursor-paginated counterpart of check_contract_batch for wallet journal entries.
+    Each hostile entry carries its visible fields plus the rendered `html` row.
+    """
+    option = request.GET.get("option")
+    try:
+        cursor, limit = get_page_params(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    user_id = get_user_id(option)
+    if user_id is None:  # Unknown selection -> 404.
+        return JsonResponse({"error": "Unknown account"}, status=404)
+
+    try:
+        batch, next_cursor = keyset_page(
+            gather_user_transactions(user_id), "date", "entry_id", cursor, limit
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    batch_map = get_user_transactions(batch)
+    headers = _transaction_headers(next(iter(batch_map.values()), None))
+    hostile = []
+    for entry_id, row in batch_map.items():
+        if is_transaction_hostile(row):  # Only return rows flagged as hostile.
+            payload = {col: row.get(col, "") for col in headers}
+            payload['html'] = _render_transaction_row_html(row, headers)
+            hostile.append(payload)
+
+    return JsonResponse({
+        'checked': len(batch),
+        'hostile_found': hostile,
+        'next_cursor': next_cursor,
+    })
 
 
 @login_required
@@ -481,7 +602,6 @@ def stream_contracts_sse(request: WSGIRequest):
             issued = getattr(c, "date_issued", timezone.now())
             issuer_id = c.issuer_name.eve_id
             yield ": ping\n\n"
-            cid = c.contract_id
             if c.assignee_id != 0:  # Contracts may target assignee or acceptor; prefer assignee when set.
                 assignee_id = c.assignee_id
             else:
@@ -495,26 +615,7 @@ def stream_contracts_sse(request: WSGIRequest):
             yield ": ping\n\n"
 
             # Hydrate just this one
-
-            row = {
-                'contract_id':              cid,
-                'issued_date':              issued,
-                'end_date':                 c.date_completed or c.date_expired,
-                'contract_type':            c.contract_type,
-                'issuer_name':              iinfo["name"],
-                'issuer_id':                issuer_id,
-                'issuer_corporation':       iinfo["corp_name"],
-                'issuer_corporation_id':    iinfo["corp_id"],
-                'issuer_alliance':          iinfo["alli_name"],
-                'issuer_alliance_id':       iinfo["alli_id"],
-                'assignee_name':            ainfo["name"],
-                'assignee_id':              assignee_id,
-                'assignee_corporation':     ainfo["corp_name"],
-                'assignee_corporation_id':  ainfo["corp_id"],
-                'assignee_alliance':        ainfo["alli_name"],
-                'assignee_alliance_id':     ainfo["alli_id"],
-                'status':                   c.status,
-            }
+            row = _contract_row(c, issued, issuer_id, assignee_id, iinfo, ainfo)
 
             style_map = {
                 col: get_cell_style_for_contract_row(col, row)
@@ -559,6 +660,51 @@ VISIBLE_CONTR = [
     "assignee_alliance", "status",
 ]
 
+def _contract_row(c, issued, issuer_id, assignee_id, iinfo: dict, ainfo: dict) -> dict:
+    """Build the hydrated row dict for one contract from resolved party info."""
+    return {
+        'contract_id':              c.contract_id,
+        'issued_date':              issued,
+        'end_date':                 c.date_completed or c.date_expired,
+        'contract_type':            c.contract_type,
+        'issuer_name':              iinfo["name"],
+        'issuer_id':                issuer_id,
+        'issuer_corporation':       iinfo["corp_name"],
+        'issuer_corporation_id':    iinfo["corp_id"],
+        'issuer_alliance':          iinfo["alli_name"],
+        'issuer_alliance_id':       iinfo["alli_id"],
+        'assignee_name':            ainfo["name"],
+        'assignee_id':              assignee_id,
+        'assignee_corporation':     ainfo["corp_name"],
+        'assignee_corporation_id':  ainfo["corp_id"],
+        'assignee_alliance':        ainfo["alli_name"],
+        'assignee_alliance_id':     ainfo["alli_id"],
+        'status':                   c.status,
+    }
+
+
+def _mail_row(m, sent, sender_id, sinfo: dict, recipients: list) -> dict:
+    """Build the hydrated row dict for one mail; recipients is [(id, info), …]."""
+    return {
+        "message_id":              m.id_key,
+        "sent_date":               sent,
+        "subject":                 m.subject or "",
+        "sender_name":             sinfo["name"],
+        "sender_id":               sender_id,
+        "sender_corporation":      sinfo["corp_name"],
+        "sender_corporation_id":   sinfo["corp_id"],
+        "sender_alliance":         sinfo["alli_name"],
+        "sender_alliance_id":      sinfo["alli_id"],
+        "recipient_names":         [info["name"] for _, info in recipients],
+        "recipient_ids":           [rid for rid, _ in recipients],
+        "recipient_corps":         [info["corp_name"] for _, info in recipients],
+        "recipient_corp_ids":      [info["corp_id"] for _, info in recipients],
+        "recipient_alliances":     [info["alli_name"] for _, info in recipients],
+        "recipient_alliance_ids":  [info["alli_id"] for _, info in recipients],
+        "status":                  "Read" if m.is_read else "Unread",
+    }
+
+
 def _render_contract_row_html(row: dict) -> str:
     """
     Render one hostile contract row, applying inline styles 
@@ -644,6 +790,73 @@ def _render_mail_row_html(row: dict) -> str:
 
     return "<tr>" + "".join(cells) + "</tr>"
 
+# Hidden columns for the transactions table
+TRANS_HIDDEN = {
+    'first_party_id','second_party_id',
+    'first_party_corporation_id','second_party_corporation_id',
+    'first_party_alliance_id','second_party_alliance_id',
+    'entry_id'
+}
+
+TRANS_DEFAULT_HEADERS = [
+    'date', 'amount', 'balance', 'description', 'reason',
+    'first_party_name', 'first_party_corporation', 'first_party_alliance',
+    'second_party_name', 'second_party_corporation', 'second_party_alliance',
+    'context', 'type',
+]
+
+
+def _transaction_headers(sample_row: dict | None) -> list:
+    """Visible transaction columns, derived from a hydrated sample row when available."""
+    if sample_row:  # Derive headers from real data when available.
+        return [h for h in sample_row.keys() if h not in TRANS_HIDDEN]
+    # Fallback to a safe default when sampling finds nothing
+    return list(TRANS_DEFAULT_HEADERS)
+
+
+def _render_transaction_header_html(headers: list) -> str:
+    """Render the <tr> of <th> cells for the transaction table."""
+    return (
+        "<tr>" +
+        "".join(f"<th>{html.escape(h.replace('_',' ').title())}</th>" for h in headers) +
+        "</tr>"
+    )
+
+
+def _render_transaction_row_html(row: dict, headers: list) -> str:
+    """
+    Render one hostile transaction row, using the same style logic
+    as render_transactions().
+    """
+    cells = []
+    cfg = BigBrotherConfig.get_solo()
+    for col in headers:
+        val = row.get(col, "")
+        text = html.escape(str(val))
+        style = ""
+        # type‐based red
+        if col == 'type' and any(st in row['type'] for st in SUS_TYPES):
+            style = 'color:red;'
+        # first/second party name
+        if col in ('first_party_name','second_party_name'):
+            id_col = col.replace("_name", "_id")
+            pid = row[id_col]
+            if check_char_corp_bl(pid):
+                style = 'color:red;'
+        # corps & alliances
+        if col.endswith('corporation'):
+            cid = row[f"{col}_id"]
+            if cid and str(cid) in cfg.hostile_corporations:
+                style = 'color:red;'
+        if col.endswith('alliance'):
+            aid = row[f"{col}_id"]
+            if aid and str(aid) in cfg.hostile_alliances:
+                style = 'color:red;'
+        style_attr = f' style="{style}"' if style else ""
+        cells.append(f"<td{style_attr}>{text}</td>")
+    return "<tr>" + "".join(cells) + "</tr>"
+
+
 @login_required
 @permission_required("aa_bb.basic_access")
 def stream_mails_sse(request):
@@ -681,44 +894,15 @@ def stream_mails_sse(request):
             yield ": ping\n\n"  # immediately after expensive call
 
             # 2) hydrate each recipient
-            recipient_ids           = []
-            recipient_names         = []
-            recipient_corps         = []
-            recipient_corp_ids      = []
-            recipient_alliances     = []
-            recipient_alliance_ids  = []
+            recipients = []
             for mr in m.recipients.all():
                 rid   = mr.recipient_id
                 #logger.info(f"getting info for {rid}")
-                rinfo = get_entity_info(rid, sent)
+                recipients.append((rid, get_entity_info(rid, sent)))
                 yield ": ping\n\n"  # after each recipient lookup
 
-                recipient_ids.append(rid)
-                recipient_names.append(rinfo["name"])
-                recipient_corps.append(rinfo["corp_name"])
-                recipient_corp_ids.append(rinfo["corp_id"])
-                recipient_alliances.append(rinfo["alli_name"])
-                recipient_alliance_ids.append(rinfo["alli_id"])
-
             # build the single-mail row dict
-            row = {
-                "message_id":              m.id_key,
-                "sent_date":               sent,
-                "subject":                 m.subject or "",
-                "sender_name":             sinfo["name"],
-                "sender_id":               sender_id,
-                "sender_corporation":      sinfo["corp_name"],
-                "sender_corporation_id":   sinfo["corp_id"],
-                "sender_alliance":         sinfo["alli_name"],
-                "sender_alliance_id":      sinfo["alli_id"],
-                "recipient_names":         recipient_names,
-                "recipient_ids":           recipient_ids,
-                "recipient_corps":         recipient_corps,
-                "recipient_corp_ids":      recipient_corp_ids,
-                "recipient_alliances":     recipient_alliances,
-                "recipient_alliance_ids":  recipient_alliance_ids,
-                "status":                  "Read" if m.is_read else "Unread",
-            }
+            row = _mail_row(m, sent, sender_id, sinfo, recipients)
 
             # 3) check hostility and, if hostile, stream the <tr>
             if is_mail_row_hostile(row):  # Emit only hostile mail rows.
@@ -759,14 +943,6 @@ def stream_transactions_sse(request):
     total = qs.count()
     connection.close()
 
-    # Hidden columns for the transactions table
-    HIDDEN        = {
-        'first_party_id','second_party_id',
-        'first_party_corporation_id','second_party_corporation_id',
-        'first_party_alliance_id','second_party_alliance_id',
-        'entry_id'
-    }
-
     def generator():
         yield ": ok\n\n"                # initial heartbeat
         processed = hostile_count = 0
@@ -778,24 +954,10 @@ def stream_transactions_sse(request):
 
         # Determine headers from a single hydrated row (after empty check)
         sample_map = get_user_transactions(qs[:1])
-        sample_row = next(iter(sample_map.values()), None)
-        if sample_row:  # Derive headers from real data when available.
-            headers = [h for h in sample_row.keys() if h not in HIDDEN]
-        else:
-            # Fallback to a safe default when sampling finds nothing
-            headers = [
-                'date', 'amount', 'balance', 'description', 'reason',
-                'first_party_name', 'first_party_corporation', 'first_party_alliance',
-                'second_party_name', 'second_party_corporation', 'second_party_alliance',
-                'context', 'type',
-            ]
+        headers = _transaction_headers(next(iter(sample_map.values()), None))
 
         # Emit table header row once
-        header_html = (
-            "<tr>" +
-            "".join(f"<th>{html.escape(h.replace('_',' ').title())}</th>" for h in headers) +
-            "</tr>"
-        )
+        header_html = _render_transaction_header_html(headers)
         yield f"event: header\ndata:{json.dumps(header_html)}\n\n"
 
         for entry in qs:
@@ -807,37 +969,7 @@ def stream_transactions_sse(request):
 
             if is_transaction_hostile(row):  # Only push rows that meet hostility rules.
                 hostile_count += 1
-
-                # build the <tr> using same style logic as render_transactions()
-                cells = []
-                cfg = BigBrotherConfig.get_solo()
-                for col in headers:
-                    val = row.get(col, "")
-                    text = html.escape(str(val))
-                    style = ""
-                    # type‐based red
-                    if col == 'type' and any(st in row['type'] for st in SUS_TYPES):
-                        style = 'color:red;'
-                    # first/second party name
-                    if col in ('first_party_name','second_party_name'):
-                        id_col = col.replace("_name", "_id")
-                        pid = row[id_col]
-                        if check_char_corp_bl(pid):
-                            style = 'color:red;'
-                    # corps & alliances
-                    if col.endswith('corporation'):
-                        cid = row[f"{col}_id"]
-                        if cid and str(cid) in cfg.hostile_corporations:
-                            style = 'color:red;'
-                    if col.endswith('alliance'):
-                        aid = row[f"{col}_id"]
-                        if aid and str(aid) in cfg.hostile_alliances:
-                            style = 'color:red;'
-                    def make_td(text, style=""):
-                        style_attr = f' style="{style}"' if style else ""
-                        return f"<td{style_attr}>{text}</td>"
-                    cells.append(make_td(text, style))
-                tr_html = "<tr>" + "".join(cells) + "</tr>"
+                tr_html = _render_transaction_row_html(row, headers)
                 yield f"event: transaction\ndata:{json.dumps(tr_html)}\n\n"
 
             # progress update
@@ -906,6 +1038,11 @@ def get_card_data(request, target_user_id: int, key: str):
         content = render_transactions(target_user_id)
         status  = not content
 
+    elif key == "isk_flow":  # Per-counterparty ISK in/out totals.
+        flows   = gather_user_flows(target_user_id)
+        content = render_flows(flows)
+        status  = flows_ok(flows)
+
     elif key == "cyno":  # Cyno readiness / history panel.
         content = render_user_cyno_info_html(target_user_id)
         status  = not (content and "red" in content)
@@ -0,0 +1,410 @@
+"""
+Async (ASGI) variants of the BigBrother / CorpBrother SSE streams.
+
+The sync streams pin a worker thread for the whole scan. These views run as
+async generators instead, so an open dashboard costs a coroutine; ORM work and
+entity lookups hop to the thread pool through ``sync_to_async``. They are only
+wired into the dashboards when ``BB_ASYNC_SSE`` is enabled, because Django
+buffers async streaming responses when it is served under WSGI.
+"""
+
+import asyncio
+import json
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import FieldDoesNotExist
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Q
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+
+from aa_bb.checks import sus_contracts, sus_mails, sus_trans
+from aa_bb.checks_cb import sus_contracts as cb_sus_contracts
+from aa_bb.checks_cb import sus_trans as cb_sus_trans
+from .app_settings import get_entity_info, get_character_id
+from .entity_warmer import (
+    PROGRESS_KEY,
+    PROGRESS_VERSION_KEY,
+    STREAM_LIFETIME,
+    STREAM_PING,
+    STREAM_POLL,
+    progress_event,
+    progress_payload,
+)
+from .views import (
+    get_user_id,
+    _contract_row,
+    _mail_row,
+    _render_contract_row_html,
+    _render_mail_row_html,
+    _render_transaction_header_html,
+    _render_transaction_row_html,
+    _transaction_headers,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200  # Rows fetched per ORM hop.
+ENTITY_CONCURRENCY = 8  # Parallel entity lookups per open stream.
+
+
+def async_permission_required(perm: str):
+    """
+    Async counterpart of login_required + permission_required.
+
+    Django 4.2's auth decorators only wrap sync views, so the user/permission
+    lookup is done in a thread and the coroutine is awaited directly.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            def _allowed():
+                return request.user.is_authenticated and request.user.has_perm(perm)
+
+            if not await sync_to_async(_allowed)():  # Same redirect behaviour as the sync decorators.
+                return redirect_to_login(request.get_full_path())
+            return await view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
+
+
+def _in_worker(func):
+    """Wrap a sync helper for the thread pool, releasing the worker's DB connection afterwards."""
+    def _call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(_call, thread_sensitive=False)
+
+
+_aget_entity_info = _in_worker(get_entity_info)
+
+
+async def _entity_info(sem: asyncio.Semaphore, entity_id, as_of):
+    """Bounded async get_entity_info; cache misses hit ESI from the worker thread."""
+    async with sem:
+        return await _aget_entity_info(entity_id, as_of)
+
+
+def _keyset_ordering(qs) -> list[str]:
+    """
+    The ordering qs would iterate in (its order_by, else the model's Meta
+    ordering), with pk appended as tie-breaker. Falls back to pk alone when
+    the ordering is not a list of plain non-null columns, since only those
+    can be resumed with a WHERE.
+    """
+    if qs.query.order_by:
+        ordering = list(qs.query.order_by)
+    else:
+        ordering = list(qs.model._meta.ordering) if qs.query.default_ordering else []
+    pk_name = qs.model._meta.pk.name
+    for f in ordering:
+        name = f.lstrip("-") if isinstance(f, str) else None
+        if name in ("pk", pk_name):
+            continue
+        try:
+            field = qs.model._meta.get_field(name) if name and "__" not in name else None
+        except FieldDoesNotExist:  # Annotation or random ordering.
+            field = None
+        if field is None or field.null or field.is_relation:  # Not resumable by value.
+            return ["pk"]
+    if not any(f.lstrip("-") in ("pk", pk_name) for f in ordering):  # Make the order total.
+        ordering.append("pk")
+    return ordering
+
+
+def _rows_after(ordering: list[str], obj) -> Q:
+    """WHERE clause selecting the rows that come after obj in `ordering`."""
+    cond, equal = Q(), {}
+    for f in ordering:
+        name = f.lstrip("-")
+        value = getattr(obj, name)
+        cond |= Q(**equal, **{f"{name}__{'lt' if f.startswith('-') else 'gt'}": value})
+        equal[name] = value
+    return cond
+
+
+async def _aiter_chunks(qs, size: int = CHUNK_SIZE):
+    """
+    Yield model instances from qs in the order the sync streams iterate it,
+    fetching CHUNK_SIZE rows per thread hop. Each chunk resumes after the
+    previous one's last row (keyset), so a full scan stays linear.
+    """
+    ordering = _keyset_ordering(qs)
+    qs = qs.order_by(*ordering)
+    page = qs
+    while True:
+        chunk = await sync_to_async(list)(page[:size])
+        for obj in chunk:
+            yield obj
+        if len(chunk) < size:  # Exhausted.
+            return
+        page = qs.filter(_rows_after(ordering, chunk[-1]))
+
+
+def _sse_response(events) -> StreamingHttpResponse:
+    """Wrap an async event generator with the SSE headers used by the sync streams."""
+    resp = StreamingHttpResponse(events, content_type="text/event-stream")
+    resp["Cache-Control"]     = "no-cache"
+    resp["X-Accel-Buffering"] = "no"
+    return resp
+
+
+def _progress(processed: int, total: int, hostile_count: int) -> str:
+    return (
+        "event: progress\n"
+        f"data:{processed},{total},{hostile_count}\n\n"
+    )
+
+
+def _classify_contract(row: dict, checks) -> str | None:
+    """Style a contract row and return its <tr> when hostile, else None."""
+    row['cell_styles'] = {
+        col: checks.get_cell_style_for_contract_row(col, row)
+        for col in row
+    }
+    if checks.is_contract_row_hostile(row):  # Only hostile rows are rendered.
+        return _render_contract_row_html(row)
+    return None
+
+
+def _classify_mail(row: dict) -> str | None:
+    """Return the <tr> for a hostile mail row, else None."""
+    if sus_mails.is_mail_row_hostile(row):  # Only hostile rows are rendered.
+        return _render_mail_row_html(row)
+    return None
+
+
+def _classify_transaction(entry, headers: list, checks) -> str | None:
+    """Hydrate one journal entry and return its <tr> when hostile, else None."""
+    row = checks.get_user_transactions([entry])[entry.entry_id]
+    if checks.is_transaction_hostile(row):  # Only hostile rows are rendered.
+        return _render_transaction_row_html(row, headers)
+    return None
+
+
+async def _contract_events(qs, total: int, checks, resolve_issuer):
+    """Async SSE generator for contract rows; mirrors views.stream_contracts_sse."""
+    yield ": ok\n\n"
+    if total == 0:  # Nothing to scan, emit done immediately.
+        yield "event: done\ndata:0\n\n"
+        return
+
+    classify = _in_worker(_classify_contract)
+    sem = asyncio.Semaphore(ENTITY_CONCURRENCY)
+    processed = hostile_count = 0
+    try:
+        async for c in _aiter_chunks(qs):
+            processed += 1
+            yield ": ping\n\n"
+
+            issued = getattr(c, "date_issued", None) or timezone.now()
+            issuer_id = await resolve_issuer(c)
+            if c.assignee_id != 0:  # Prefer assignee when present; fallback to acceptor.
+                assignee_id = c.assignee_id
+            else:
+                assignee_id = c.acceptor_id
+            iinfo, ainfo = await asyncio.gather(
+                _entity_info(sem, issuer_id, issued),
+                _entity_info(sem, assignee_id, issued),
+            )
+            row = _contract_row(c, issued, issuer_id, assignee_id, iinfo, ainfo)
+
+            tr_html = await classify(row, checks)
+            if tr_html:  # Emit only hostile rows.
+                hostile_count += 1
+                yield f"event: contract\ndata:{json.dumps(tr_html)}\n\n"
+            yield _progress(processed, total, hostile_count)
+    except Exception:
+        logger.exception("Error while streaming contracts (async)")
+        yield f"event: error\ndata:{json.dumps('Server error while streaming contracts.')}\n\n"
+        return
+
+    yield "event: done\ndata:bye\n\n"
+
+
+async def _mail_events(qs, total: int):
+    """Async SSE generator for mail rows; recipients are resolved concurrently."""
+    yield ": ok\n\n"
+    if total == 0:  # Nothing to stream -> immediately finish.
+        yield "event: done\ndata:0\n\n"
+        return
+
+    classify = _in_worker(_classify_mail)
+    sem = asyncio.Semaphore(ENTITY_CONCURRENCY)
+    processed = hostile_count = 0
+    try:
+        async for m in _aiter_chunks(qs):
+            processed += 1
+            yield ": ping\n\n"
+
+            sent = getattr(m, "timestamp", None) or timezone.now()
+            recipient_ids = [mr.recipient_id for mr in m.recipients.all()]  # Prefetched by gather_user_mails.
+            infos = await asyncio.gather(
+                _entity_info(sem, m.from_id, sent),
+                *(_entity_info(sem, rid, sent) for rid in recipient_ids),
+            )
+            row = _mail_row(m, sent, m.from_id, infos[0], list(zip(recipient_ids, infos[1:])))
+
+            tr_html = await classify(row)
+            if tr_html:  # Emit only hostile mail rows.
+                hostile_count += 1
+                yield f"event: mail\ndata:{json.dumps(tr_html)}\n\n"
+            yield _progress(processed, total, hostile_count)
+    except Exception:
+        logger.exception("Error while streaming mails (async)")
+        yield f"event: error\ndata:{json.dumps('Server error while streaming mails.')}\n\n"
+        return
+
+    yield "event: done\ndata:bye\n\n"
+
+
+async def _transaction_events(qs, total: int, checks):
+    """Async SSE generator for wallet journal rows."""
+    yield ": ok\n\n"
+    if total == 0:  # No transactions -> stop immediately.
+        yield "event: done\ndata:0\n\n"
+        return
+
+    classify = _in_worker(_classify_transaction)
+    processed = hostile_count = 0
+    try:
+        sample_map = await _in_worker(checks.get_user_transactions)(qs[:1])
+        headers = _transaction_headers(next(iter(sample_map.values()), None))
+        yield f"event: header\ndata:{json.dumps(_render_transaction_header_html(headers))}\n\n"
+
+        async for entry in _aiter_chunks(qs):
+            processed += 1
+            yield ": ping\n\n"
+
+            tr_html = await classify(entry, headers, checks)
+            if tr_html:  # Only push rows that meet hostility rules.
+                hostile_count += 1
+                yield f"event: transaction\ndata:{json.dumps(tr_html)}\n\n"
+            yield _progress(processed, total, hostile_count)
+    except Exception:
+        logger.exception("Error while streaming transactions (async)")
+        yield f"event: error\ndata:{json.dumps('Server error while streaming transactions.')}\n\n"
+        return
+
+    yield "event: done\ndata:bye\n\n"
+
+
+async def _warm_progress_events():
+    """
+    Relay progress snapshots whenever their version changes.
+
+    Ends as soon as a snapshot reports no warm-up in progress (the page
+    reopens the stream when it queues one), and at the latest after
+    STREAM_LIFETIME; the `retry` hint makes the browser reconnect shortly
+    after a timed-out stream.
+    """
+    yield "retry: 3000\n: ok\n\n"
+    loop = asyncio.get_running_loop()
+    seen = object()
+    idle = 0
+    deadline = loop.time() + STREAM_LIFETIME
+    while loop.time() < deadline:
+        version = await cache.aget(PROGRESS_VERSION_KEY)
+        if version != seen:  # New snapshot (or first loop): push it.
+            seen = version
+            payload = await cache.aget(PROGRESS_KEY) if version is not None else None
+            if payload is None:  # Nothing published yet; read the table once.
+                payload = await _in_worker(progress_payload)()
+            yield progress_event(payload)
+            if not payload.get("in_progress"):  # Nothing warming; the page closes the stream.
+                return
+            idle = 0
+        else:
+            idle += STREAM_POLL
+            if idle >= STREAM_PING:  # Keep proxies from closing a quiet stream.
+                yield ": ping\n\n"
+                idle = 0
+        await asyncio.sleep(STREAM_POLL)
+
+
+async def _bb_issuer_id(c):
+    return c.issuer_name.eve_id  # issuer_name is select_related below.
+
+
+async def _cb_issuer_id(c):
+    return await sync_to_async(get_character_id)(c.issuer_name)
+
+
+@async_permission_required("aa_bb.basic_access")
+async def stream_contracts_sse(request):
+    """Async variant of views.stream_contracts_sse."""
+    user_id = await sync_to_async(get_user_id)(request.GET.get("option", ""))
+    if not user_id:  # SSE requires a valid user context.
+        return HttpResponseBadRequest("Unknown account")
+
+    qs = await sync_to_async(sus_contracts.gather_user_contracts)(user_id)
+    qs = qs.select_related("issuer_name")
+    total = await qs.acount()
+    return _sse_response(_contract_events(qs, total, sus_contracts, _bb_issuer_id))
+
+
+@async_permission_required("aa_bb.basic_access")
+async def stream_mails_sse(request):
+    """Async variant of views.stream_mails_sse."""
+    user_id = await sync_to_async(get_user_id)(request.GET.get("option", ""))
+    if not user_id:  # Clients must specify a valid account to inspect.
+        return HttpResponseBadRequest("Unknown account")
+
+    qs = await sync_to_async(sus_mails.gather_user_mails)(user_id)
+    total = await qs.acount()
+    return _sse_response(_mail_events(qs, total))
+
+
+@async_permission_required("aa_bb.basic_access")
+async def stream_transactions_sse(request):
+    """Async variant of views.stream_transactions_sse."""
+    user_id = await sync_to_async(get_user_id)(request.GET.get("option", ""))
+    if not user_id:  # Reject SSE connection when the pilot is unknown.
+        return HttpResponseBadRequest("Unknown account")
+
+    qs = await sync_to_async(sus_trans.gather_user_transactions)(user_id)
+    total = await qs.acount()
+    return _sse_response(_transaction_events(qs, total, sus_trans))
+
+
+@async_permission_required("aa_bb.basic_access_cb")
+async def cb_stream_contracts_sse(request):
+    """Async variant of views_cb.stream_contracts_sse."""
+    corp_id = request.GET.get("option", "")
+    if not corp_id:  # Require a corp identifier.
+        return HttpResponseBadRequest("Unknown account")
+
+    qs = await sync_to_async(cb_sus_contracts.gather_user_contracts)(corp_id)
+    qs = qs.select_related("issuer_name")
+    total = await qs.acount()
+    return _sse_response(_contract_events(qs, total, cb_sus_contracts, _cb_issuer_id))
+
+
+@async_permission_required("aa_bb.basic_access_cb")
+async def cb_stream_transactions_sse(request):
+    """Async variant of views_cb.stream_transactions_sse."""
+    corp_id = request.GET.get("option", "")
+    if not corp_id:  # Need a corp selection for SSE.
+        return HttpResponseBadRequest("Unknown account")
+
+    qs = await sync_to_async(cb_sus_trans.gather_user_transactions)(corp_id)
+    total = await qs.acount()
+    return _sse_response(_transaction_events(qs, total, cb_sus_trans))
+
+
+@async_permission_required("aa_bb.basic_access")
+async def stream_warm_progress(request):
+    """Push BigBrother warm-up progress snapshots using server-sent events."""
+    return _sse_response(_warm_progress_events())
+
+
+@async_permission_required("aa_bb.basic_access_cb")
+async def cb_stream_warm_progress(request):
+    """Push CorpBrother warm-up progress snapshots using server-sent events."""
+    return _sse_response(_warm_progress_events())
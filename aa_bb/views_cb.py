@@ -16,7 +16,7 @@ import traceback
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.core.cache import cache
-import time
+from django.core.exceptions import ObjectDoesNotExist
 from allianceauth.authentication.models import CharacterOwnership
 from django_celery_beat.models import PeriodicTask
 from django.utils.safestring import mark_safe
@@ -27,6 +27,8 @@ from aa_bb.checks.awox import render_awox_kills_html
 from aa_bb.checks.corp_changes import get_frequent_corp_changes
 from aa_bb.checks.cyno import render_user_cyno_info_html
 from aa_bb.checks_cb.hostile_assets import render_assets
+from aa_bb.checks.isk_flow import flows_ok, render_flows
+from aa_bb.checks_cb.isk_flow import gather_corp_flows
 from aa_bb.checks.hostile_clones import render_clones
 from aa_bb.checks.imp_blacklist import generate_blacklist_links
 from aa_bb.checks.lawn_blacklist import get_user_character_names_lawn
@@ -48,8 +50,11 @@ from aa_bb.checks_cb.sus_contracts import (
     get_cell_style_for_contract_row,
     gather_user_contracts,
 )
-from .app_settings import get_system_owner, aablacklist_active, get_user_characters, get_entity_info, get_main_character_name, get_character_id, send_message, get_pings, resolve_corporation_name
+from .app_settings import get_system_owner, aablacklist_active, get_user_characters, get_entity_info, get_main_character_name, get_character_id, send_message, get_pings, resolve_corporation_name, async_sse_enabled
 from .models import BigBrotherConfig, WarmProgress
+from .card_loader import render_cards
+from .entity_warmer import start_warm, publish_progress, progress_payload
+from .pagination import get_page_params, keyset_page
 from .modelss import LeaveRequest
 from corptools.models import Contract  # Ensure this is the correct import for Contract model
 #from datetime import datetime
@@ -67,35 +72,22 @@ CARD_DEFINITIONS = [
     {"title": 'Assets in hostile space', "key": "sus_asset"},
     {"title": 'Suspicious Contracts', "key": "sus_contr"},
     {"title": 'Suspicious Transactions', "key": "sus_tra"},
+    {"title": 'ISK Flows', "key": "isk_flow"},
 ]
 
 
 from esi.models import Token
 from allianceauth.eveonline.models import EveCorporationInfo
 
-# Index view
-@login_required
-@permission_required("aa_bb.basic_access_cb")
-def index(request: WSGIRequest):
-    """Render the CorpBrother dashboard with corp dropdown options."""
-    dropdown_options = []
-    task_name = 'BB run regular updates'
-    task = PeriodicTask.objects.filter(name=task_name).first()
-    if not BigBrotherConfig.get_solo().is_active or (task and not task.enabled):  # Inactive BB -> show disabled page.
-        msg = (
-            "Corp Brother is currently inactive; please fill settings and enable the task"
-        )
-        return render(request, "aa_cb/disabled.html", {"message": msg})
-    ignored_str = BigBrotherConfig.get_solo().ignored_corporations or ""
-    ignored_ids = {int(s) for s in ignored_str.split(",") if s.strip().isdigit()}
-    ignored_corps = EveCorporationInfo.objects.filter(
-            corporation_id__in=ignored_ids).distinct()
-    logger.info(f"ignored ids: {str(ignored_ids)}, corps {len(ignored_corps)}")
+SEARCH_MIN_CHARS = 2  # Shortest prefix the corp search answers.
 
-    if request.user.has_perm("aa_bb.full_access_cb"):  # Full-access sees every corp in the system.
+
+def _visible_corporations(user):
+    """Audited, non-ignored corporations the viewer may inspect, or None without access."""
+    if user.has_perm("aa_bb.full_access_cb"):  # Full-access sees every corp in the system.
         qs = EveCorporationInfo.objects.all()
 
-    elif request.user.has_perm("aa_bb.recruiter_access_cb"):  # Recruiters only see guest-state corp tokens.
+    elif user.has_perm("aa_bb.recruiter_access_cb"):  # Recruiters only see guest-state corp tokens.
         guest_states = BigBrotherConfig.get_solo().bb_guest_states.all()
         qs = EveCorporationInfo.objects.filter(
             corporation_id__in=Token.objects.filter(
@@ -105,41 +97,78 @@ def index(request: WSGIRequest):
         ).distinct()
 
     else:
-        qs = None
+        return None
 
-    if qs is not None:  # Build dropdown when user has any corp visibility.
-        qsa = qs.exclude(corporation_id__in=ignored_corps.values_list("corporation_id", flat=True))
-        qsa = qsa.filter(
-            corporationaudit__isnull=False,
-        )
-        dropdown_options = (
-            qsa.values_list("corporation_id", "corporation_name")
-              .order_by("corporation_name")
+    ignored_str = BigBrotherConfig.get_solo().ignored_corporations or ""
+    ignored_ids = {int(s) for s in ignored_str.split(",") if s.strip().isdigit()}
+    return qs.exclude(corporation_id__in=ignored_ids).filter(
+        corporationaudit__isnull=False,
+    )
+
+
+# Index view
+@login_required
+@permission_required("aa_bb.basic_access_cb")
+def index(request: WSGIRequest):
+    """Render the CorpBrother dashboard; corps are picked through search_corporations."""
+    task_name = 'BB run regular updates'
+    task = PeriodicTask.objects.filter(name=task_name).first()
+    if not BigBrotherConfig.get_solo().is_active or (task and not task.enabled):  # Inactive BB -> show disabled page.
+        msg = (
+            "Corp Brother is currently inactive; please fill settings and enable the task"
         )
+        return render(request, "aa_cb/disabled.html", {"message": msg})
 
     context = {
-        "dropdown_options": dropdown_options,
         "CARD_DEFINITIONS": CARD_DEFINITIONS,
+        "async_sse": async_sse_enabled(),
+        "search_min_chars": SEARCH_MIN_CHARS,
     }
     return render(request, "aa_cb/index.html", context)
 
 
+@login_required
+@permission_required("aa_bb.basic_access_cb")
+def search_corporations(request):
+    """
+    Typeahead for the corp picker: visible corporations whose name starts with
+    `q` (case-insensitive).
+      { results: [ { value: corp_id, label: name }, … ], next: <name to pass as `after`> | null }
+    """
+    q = request.GET.get("q", "").strip()
+    after = request.GET.get("after") or None
+    try:
+        _, limit = get_page_params(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+
+    qs = _visible_corporations(request.user)
+    if qs is None or len(q) < SEARCH_MIN_CHARS:  # No visibility, or prefix too short to be selective.
+        return JsonResponse({"results": [], "next": None})
+
+    corps = (
+        qs.filter(corporation_name__istartswith=q)
+        .values_list("corporation_id", "corporation_name")
+        .order_by("corporation_name")
+    )
+    if after:  # Keyset continuation on the corp name.
+        corps = corps.filter(corporation_name__gt=after)
+
+    rows = list(corps[:limit + 1])
+    next_after = rows[limit - 1][1] if len(rows) > limit else None
+    return JsonResponse({
+        "results": [{"value": cid, "label": name} for cid, name in rows[:limit]],
+        "next": next_after,
+    })
+
+
 # Bulk loader (fallback)
 @login_required
 @permission_required("aa_bb.basic_access_cb")
 def load_cards(request: WSGIRequest) -> JsonResponse:
-    """Legacy bulk loader that fetches every CorpBrother card for a corp."""
+    """Bulk loader that renders every non-streamed CorpBrother card for a corp concurrently."""
     corp_id = request.GET.get("option")  # now contains corporation_id
-    warm_entity_cache_task.delay(corp_id)
-    cards = []
-    for card in CARD_DEFINITIONS:
-        content, status = get_card_data(request, corp_id, card["key"])
-        cards.append({
-            "title":   card["title"],
-            "content": content,
-            "status":  status,
-        })
-    logger.warning("load_cards")
+    cards = render_cards(CARD_DEFINITIONS, lambda key: get_card_data(request, corp_id, key))
     return JsonResponse({"cards": cards})
 
 
@@ -159,6 +188,11 @@ def get_card_data(request, corp_id: int, key: str):
         content = render_assets(corp_id)
         status  = not (content and "red" in content)
 
+    elif key == "isk_flow":  # Per-counterparty ISK totals across all wallet divisions.
+        flows   = gather_corp_flows(corp_id)
+        content = render_flows(flows)
+        status  = flows_ok(flows)
+
     else:
         content = "WiP"
         status  = True
@@ -201,46 +235,11 @@ def load_card(request):
 def warm_entity_cache_task(self, user_id):
     """
     Gather mails, contracts, transactions; warm entity cache.
-    Track progress in the DB via WarmProgress.
+    The diff, sharding and WarmProgress tracking live in entity_warmer.start_warm.
     """
     user_main = resolve_corporation_name(user_id) or str(user_id)
     logger.info(f"corp_name: {user_main}")
-    qs = WarmProgress.objects.all()
-    users = [
-        {"user": wp.user_main, "current": wp.current, "total": wp.total}
-        for wp in qs
-    ]
-    # Check for existing progress entry
-    try:
-        progress = WarmProgress.objects.get(user_main=user_main)
-    except WarmProgress.DoesNotExist:
-        progress = None
-
-    if progress and progress.total > 0:  # Abort if another job is already processing this corp.
-        first_current = progress.current
-        logger.info(f"[{user_main}] detected in-progress run (current={first_current}); probing…")
-        time.sleep(20)
-
-        # re-fetch to see if it's moved
-        try:
-            progress = WarmProgress.objects.get(user_main=user_main)
-            second_current = progress.current
-        except WarmProgress.DoesNotExist:
-            second_current = None
-
-        # Now *abort* if there *was* progress; otherwise continue
-        if second_current != first_current:  # Progress moved, so exit to avoid duplicate run.
-            logger.info(
-                f"[{user_main}] progress advanced from {first_current} to {second_current}; aborting new task."
-            )
-            raise Ignore(f"Task for {user_main} is already running.")
-        else:
-            logger.info(
-                f"[{user_main}] no progress in 20 s (still {first_current}); continuing with new task."
-            )
-
     # Build list of (entity_id, timestamp)
-    entries = []
     contracts = gather_user_contracts(user_id)
     trans = gather_user_transactions(user_id)
     candidates = []
@@ -252,38 +251,9 @@ def warm_entity_cache_task(self, user_id):
     for t in trans:
         candidates.append((t.first_party_id, getattr(t, "date")))
         candidates.append((t.second_party_id, getattr(t, "date")))
-    from django.db.models import Q
-    from .models import EntityInfoCache
-    query_filter = Q()
-    for entity_id, as_of in candidates:
-        query_filter |= Q(entity_id=entity_id, as_of=as_of)
-
-    existing = set(
-        EntityInfoCache.objects.filter(query_filter)
-        .values_list('entity_id', 'as_of')
-    )
-
-    for candidate in candidates:
-        if candidate not in existing:  # Only fetch entity info that is missing from cache.
-            entries.append(candidate)
-
-    total = len(entries)
-    logger.info(f"Starting warm cache for {user_main} ({total} entries)")
-
-    # Initialize or update the progress record
-    WarmProgress.objects.update_or_create(
-        user_main=user_main,
-        defaults={"current": 0, "total": total}
-    )
-
-    # Process each entry, updating the DB record
-    for idx, (eid, ts) in enumerate(entries, start=1):
-        WarmProgress.objects.filter(user_main=user_main).update(current=idx)
-        get_entity_info(eid, ts)
-
-    # Clean up when done
-    WarmProgress.objects.filter(user_main=user_main).delete()
-    logger.info(f"Completed warm cache for {user_main}")
+    total = start_warm(user_main, candidates)
+    if total is None:  # Another run holds the lease for this target.
+        raise Ignore(f"Task for {user_main} is already running.")
     return total
 
 @login_required
@@ -308,6 +278,7 @@ def warm_cache(request):
         user_main=user_main,
         defaults={"current": 0, "total": 0}
     )
+    publish_progress()
 
     # Enqueue the celery task
     warm_entity_cache_task.delay(user_id)
@@ -319,21 +290,7 @@ def warm_cache(request):
 def get_warm_progress(request):
     """AJAX helper returning progress for corp cache warm jobs."""
     try:
-        qs = WarmProgress.objects.all()
-        users = [
-            {"user": wp.user_main, "current": wp.current, "total": wp.total}
-            for wp in qs
-        ]
-        queued_names = [wp.user_main for wp in qs if wp.current == 0]
-
-        return JsonResponse({
-            "in_progress": bool(users),
-            "users": users,
-            "queued": {
-                "count": len(queued_names),
-                "names": queued_names,
-            },
-        })
+        return JsonResponse(progress_payload())
     except (ConnectionResetError, socket.error) as e:
         if isinstance(e, ConnectionResetError) or getattr(e, 'errno', None) == errno.ECONNRESET:
             # client disconnected — nothing to log
@@ -344,6 +301,7 @@ def get_warm_progress(request):
 
 
 
+
 # Paginated endpoints for Suspicious Contracts
 @login_required
 @permission_required("aa_bb.basic_access_cb")
@@ -371,30 +329,31 @@ def list_contract_ids(request):
 @permission_required("aa_bb.basic_access_cb")
 def check_contract_batch(request):
     """
-    Check a slice of contracts for hostility by start/limit parameters.
-    Returns JSON with `checked` count and list of `hostile_found`,
-    each entry including a `cell_styles` dict for inline styling.
-    Now uses gather_user_contracts + get_user_contracts(qs) on the full set.
+    Check one page of corp contracts for hostility, newest first.
+    Pages are addressed by an opaque `cursor` (from the previous response's
+    `next_cursor`) plus `limit`. Returns JSON with `checked` count, list of
+    `hostile_found` (each with a `cell_styles` dict) and `next_cursor`.
     """
-    option = request.GET.get("option")
-    start  = int(request.GET.get("start", 0))
-    limit  = int(request.GET.get("limit", 10))
-    user_id = get_user_id(option)
-    if user_id is None:  # Need a valid account to inspect.
+    corp_id = request.GET.get("option")
+    try:
+        cursor, limit = get_page_params(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    if not corp_id:  # Need a corp selection to inspect.
         return JsonResponse({"error": "Unknown account"}, status=404)
 
-    # 1) Ensure the full QuerySet is available
-    cache_key = f"contract_qs_{user_id}"
-    qs_all = cache.get(cache_key)
-    if qs_all is None:  # Cache miss, gather and store for 5 minutes.
-        qs_all = gather_user_contracts(user_id)
-        cache.set(cache_key, qs_all, 300)
+    try:
+        qs = gather_user_contracts(corp_id)
+    except (ValueError, ObjectDoesNotExist):
+        return JsonResponse({"error": "Unknown account"}, status=404)
 
-    # 2) Slice out just this batch of model instances
-    batch_qs = qs_all[start:start + limit]
+    try:
+        batch, next_cursor = keyset_page(qs, "date_issued", "contract_id", cursor, limit)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
 
-    # 3) Hydrate only this batch
-    batch_map = get_user_contracts(batch_qs)
+    # Hydrate only this batch
+    batch_map = get_user_contracts(batch)
 
     HIDDEN = {
         'assignee_alliance_id', 'assignee_corporation_id',
@@ -417,8 +376,9 @@ def check_contract_batch(request):
             hostile.append(payload)
 
     return JsonResponse({
-        'checked': len(batch_qs),
-        'hostile_found': hostile
+        'checked': len(batch),
+        'hostile_found': hostile,
+        'next_cursor': next_cursor,
     })
 
 